@@ -60,3 +60,13 @@ class ProjectAdmin(GuardedModelAdmin):
 
 
 admin.site.register(models.LexiconProject, ProjectAdmin)
+
+
+# Export files
+class ExportArtifactAdmin(admin.ModelAdmin):
+    list_display = ("path", "project", "version", "size", "last_used")
+    list_filter = ("project",)
+    readonly_fields = ("path", "project", "version", "size", "created", "last_used")
+
+
+admin.site.register(models.ExportArtifact, ExportArtifactAdmin)
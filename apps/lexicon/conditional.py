@@ -0,0 +1,109 @@
+# filepath: apps/lexicon/conditional.py
+
+# Conditional GET support for the read only views. Their pages only change when a
+# project's content does, so an ETag built from the project's version and
+# modified time is known before rendering and a browser or LibreOffice
+# revalidating a page it already has gets a 304 instead of the whole page.
+
+import hashlib
+
+from django.conf import settings
+from django.core.cache import cache
+from django.http import Http404
+from django.views.decorators.cache import cache_control
+from django.views.decorators.http import condition
+
+from apps.lexicon import models
+from apps.lexicon.permissions import get_request_project, has_project_permission
+
+# LibreOffice polls for updates far more often than projects change, so the
+# version is kept in the cache and cleared by a signal when a project is saved
+PROJECT_VERSION_CACHE_SECONDS = 3600
+
+
+def _digest(*parts) -> str:
+    return hashlib.sha1(repr(parts).encode()).hexdigest()
+
+
+def project_page_etag(request, lang_code: str, *args, **kwargs) -> str:
+    """Return an ETag for a page that shows a project's content.
+
+    Besides the project's content the page depends on the url and query string,
+    whether it's an htmx partial, who is logged in and whether they can edit the
+    project. The ETag is weak because the rendered csrf token differs each time."""
+    project = get_request_project(request, lang_code)
+    user = request.user
+    can_edit = user.is_authenticated and has_project_permission(request, project)
+    return 'W/"{}"'.format(
+        _digest(
+            settings.VERSION,
+            project.pk,
+            project.version,
+            project.modified.isoformat(),
+            request.path,
+            sorted(request.GET.lists()),
+            request.headers.get("HX-Request"),
+            user.pk,
+            can_edit,
+        )
+    )
+
+
+def _project_version_key(lang_code: str) -> str:
+    return f"project-version:{lang_code}"
+
+
+def get_project_version(lang_code: str) -> dict:
+    """Return the version and modified time of a project, without a query if cached.
+
+    Raises:
+        Http404: If there is no project with the language code.
+    """
+    key = _project_version_key(lang_code)
+    state = cache.get(key)
+    if state is None:
+        state = (
+            models.LexiconProject.objects.filter(language_code=lang_code)
+            .values("version", "modified")
+            .first()
+        )
+        if state is None:
+            raise Http404(f"No project with language code '{lang_code}'.")
+        cache.set(key, state, PROJECT_VERSION_CACHE_SECONDS)
+    return state
+
+
+def forget_project_version(lang_code: str) -> None:
+    cache.delete(_project_version_key(lang_code))
+
+
+def project_version_etag(request, lang_code: str, *args, **kwargs) -> str:
+    """Return an ETag for a response that only depends on the project's version."""
+    state = get_project_version(lang_code)
+    return '"{}"'.format(
+        _digest(settings.VERSION, state["version"], request.get_host())
+    )
+
+
+def project_last_modified(request, lang_code: str, *args, **kwargs):
+    return get_project_version(lang_code)["modified"]
+
+
+def conditional_project_page(view):
+    """Make a view of a project's page answer conditional GETs.
+
+    Pages differ between users so they are kept out of shared caches, and are
+    revalidated on every view so an edit shows up straight away."""
+    view = condition(etag_func=project_page_etag)(view)
+    return cache_control(private=True, no_cache=True)(view)
+
+
+def conditional_project_version(view):
+    """Make a view that only depends on the project's version answer conditional GETs.
+
+    The response is the same for everyone, so proxies may keep it as long as
+    they revalidate it."""
+    view = condition(
+        etag_func=project_version_etag, last_modified_func=project_last_modified
+    )(view)
+    return cache_control(public=True, no_cache=True)(view)
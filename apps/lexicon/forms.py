@@ -5,6 +5,8 @@ from django.forms import BaseModelFormSet, inlineformset_factory, modelformset_f
 from django.urls import reverse_lazy
 
 from apps.lexicon import models
+from apps.lexicon.utils import paradigm_generator
+from apps.lexicon.utils.conjugations import save_conjugation_cells
 
 log = logging.getLogger("lexicon")
 
@@ -117,6 +119,10 @@ class ExportForm(forms.Form):
                 "xml",
                 "Paratext .xml",
             ),
+            (
+                "zip",
+                "All spell check formats, .oxt, .dic and .xml in a .zip",
+            ),
             (
                 "jsn",
                 "Lexicon app .json (includes all project data)",
@@ -125,6 +131,30 @@ class ExportForm(forms.Form):
     )
 
 
+class ParatextMergeForm(forms.Form):
+    """The form for merging the lexicon into a Paratext SpellingStatus.xml file."""
+
+    file = forms.FileField(
+        label="Paratext SpellingStatus.xml file",
+        help_text="Found in the Paratext project folder.",
+    )
+    since_version = forms.IntegerField(
+        label="Lexicon version merged last time",
+        required=False,
+        min_value=0,
+        help_text="Only lexicon changes made since then replace spelling decisions made in Paratext. Leave empty to apply every lexicon word.",
+    )
+    checked = forms.BooleanField(
+        label="Limit export to only checked entries?", initial=True, required=False
+    )
+    include_hunspell = forms.BooleanField(
+        label="Include hunspell conjugations?", initial=True, required=False
+    )
+    include_ignore = forms.BooleanField(
+        label="Include ignore words?", initial=True, required=False
+    )
+
+
 class ConjugationForm(forms.ModelForm):
     """A grid layout form that displays and edits Conjugation objects in a paradigm.
 
@@ -166,53 +196,33 @@ class BaseConjugationFormSet(BaseModelFormSet):
         self.paradigm = paradigm
 
     def save(self, commit=True):
+        """Save the grid in one transaction, see save_conjugation_cells()."""
         if not self.forms:
             return []
 
-        paradigm = self.paradigm
-        num_cols = len(paradigm.column_labels)
-        instances = []
-
+        num_cols = len(self.paradigm.column_labels)
+        cells = {}
         for idx, form in enumerate(self.forms):
-            conjugation_value = form.cleaned_data.get("conjugation", "").strip()
-            if conjugation_value:  # Only process non-empty conjugations
-                row = idx // num_cols
-                column = idx % num_cols
-
-                # Get or create the conjugation instance
-                instance, created = models.Conjugation.objects.get_or_create(
+            row, column = divmod(idx, num_cols)
+            value = ""
+            if form.cleaned_data.get("conjugation", "").strip():
+                # The model's clean() has already normalized the instance's text
+                value = form.instance.conjugation
+            cells[(self.word.pk, row, column)] = value
+
+        if not commit:
+            return [
+                models.Conjugation(
                     word=self.word,
-                    paradigm=paradigm,
+                    paradigm=self.paradigm,
                     row=row,
                     column=column,
-                    defaults={"conjugation": conjugation_value},
-                )
-
-                # If it already exists, update the conjugation value
-                if not created:
-                    instance.conjugation = conjugation_value
-                    if commit:
-                        instance.save()
-
-                instances.append(instance)
-                log.debug(
-                    f"{'Created' if created else 'Updated'} conjugation: '{conjugation_value}' at '({row}, {column})'"
+                    conjugation=value.strip().lower(),
                 )
-
-            else:
-                # If the conjugation is empty but an instance exists, delete it
-                row = idx // num_cols
-                column = idx % num_cols
-                try:
-                    existing = models.Conjugation.objects.get(
-                        word=self.word, paradigm=paradigm, row=row, column=column
-                    )
-                    if commit:
-                        existing.delete()
-                    log.debug(f"Deleted empty conjugation at '({row}, {column})'")
-                except models.Conjugation.DoesNotExist:
-                    pass  # Nothing to delete
-
+                for (_, row, column), value in cells.items()
+                if value
+            ]
+        instances, _ = save_conjugation_cells(self.word.project, self.paradigm, cells)
         return instances
 
 
@@ -312,6 +322,110 @@ class ParadigmForm(forms.ModelForm):
         }
 
 
+class ParadigmReshapeForm(forms.Form):
+    """Inserts, deletes or moves a row or column of a paradigm.
+
+    Positions are numbered from 1 for the user."""
+
+    axis = forms.ChoiceField(
+        choices=(("row", "Row"), ("column", "Column")),
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    operation = forms.ChoiceField(
+        choices=(("insert", "Insert"), ("delete", "Delete"), ("move", "Move")),
+        widget=forms.Select(attrs={"class": "form-select"}),
+    )
+    position = forms.IntegerField(
+        min_value=1, widget=forms.NumberInput(attrs={"class": "form-control"})
+    )
+    to = forms.IntegerField(
+        label="Move to",
+        min_value=1,
+        required=False,
+        widget=forms.NumberInput(attrs={"class": "form-control"}),
+    )
+    label = forms.CharField(
+        label="New label",
+        required=False,
+        widget=forms.TextInput(attrs={"class": "form-control"}),
+    )
+
+    def clean(self):
+        cleaned_data = super().clean()
+        operation = cleaned_data.get("operation")
+        if operation == "insert" and not cleaned_data.get("label", "").strip():
+            self.add_error("label", "Inserted rows and columns need a label.")
+        if operation == "move" and cleaned_data.get("to") is None:
+            self.add_error("to", "Choose where to move to.")
+        return cleaned_data
+
+
+class GenerationTemplateForm(forms.ModelForm):
+    """Edits a paradigm's generation template, with a rule field for every cell."""
+
+    def __init__(self, *args, paradigm=None, **kwargs):
+        super().__init__(*args, **kwargs)
+        self.paradigm = paradigm
+        rules = self.instance.cell_rules or []
+        self.cell_grid = []
+        for row, row_label in enumerate(paradigm.row_labels):
+            row_fields = []
+            for column, column_label in enumerate(paradigm.column_labels):
+                name = f"cell_{row}_{column}"
+                try:
+                    initial = rules[row][column]
+                except IndexError:
+                    initial = ""
+                self.fields[name] = forms.CharField(
+                    required=False,
+                    initial=initial,
+                    label=f"{row_label}, {column_label}",
+                    widget=forms.TextInput(
+                        attrs={"placeholder": "—", "class": "form-control"}
+                    ),
+                )
+                row_fields.append(name)
+            self.cell_grid.append(row_fields)
+
+    def rows(self):
+        """The cell fields as rows, for the template."""
+        return [
+            (label, [self[name] for name in names])
+            for label, names in zip(self.paradigm.row_labels, self.cell_grid)
+        ]
+
+    def clean_stem_pattern(self):
+        pattern = self.cleaned_data["stem_pattern"]
+        try:
+            paradigm_generator.parse_stem_pattern(pattern)
+        except paradigm_generator.GenerationRuleError as e:
+            raise forms.ValidationError(str(e))
+        return pattern
+
+    def clean(self):
+        cleaned_data = super().clean()
+        for names in self.cell_grid:
+            for name in names:
+                try:
+                    paradigm_generator.parse_cell_rule(cleaned_data.get(name, ""))
+                except paradigm_generator.GenerationRuleError as e:
+                    self.add_error(name, str(e))
+        return cleaned_data
+
+    def save(self, commit=True):
+        self.instance.paradigm = self.paradigm
+        self.instance.cell_rules = [
+            [self.cleaned_data.get(name, "").strip() for name in names]
+            for names in self.cell_grid
+        ]
+        return super().save(commit)
+
+    class Meta:
+        model = models.GenerationTemplate
+        fields = ["stem_pattern"]
+        widgets = {"stem_pattern": forms.TextInput(attrs={"class": "form-control"})}
+
+
 class AffixForm(forms.ModelForm):
     """A form for editing an Affix object."""
 
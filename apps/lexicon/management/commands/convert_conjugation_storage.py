@@ -0,0 +1,27 @@
+from django.core.management.base import BaseCommand
+
+from apps.lexicon.utils.conjugations import (
+    STORAGE_LAYOUTS,
+    convert_conjugation_storage,
+)
+
+
+class Command(BaseCommand):
+    help = (
+        "Convert a lexicon project's conjugations to a row per cell or a row per grid"
+    )
+
+    def add_arguments(self, parser):
+        parser.add_argument("language_code", type=str)
+        parser.add_argument("layout", type=str, choices=STORAGE_LAYOUTS)
+
+    def handle(self, *args, **options):
+        from apps.lexicon.models import LexiconProject
+
+        project = LexiconProject.objects.get(language_code=options["language_code"])
+        count = convert_conjugation_storage(project, options["layout"])
+        self.stdout.write(
+            self.style.SUCCESS(
+                f"Converted {count} conjugations to {options['layout']} storage"
+            )
+        )
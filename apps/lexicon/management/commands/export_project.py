@@ -2,7 +2,7 @@ import os
 
 from django.core.management.base import BaseCommand
 
-from apps.lexicon.utils.project_import_export import export_project_to_json
+from apps.lexicon.utils.project_import_export import write_project_json
 
 
 class Command(BaseCommand):
@@ -16,9 +16,8 @@ class Command(BaseCommand):
         from apps.lexicon.models import LexiconProject
 
         project = LexiconProject.objects.get(language_code=options["language_code"])
-        data = export_project_to_json(project.pk)
         output = options["output"] or f"{options['language_code']}_export.json"
         output = os.path.join("data", output)
         with open(output, "w", encoding="utf-8") as f:
-            f.write(data)
+            write_project_json(project.pk, f)
         self.stdout.write(self.style.SUCCESS(f"Exported to {output}"))
@@ -0,0 +1,39 @@
+from django.core.management.base import BaseCommand
+from django.template.defaultfilters import filesizeformat
+
+from apps.lexicon.utils import export_store
+
+
+class Command(BaseCommand):
+    help = "Show the disk usage of data/exports and how much has been evicted"
+
+    def add_arguments(self, parser):
+        parser.add_argument(
+            "--enforce",
+            action="store_true",
+            help="Remove the least recently used files if over budget first",
+        )
+
+    def handle(self, *args, **options):
+        if options["enforce"]:
+            result = export_store.enforce_budget()
+            self.stdout.write(
+                f"Removed {result['evicted_files']} files, "
+                f"{filesizeformat(result['evicted_bytes'])}"
+            )
+        else:
+            export_store.sync_index()
+
+        stats = export_store.store_stats()
+        self.stdout.write(
+            f"{stats['files']} files, {filesizeformat(stats['bytes'])} "
+            f"of a {filesizeformat(stats['budget'])} budget"
+        )
+        for lang_code, size in sorted(
+            stats["by_project"].items(), key=lambda item: str(item[0])
+        ):
+            self.stdout.write(f"  {lang_code or 'unknown'}: {filesizeformat(size)}")
+        self.stdout.write(
+            f"Evicted {stats['evicted_files']} files, "
+            f"{filesizeformat(stats['evicted_bytes'])}, last run {stats['last_run']}"
+        )
@@ -1,8 +1,7 @@
 # management/commands/import_project.py
 from django.core.management.base import BaseCommand
 
-from apps.lexicon.tasks import update_project_search_fields
-from apps.lexicon.utils.project_import_export import import_project_from_json
+from apps.lexicon.utils.project_import_export import import_project_from_file
 
 
 class Command(BaseCommand):
@@ -13,8 +12,7 @@ class Command(BaseCommand):
         parser.add_argument("--overwrite", action="store_true", default=False)
 
     def handle(self, *args, **options):
-        with open(options["file"], encoding="utf-8") as f:
-            data = f.read()
-        project = import_project_from_json(data, overwrite=options["overwrite"])
+        project = import_project_from_file(
+            options["file"], overwrite=options["overwrite"]
+        )
         self.stdout.write(self.style.SUCCESS(f"Imported project: {project}"))
-        update_project_search_fields(project.language_code)
@@ -0,0 +1,69 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:05
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0003_alter_lexiconproject_options"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lexiconproject",
+            name="hunspell_forms_affix_hash",
+            field=models.CharField(
+                blank=True,
+                editable=False,
+                help_text="Hash of the affix file the generated hunspell forms were built with",
+                max_length=40,
+                null=True,
+            ),
+        ),
+        migrations.CreateModel(
+            name="HunspellForm",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "form",
+                    models.CharField(help_text="The generated word.", max_length=255),
+                ),
+                (
+                    "affix_letter",
+                    models.CharField(
+                        blank=True,
+                        default="",
+                        help_text="The affix flags that generated this form, blank for root words.",
+                        max_length=10,
+                    ),
+                ),
+                (
+                    "entry",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="hunspell_forms",
+                        to="lexicon.lexiconentry",
+                    ),
+                ),
+            ],
+            options={
+                "indexes": [
+                    models.Index(fields=["form"], name="lexicon_hun_form_806a1f_idx")
+                ],
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("entry", "form"), name="unique_hunspell_form_per_entry"
+                    )
+                ],
+            },
+        ),
+    ]
@@ -0,0 +1,65 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:31
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0005_duplicate_candidates"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="GenerationTemplate",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "stem_pattern",
+                    models.CharField(
+                        blank=True,
+                        help_text="An optional regex with one (group) that finds the stem of a headword, e.g. ^(.*)ol$. Words it doesn't match are skipped. If blank the whole headword is the stem.",
+                        max_length=100,
+                    ),
+                ),
+                (
+                    "cell_rules",
+                    models.JSONField(
+                        default=list,
+                        help_text="A rule for each cell, as a list of rows.",
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        blank=True,
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        max_length=7,
+                    ),
+                ),
+                ("report", models.JSONField(blank=True, null=True)),
+                ("last_run", models.DateTimeField(blank=True, null=True)),
+                (
+                    "paradigm",
+                    models.OneToOneField(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="generation_template",
+                        to="lexicon.paradigm",
+                    ),
+                ),
+            ],
+        ),
+    ]
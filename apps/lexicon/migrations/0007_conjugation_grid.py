@@ -0,0 +1,72 @@
+# Generated by Django 5.2.18 on 2026-10-19 07:42
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0006_generationtemplate"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lexiconproject",
+            name="conjugation_storage",
+            field=models.CharField(
+                choices=[
+                    ("rows", "A row per conjugation"),
+                    ("grid", "A row per conjugation grid"),
+                ],
+                default="rows",
+                editable=False,
+                help_text="How conjugations are stored, change it with convert_conjugation_storage",
+                max_length=4,
+            ),
+        ),
+        migrations.CreateModel(
+            name="ConjugationGrid",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "cells",
+                    models.JSONField(
+                        default=list,
+                        help_text="The conjugated forms as a list of rows.",
+                    ),
+                ),
+                (
+                    "paradigm",
+                    models.ForeignKey(
+                        help_text="The paradigm that defines the grid structure.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        to="lexicon.paradigm",
+                    ),
+                ),
+                (
+                    "word",
+                    models.ForeignKey(
+                        help_text="The word that this grid belongs to.",
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="conjugation_grids",
+                        to="lexicon.lexiconentry",
+                    ),
+                ),
+            ],
+            options={
+                "constraints": [
+                    models.UniqueConstraint(
+                        fields=("word", "paradigm"), name="unique_conjugation_grid"
+                    )
+                ],
+            },
+        ),
+    ]
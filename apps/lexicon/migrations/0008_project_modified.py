@@ -0,0 +1,20 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:08
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0007_conjugation_grid"),
+    ]
+
+    operations = [
+        migrations.AddField(
+            model_name="lexiconproject",
+            name="modified",
+            field=models.DateTimeField(
+                auto_now=True,
+                help_text="When any of the project's content last changed, used to validate cached pages",
+            ),
+        ),
+    ]
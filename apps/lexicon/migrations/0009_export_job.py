@@ -0,0 +1,103 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:25
+
+import django.db.models.deletion
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0008_project_modified"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportJob",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                (
+                    "export_type",
+                    models.CharField(
+                        choices=[
+                            ("oxt", "Libre office .oxt"),
+                            ("dic", "Word .dic"),
+                            ("xml", "Paratext .xml"),
+                            ("jsn", "Lexicon app .json"),
+                        ],
+                        max_length=3,
+                    ),
+                ),
+                ("checked", models.BooleanField(default=True)),
+                ("hunspell", models.BooleanField(default=True)),
+                ("ignore_words", models.BooleanField(default=True)),
+                (
+                    "project_version",
+                    models.IntegerField(
+                        help_text="The project version the export was requested for."
+                    ),
+                ),
+                (
+                    "project_modified",
+                    models.DateTimeField(
+                        help_text="When the project last changed at the time of the request, a .json export includes everything."
+                    ),
+                ),
+                (
+                    "status",
+                    models.CharField(
+                        choices=[
+                            ("pending", "Pending"),
+                            ("running", "Running"),
+                            ("done", "Done"),
+                            ("failed", "Failed"),
+                        ],
+                        default="pending",
+                        max_length=7,
+                    ),
+                ),
+                (
+                    "progress",
+                    models.PositiveSmallIntegerField(
+                        default=0, help_text="Percentage of the export built so far."
+                    ),
+                ),
+                (
+                    "artifact",
+                    models.CharField(
+                        blank=True,
+                        help_text="Path of the finished export file.",
+                        max_length=255,
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        blank=True,
+                        help_text="Size of the export file in bytes.",
+                        null=True,
+                    ),
+                ),
+                ("duration", models.DurationField(blank=True, null=True)),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("finished", models.DateTimeField(blank=True, null=True)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_jobs",
+                        to="lexicon.lexiconproject",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["-created"],
+            },
+        ),
+    ]
@@ -0,0 +1,58 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:32
+
+import django.db.models.deletion
+import django.utils.timezone
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0009_export_job"),
+    ]
+
+    operations = [
+        migrations.CreateModel(
+            name="ExportArtifact",
+            fields=[
+                (
+                    "id",
+                    models.BigAutoField(
+                        auto_created=True,
+                        primary_key=True,
+                        serialize=False,
+                        verbose_name="ID",
+                    ),
+                ),
+                ("path", models.CharField(max_length=255, unique=True)),
+                (
+                    "version",
+                    models.IntegerField(
+                        blank=True,
+                        help_text="The project version the file was built from.",
+                        null=True,
+                    ),
+                ),
+                (
+                    "size",
+                    models.PositiveBigIntegerField(
+                        help_text="Size of the file in bytes."
+                    ),
+                ),
+                ("created", models.DateTimeField(auto_now_add=True)),
+                ("last_used", models.DateTimeField(default=django.utils.timezone.now)),
+                (
+                    "project",
+                    models.ForeignKey(
+                        blank=True,
+                        null=True,
+                        on_delete=django.db.models.deletion.CASCADE,
+                        related_name="export_artifacts",
+                        to="lexicon.lexiconproject",
+                    ),
+                ),
+            ],
+            options={
+                "ordering": ["last_used"],
+            },
+        ),
+    ]
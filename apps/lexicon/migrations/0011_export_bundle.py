@@ -0,0 +1,26 @@
+# Generated by Django 5.2.18 on 2026-10-19 08:36
+
+from django.db import migrations, models
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0010_export_artifact"),
+    ]
+
+    operations = [
+        migrations.AlterField(
+            model_name="exportjob",
+            name="export_type",
+            field=models.CharField(
+                choices=[
+                    ("oxt", "Libre office .oxt"),
+                    ("dic", "Word .dic"),
+                    ("xml", "Paratext .xml"),
+                    ("zip", "Spell check bundle .zip"),
+                    ("jsn", "Lexicon app .json"),
+                ],
+                max_length=3,
+            ),
+        ),
+    ]
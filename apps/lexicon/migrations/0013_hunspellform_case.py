@@ -0,0 +1,42 @@
+# Generated by Django 5.2.18 on 2026-10-19 09:18
+
+from django.db import migrations, models
+from django.db.models.functions import Lower
+
+
+def normalize_forms(apps, schema_editor):
+    """Fill in the lookup column, and have the forms rebuilt in their original case."""
+    HunspellForm = apps.get_model("lexicon", "HunspellForm")
+    LexiconProject = apps.get_model("lexicon", "LexiconProject")
+    HunspellForm.objects.update(normalized=Lower("form"))
+    LexiconProject.objects.update(hunspell_forms_affix_hash=None)
+
+
+class Migration(migrations.Migration):
+    dependencies = [
+        ("lexicon", "0012_paratext_merge"),
+    ]
+
+    operations = [
+        migrations.RemoveIndex(
+            model_name="hunspellform",
+            name="lexicon_hun_form_806a1f_idx",
+        ),
+        migrations.AddField(
+            model_name="hunspellform",
+            name="normalized",
+            field=models.CharField(
+                default="",
+                editable=False,
+                help_text="The form in lower case, used to look words up.",
+                max_length=255,
+            ),
+        ),
+        migrations.RunPython(normalize_forms, migrations.RunPython.noop),
+        migrations.AddIndex(
+            model_name="hunspellform",
+            index=models.Index(
+                fields=["normalized"], name="lexicon_hun_normali_bab2f0_idx"
+            ),
+        ),
+    ]
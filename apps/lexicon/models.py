@@ -1,12 +1,21 @@
 import logging
+import os
 import re
 import string
+from datetime import timedelta
 
+from django.conf import settings
 from django.core.exceptions import ValidationError
 from django.db import models
 from django.urls import reverse
+from django.utils import timezone
 
-from apps.lexicon.tasks import update_lexicon_entry_search_field
+from apps.lexicon.tasks import (
+    queue_hunspell_rebuild,
+    update_entry_hunspell_forms,
+    update_lexicon_entry_search_field,
+)
+from apps.lexicon.utils.hunspell_pool import affix_key
 
 log = logging.getLogger("lexicon")
 
@@ -87,31 +96,98 @@ WORDCHARS -
 
 NOSUGGEST !""",
     )
+    hunspell_forms_affix_hash = models.CharField(
+        max_length=40,
+        blank=True,
+        null=True,
+        editable=False,
+        help_text="Hash of the affix file the generated hunspell forms were built with",
+    )
+    conjugation_storage = models.CharField(
+        max_length=4,
+        choices=[
+            ("rows", "A row per conjugation"),
+            ("grid", "A row per conjugation grid"),
+        ],
+        default="rows",
+        editable=False,
+        help_text="How conjugations are stored, change it with convert_conjugation_storage",
+    )
+    modified = models.DateTimeField(
+        auto_now=True,
+        help_text="When any of the project's content last changed, used to validate cached pages",
+    )
 
     # methods
 
     def increment_version(self):
-        """Helper function to increment the version number by 1."""
-        self.version += 1
-        self.save()
+        """Helper function to increment the version number by 1.
+
+        Only the version and modified time are written, in the database, so the
+        rest of a stale instance doesn't overwrite newer values."""
+        self.version = models.F("version") + 1
+        self.save(update_fields=["version", "modified"])
+        self.refresh_from_db(fields=["version", "modified"])
         return self.version
 
     def save(self, *args, **kwargs):
         """Overwrite save method to increment version on affix file change."""
 
         original_affix_file = None
-        if self.pk:
+        affix_file_changed = False
+        update_fields = kwargs.get("update_fields")
+        if self.pk and (update_fields is None or "affix_file" in update_fields):
             try:
                 original_affix_file = LexiconProject.objects.get(pk=self.pk).affix_file
                 if self.affix_file != original_affix_file:
                     # Don't call the helper function to avoid recursion
                     self.version += 1
+                    affix_file_changed = True
             except LexiconProject.DoesNotExist:
                 # Should not happen if self.pk exists, but defensive
                 pass
 
         super(LexiconProject, self).save(*args, **kwargs)
 
+        if affix_file_changed:
+            # Every generated form may have changed, they're rebuilt in bulk in the
+            # background and expanded on the fly until then
+            LexiconProject.objects.filter(pk=self.pk).update(
+                hunspell_forms_affix_hash=None
+            )
+            self.hunspell_forms_affix_hash = None
+            queue_hunspell_rebuild(self.language_code)
+
+    def ensure_hunspell_forms(self) -> bool:
+        """Return True if the generated hunspell forms are current, else queue a rebuild.
+
+        The forms are marked stale by clearing hunspell_forms_affix_hash, e.g. when
+        an affix is deleted or a project is imported in bulk. The rebuild runs in
+        the background, until it finishes callers serve the stale forms or expand
+        the words they need on the fly."""
+        key = affix_key(self.affix_file)
+        if self.hunspell_forms_affix_hash == key:
+            return True
+        # A rebuild may have finished since this project was read
+        self.hunspell_forms_affix_hash = (
+            LexiconProject.objects.filter(pk=self.pk)
+            .values_list("hunspell_forms_affix_hash", flat=True)
+            .first()
+        )
+        if self.hunspell_forms_affix_hash == key:
+            return True
+        queue_hunspell_rebuild(self.language_code)
+        return False
+
+    def known_words(self, words) -> set[str]:
+        """Return the words that are an entry or one of its generated forms."""
+        self.ensure_hunspell_forms()
+        return set(
+            HunspellForm.objects.filter(
+                entry__project=self, normalized__in=[w.lower() for w in words]
+            ).values_list("normalized", flat=True)
+        )
+
     def __str__(self):
         """What Python calls this object when it shows it on screen."""
         return f"{self.language_name} lexicon project"
@@ -133,6 +209,14 @@ NOSUGGEST !""",
         ordering = ["language_name"]
 
 
+def mark_projects_modified(**filters) -> None:
+    """Bump the modified time of the projects matching the filters.
+
+    LexiconProject.save() does this itself, this is for writes that change what
+    a project's pages show without saving the project, e.g. bulk updates."""
+    LexiconProject.objects.filter(**filters).update(modified=timezone.now())
+
+
 class LexiconEntry(models.Model):
     "A representation of a word in a lexicon project."
 
@@ -265,7 +349,8 @@ class LexiconEntry(models.Model):
                 # Should not happen if self.pk exists, but defensive
                 pass
 
-        self.project.save()  # Save the project to update its version
+        # Mark the project modified, only that field so a stale project isn't written back
+        self.project.save(update_fields=["modified"])
         # Perform the actual save first to ensure it's in the DB
         # and to catch any integrity errors before updating project version.
         super(LexiconEntry, self).save(*args, **kwargs)
@@ -275,17 +360,23 @@ class LexiconEntry(models.Model):
         # Don;t trigger side effects if skip_side_effects is True (e.g., when called from a data migration)
         if not skip_side_effects:
             increment_version = False
+            text_changed = False
 
             if not original_values:
                 increment_version = True  # This is a new entry
+                text_changed = True
             elif original_values["text"] != self.text:
                 increment_version = True
+                text_changed = True
             elif original_values["checked"] != self.checked:
                 increment_version = True
 
             if increment_version:
                 self.project.increment_version()
 
+            if text_changed:
+                update_entry_hunspell_forms(self.pk)
+
             # trigger a celery task to update the search field
             update_lexicon_entry_search_field(self.pk)
 
@@ -294,6 +385,20 @@ class LexiconEntry(models.Model):
         self.project.increment_version()
         return super().delete()
 
+    def conjugation_cells(self) -> list[tuple[int, int, int, str]]:
+        """Return (paradigm pk, row, column, text) for each of the entry's filled
+        conjugation cells, whichever layout the project stores them in.
+
+        Prefetch "conjugations" and "conjugation_grids" to avoid queries per entry."""
+        cells = [
+            (c.paradigm_id, c.row, c.column, c.conjugation)
+            for c in self.conjugations.all()
+            if c.conjugation
+        ]
+        for grid in self.conjugation_grids.all():
+            cells.extend((grid.paradigm_id, *cell) for cell in grid.filled_cells())
+        return cells
+
     class Meta:
         ordering = ["text"]
         constraints = [
@@ -305,6 +410,43 @@ class LexiconEntry(models.Model):
         indexes = [models.Index(fields=["search"])]
 
 
+class HunspellForm(models.Model):
+    """A surface form generated from an entry by Hunspell affix expansion.
+
+    The forms are a materialized copy of the unmunch output for the entry, its
+    conjugations and its spellcheck variations, so they can be searched, counted
+    and exported without expanding the affix file on the fly."""
+
+    entry = models.ForeignKey(
+        LexiconEntry, on_delete=models.CASCADE, related_name="hunspell_forms"
+    )
+    form = models.CharField(max_length=255, help_text="The generated word.")
+    normalized = models.CharField(
+        max_length=255,
+        editable=False,
+        default="",
+        help_text="The form in lower case, used to look words up.",
+    )
+    affix_letter = models.CharField(
+        max_length=10,
+        blank=True,
+        default="",
+        help_text="The affix flags that generated this form, blank for root words.",
+    )
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Hunspell form: {self.form} of {self.entry.text}"
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["entry", "form"], name="unique_hunspell_form_per_entry"
+            )
+        ]
+        indexes = [models.Index(fields=["normalized"])]
+
+
 class Sense(models.Model):
     """A sense of a LexiconEntry, representing a specific meaning or usage of the word."""
 
@@ -616,6 +758,82 @@ class Conjugation(models.Model):
         verbose_name_plural = "Conjugations"
 
 
+class ConjugationGrid(models.Model):
+    """
+    Every cell of a word's paradigm grid stored in a single row.
+
+    Projects with conjugation_storage set to "grid" use these instead of a
+    Conjugation per cell. The cells are a list of rows, each a list of strings,
+    with blank strings for empty cells.
+    """
+
+    word = models.ForeignKey(
+        LexiconEntry,
+        on_delete=models.CASCADE,
+        help_text="The word that this grid belongs to.",
+        related_name="conjugation_grids",
+    )
+    paradigm = models.ForeignKey(
+        Paradigm,
+        on_delete=models.CASCADE,
+        help_text="The paradigm that defines the grid structure.",
+    )
+    cells = models.JSONField(
+        default=list, help_text="The conjugated forms as a list of rows."
+    )
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Conjugation grid for {self.word} in {self.paradigm}"
+
+    def filled_cells(self) -> list[tuple[int, int, str]]:
+        """Return (row, column, text) for every non blank cell."""
+        return [
+            (row, column, text)
+            for row, cells in enumerate(self.cells)
+            for column, text in enumerate(cells)
+            if text
+        ]
+
+    class Meta:
+        constraints = [
+            models.UniqueConstraint(
+                fields=["word", "paradigm"], name="unique_conjugation_grid"
+            )
+        ]
+
+
+def read_conjugation_cells(
+    layout: str | None = None, **filters
+) -> list[tuple[int, int, int, int, str]]:
+    """Return (word pk, paradigm pk, row, column, text) for the filled conjugation
+    cells matching the filters.
+
+    The filters are applied to Conjugation and ConjugationGrid alike, so they can
+    only use the word and paradigm fields. Both storage layouts are read, taking
+    a query each, unless the caller knows the project's layout and passes it."""
+    cells = []
+    if layout != "grid":
+        cells.extend(
+            Conjugation.objects.filter(**filters)
+            .exclude(conjugation="")
+            .order_by("pk")
+            .values_list("word_id", "paradigm_id", "row", "column", "conjugation")
+        )
+    if layout == "rows":
+        return cells
+    for word_id, paradigm_id, matrix in ConjugationGrid.objects.filter(
+        **filters
+    ).values_list("word_id", "paradigm_id", "cells"):
+        cells.extend(
+            (word_id, paradigm_id, row, column, text)
+            for row, texts in enumerate(matrix)
+            for column, text in enumerate(texts)
+            if text
+        )
+    return cells
+
+
 class Affix(models.Model):
     """Represents an affix that can be used in a lexicon project."""
 
@@ -653,3 +871,215 @@ class Affix(models.Model):
                 name="unique_affix_letter_per_project",
             )
         ]
+
+
+class DuplicateScan(models.Model):
+    """The progress of the latest near duplicate search for a project."""
+
+    project = models.OneToOneField(
+        LexiconProject, on_delete=models.CASCADE, related_name="duplicate_scan"
+    )
+    status = models.CharField(
+        max_length=7,
+        choices=(
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ),
+        default="pending",
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0, help_text="Percentage of entries compared so far."
+    )
+    started = models.DateTimeField(null=True, blank=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Duplicate scan for {self.project.language_name}: {self.status}"
+
+
+class DuplicateCandidate(models.Model):
+    """A pair of entries whose spellings are nearly the same."""
+
+    project = models.ForeignKey(
+        LexiconProject, on_delete=models.CASCADE, related_name="duplicate_candidates"
+    )
+    entry = models.ForeignKey(LexiconEntry, on_delete=models.CASCADE, related_name="+")
+    duplicate = models.ForeignKey(
+        LexiconEntry, on_delete=models.CASCADE, related_name="+"
+    )
+    similarity = models.FloatField(
+        help_text="1 for spellings that only differ by diacritics or case."
+    )
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Possible duplicate: {self.entry.text} and {self.duplicate.text}"
+
+    class Meta:
+        ordering = ["-similarity", "pk"]
+        constraints = [
+            models.UniqueConstraint(
+                fields=["entry", "duplicate"], name="unique_duplicate_candidate"
+            )
+        ]
+
+
+class GenerationTemplate(models.Model):
+    """Rules for filling a paradigm's grid from each entry's headword.
+
+    Each cell rule is written like "{stem}am", with optional regex substitutions
+    applied afterwards, e.g. "{stem}im / ii>i"."""
+
+    paradigm = models.OneToOneField(
+        Paradigm, on_delete=models.CASCADE, related_name="generation_template"
+    )
+    stem_pattern = models.CharField(
+        max_length=100,
+        blank=True,
+        help_text="An optional regex with one (group) that finds the stem of a headword, e.g. ^(.*)ol$. Words it doesn't match are skipped. If blank the whole headword is the stem.",
+    )
+    cell_rules = models.JSONField(
+        default=list, help_text="A rule for each cell, as a list of rows."
+    )
+    status = models.CharField(
+        max_length=7,
+        choices=(
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ),
+        blank=True,
+    )
+    report = models.JSONField(null=True, blank=True)
+    last_run = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Generation template for {self.paradigm}"
+
+
+class ExportJob(models.Model):
+    """An export built in the background, kept for download for a while after.
+
+    A request for the same export of the same project version reuses the job."""
+
+    project = models.ForeignKey(
+        LexiconProject, on_delete=models.CASCADE, related_name="export_jobs"
+    )
+    export_type = models.CharField(
+        max_length=3,
+        choices=(
+            ("oxt", "Libre office .oxt"),
+            ("dic", "Word .dic"),
+            ("xml", "Paratext .xml"),
+            ("zip", "Spell check bundle .zip"),
+            ("jsn", "Lexicon app .json"),
+        ),
+    )
+    checked = models.BooleanField(default=True)
+    hunspell = models.BooleanField(default=True)
+    ignore_words = models.BooleanField(default=True)
+    project_version = models.IntegerField(
+        help_text="The project version the export was requested for."
+    )
+    project_modified = models.DateTimeField(
+        help_text="When the project last changed at the time of the request, a .json export includes everything."
+    )
+    status = models.CharField(
+        max_length=7,
+        choices=(
+            ("pending", "Pending"),
+            ("running", "Running"),
+            ("done", "Done"),
+            ("failed", "Failed"),
+        ),
+        default="pending",
+    )
+    progress = models.PositiveSmallIntegerField(
+        default=0, help_text="Percentage of the export built so far."
+    )
+    artifact = models.CharField(
+        max_length=255, blank=True, help_text="Path of the finished export file."
+    )
+    size = models.PositiveBigIntegerField(
+        null=True, blank=True, help_text="Size of the export file in bytes."
+    )
+    duration = models.DurationField(null=True, blank=True)
+    created = models.DateTimeField(auto_now_add=True)
+    finished = models.DateTimeField(null=True, blank=True)
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return (
+            f"{self.get_export_type_display()} export of {self.project}: {self.status}"
+        )
+
+    @property
+    def expires(self):
+        """When the export is removed, None if it isn't finished."""
+        if self.finished is None:
+            return None
+        return self.finished + timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+
+    @property
+    def downloadable(self) -> bool:
+        return (
+            self.status == "done"
+            and self.expires > timezone.now()
+            and os.path.exists(self.artifact)
+        )
+
+    class Meta:
+        ordering = ["-created"]
+
+
+class ExportArtifact(models.Model):
+    """A file kept in the export folder, indexed so the folder can be kept to a size.
+
+    last_used is updated each time the file is built or downloaded, the least
+    recently used files are removed first."""
+
+    path = models.CharField(max_length=255, unique=True)
+    project = models.ForeignKey(
+        LexiconProject,
+        on_delete=models.CASCADE,
+        related_name="export_artifacts",
+        null=True,
+        blank=True,
+    )
+    version = models.IntegerField(
+        null=True, blank=True, help_text="The project version the file was built from."
+    )
+    size = models.PositiveBigIntegerField(help_text="Size of the file in bytes.")
+    created = models.DateTimeField(auto_now_add=True)
+    last_used = models.DateTimeField(default=timezone.now)
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return self.path
+
+    class Meta:
+        ordering = ["last_used"]
+
+
+class ParatextMerge(models.Model):
+    """A merge of the lexicon into a Paratext SpellingStatus.xml file.
+
+    Recorded so the next merge can apply only the lexicon changes made since."""
+
+    project = models.ForeignKey(
+        LexiconProject, on_delete=models.CASCADE, related_name="paratext_merges"
+    )
+    version = models.IntegerField(help_text="The project version that was merged.")
+    created = models.DateTimeField(auto_now_add=True)
+
+    def __str__(self):
+        """What Python calls this object when it shows it on screen."""
+        return f"Paratext merge of {self.project} version {self.version}"
+
+    class Meta:
+        ordering = ["-created"]
@@ -2,23 +2,148 @@
 
 import logging
 
+from django.core.cache import cache
 from django.core.exceptions import PermissionDenied
 from django.http import HttpResponse
+from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
+from guardian.shortcuts import get_objects_for_user
+
+from apps.lexicon import models
 
 log = logging.getLogger("lexicon")
 
+EDIT_PERMISSION = "edit_lexiconproject"
+# Invalidation is by signal, the timeout only limits how long a permission
+# granted without signals (e.g. a bulk assign_perm) can be missed
+PERMISSION_CACHE_SECONDS = 600
+GLOBAL_GENERATION_KEY = "project-permissions-generation:all"
+
+
+def get_request_project(request, lang_code: str) -> models.LexiconProject:
+    """Return the project for a language code, looked up once per request.
+
+    Views and mixins call get_project() several times while handling a request,
+    so the project is kept on the request rather than fetched each time."""
+    projects = request.__dict__.setdefault("_lexicon_projects", {})
+    if lang_code not in projects:
+        projects[lang_code] = get_object_or_404(
+            models.LexiconProject, language_code=lang_code
+        )
+    return projects[lang_code]
+
+
+def _generation_key(project_pk: int) -> str:
+    return f"project-permissions-generation:{project_pk}"
+
+
+def invalidate_project_permissions(project_pk: int | None = None) -> None:
+    """Forget the cached permissions of a project, or of every project if None.
+
+    Each cache key includes a generation counter, so bumping it is enough to
+    make every user's cached result for the project stale."""
+    key = GLOBAL_GENERATION_KEY if project_pk is None else _generation_key(project_pk)
+    try:
+        cache.incr(key)
+    except ValueError:
+        cache.set(key, 1, None)
+
+
+def _permission_keys(user, project_pks, permission: str) -> dict[int, str]:
+    """Return the cache key of each project's permission for the user."""
+    generations = cache.get_many(
+        [GLOBAL_GENERATION_KEY, *(_generation_key(pk) for pk in project_pks)]
+    )
+    global_generation = generations.get(GLOBAL_GENERATION_KEY, 0)
+    return {
+        pk: (
+            f"project-permission:{permission}:{user.pk}:{pk}:"
+            f"{global_generation}:{generations.get(_generation_key(pk), 0)}"
+        )
+        for pk in project_pks
+    }
+
+
+def _is_cacheable(user) -> bool:
+    # Anonymous, inactive and superusers are answered without queries anyway
+    return user.is_authenticated and user.is_active and not user.is_superuser
+
+
+def has_project_permission(
+    request, project: models.LexiconProject, permission: str = EDIT_PERMISSION
+) -> bool:
+    """Check a user's object permission on a project.
+
+    The result is memoized for the request and cached across requests until
+    the project's guardian permissions or the user's groups change."""
+    checked = request.__dict__.setdefault("_lexicon_permissions", {})
+    key = (permission, project.pk)
+    if key not in checked:
+        user = request.user
+        if _is_cacheable(user):
+            cache_key = _permission_keys(user, [project.pk], permission)[project.pk]
+            allowed = cache.get(cache_key)
+            if allowed is None:
+                allowed = user.has_perm(permission, project)
+                cache.set(cache_key, allowed, PERMISSION_CACHE_SECONDS)
+        else:
+            allowed = user.has_perm(permission, project)
+        checked[key] = allowed
+    return checked[key]
+
+
+def prefetch_project_permissions(
+    request, projects, permission: str = EDIT_PERMISSION
+) -> set[int]:
+    """Return the pks of the projects the user has the permission for.
+
+    Projects missing from the cache are checked together in one query rather
+    than once each, and the results are memoized like has_project_permission."""
+    user = request.user
+    if not _is_cacheable(user):
+        return {
+            project.pk
+            for project in projects
+            if has_project_permission(request, project, permission)
+        }
+
+    checked = request.__dict__.setdefault("_lexicon_permissions", {})
+    pks = [project.pk for project in projects]
+    keys = _permission_keys(user, pks, permission)
+    cached = cache.get_many(keys.values())
+    allowed = {pk: cached[key] for pk, key in keys.items() if key in cached}
+
+    missing = [pk for pk in pks if pk not in allowed]
+    if missing:
+        permitted = set(
+            get_objects_for_user(
+                user,
+                permission,
+                klass=models.LexiconProject.objects.filter(pk__in=missing),
+                accept_global_perms=False,
+            ).values_list("pk", flat=True)
+        )
+        for pk in missing:
+            allowed[pk] = pk in permitted
+        cache.set_many(
+            {keys[pk]: allowed[pk] for pk in missing}, PERMISSION_CACHE_SECONDS
+        )
+
+    for pk, value in allowed.items():
+        checked[(permission, pk)] = value
+    return {pk for pk, value in allowed.items() if value}
+
 
 class ProjectEditPermissionRequiredMixin:
     """A mixin to check if the user has permission to edit a lexicon project.
 
     Should also inherit ProjectContextMixin to provide project context."""
 
-    permission_required = "edit_lexiconproject"
+    permission_required = EDIT_PERMISSION
 
     def has_project_permission(self):
         project = self.get_project()
-        return self.request.user.has_perm(self.permission_required, project)
+        return has_project_permission(self.request, project, self.permission_required)
 
     def dispatch(self, request, *args, **kwargs):
         if not self.has_project_permission():
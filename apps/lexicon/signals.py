@@ -1,6 +1,44 @@
-from django.db.models.signals import m2m_changed
+from contextlib import contextmanager
+from contextvars import ContextVar
+
+from django.contrib.auth import get_user_model
+from django.contrib.contenttypes.models import ContentType
+from django.db import transaction
+from django.db.models import QuerySet
+from django.db.models.signals import m2m_changed, post_delete, post_save
 from django.dispatch import receiver
-from apps.lexicon.models import LexiconEntry
+from guardian.utils import get_group_obj_perms_model, get_user_obj_perms_model
+
+from apps.lexicon.models import (
+    Affix,
+    Conjugation,
+    LexiconEntry,
+    LexiconProject,
+    Paradigm,
+    Sense,
+    Variation,
+    mark_projects_modified,
+)
+from apps.lexicon.conditional import forget_project_version
+from apps.lexicon.permissions import invalidate_project_permissions
+from apps.lexicon.tasks import update_entry_hunspell_forms
+
+# Set while conjugations are written in bulk by code that refreshes the forms itself
+_bulk_conjugation_write = ContextVar("bulk_conjugation_write", default=False)
+
+
+@contextmanager
+def bulk_conjugation_write():
+    """Skip the per row hunspell form updates of conjugation and variation deletes.
+
+    Only use this where the caller refreshes the affected entries' forms, or marks
+    them stale, once the write is done."""
+    token = _bulk_conjugation_write.set(True)
+    try:
+        yield
+    finally:
+        _bulk_conjugation_write.reset(token)
+
 
 @receiver(m2m_changed, sender=LexiconEntry.affixes.through)
 @receiver(m2m_changed, sender=LexiconEntry.paradigms.through)
@@ -10,3 +48,96 @@ def lexicon_entry_m2m_changed(sender, instance, action, **kwargs):
     """
     if action in ["post_add", "post_remove", "post_clear"]:
         instance.project.increment_version()
+        if sender is LexiconEntry.affixes.through:
+            # A reverse change (affix.entries.add()) passes the entry pks
+            if kwargs.get("reverse"):
+                entry_pks = kwargs.get("pk_set") or []
+            else:
+                entry_pks = [instance.pk]
+            for entry_pk in entry_pks:
+                update_entry_hunspell_forms(entry_pk)
+
+
+@receiver(post_save, sender=Conjugation)
+@receiver(post_save, sender=Variation)
+@receiver(post_delete, sender=Conjugation)
+@receiver(post_delete, sender=Variation)
+def entry_word_changed(sender, instance, origin=None, **kwargs):
+    """Regenerate an entry's hunspell forms when its conjugations or variations change."""
+    if _bulk_conjugation_write.get():
+        return
+    if origin is not None:
+        origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+        if origin_model in (LexiconEntry, LexiconProject):
+            # The entry is being deleted with it, the forms cascade too
+            return
+    update_entry_hunspell_forms(instance.word_id)
+
+
+@receiver(post_save, sender=Affix)
+@receiver(post_delete, sender=Affix)
+def affix_changed(sender, instance, created=False, **kwargs):
+    """Mark the project's hunspell forms stale when an affix letter changes or is removed.
+
+    The entries using a deleted affix can't be looked up any more, so the forms are
+    rebuilt in bulk the next time they are read."""
+    if created:
+        return
+    LexiconProject.objects.filter(pk=instance.project_id).update(
+        hunspell_forms_affix_hash=None
+    )
+
+
+@receiver(post_save, sender=LexiconProject)
+@receiver(post_delete, sender=LexiconProject)
+def project_saved(sender, instance, **kwargs):
+    """Forget the cached version LibreOffice update polls are answered from.
+
+    It's forgotten again on commit, in case a poll cached the old version while
+    the transaction was open."""
+    forget_project_version(instance.language_code)
+    transaction.on_commit(lambda: forget_project_version(instance.language_code))
+
+
+@receiver(post_save, sender=Sense)
+@receiver(post_save, sender=Variation)
+@receiver(post_save, sender=Affix)
+@receiver(post_save, sender=Paradigm)
+@receiver(post_delete, sender=Sense)
+@receiver(post_delete, sender=Variation)
+@receiver(post_delete, sender=Affix)
+@receiver(post_delete, sender=Paradigm)
+def project_content_changed(sender, instance, origin=None, **kwargs):
+    """Mark the project modified when content shown on its pages changes.
+
+    Entries, conjugations and ignore words do this through the project's version."""
+    if origin is not None:
+        origin_model = origin.model if isinstance(origin, QuerySet) else type(origin)
+        if origin_model in (LexiconEntry, LexiconProject):
+            # Deleting the entry or project marks the project itself
+            return
+    if sender is Sense:
+        mark_projects_modified(entries__pk=instance.entry_id)
+    elif sender is Variation:
+        mark_projects_modified(entries__pk=instance.word_id)
+    else:
+        mark_projects_modified(pk=instance.project_id)
+
+
+@receiver(post_save, sender=get_user_obj_perms_model())
+@receiver(post_save, sender=get_group_obj_perms_model())
+@receiver(post_delete, sender=get_user_obj_perms_model())
+@receiver(post_delete, sender=get_group_obj_perms_model())
+def project_permission_changed(sender, instance, **kwargs):
+    """Forget the cached permissions of a project when guardian assigns or removes one.
+
+    Bulk assigns don't send signals and are picked up when the cache times out."""
+    if instance.content_type_id == ContentType.objects.get_for_model(LexiconProject).pk:
+        invalidate_project_permissions(int(instance.object_pk))
+
+
+@receiver(m2m_changed, sender=get_user_model().groups.through)
+def user_groups_changed(sender, action, **kwargs):
+    """Forget every cached permission when group membership changes."""
+    if action in ["post_add", "post_remove", "post_clear"]:
+        invalidate_project_permissions()
@@ -2,14 +2,19 @@ import csv
 import json
 import logging
 import os
-from datetime import datetime
+import shutil
+from datetime import datetime, timedelta
 
 from celery import shared_task
 from django.conf import settings
+from django.core.cache import cache
 from django.core.management import call_command
-from django.db import DataError, IntegrityError
+from django.db import DataError, IntegrityError, transaction
+from django.utils import timezone
 
 from apps.lexicon import models
+from apps.lexicon.utils.affix_file import AffixFile
+from apps.lexicon.utils.hunspell_pool import affix_key, get_affix_file
 
 log = logging.getLogger("lexicon")
 backup_log = logging.getLogger("lexicon.backup")
@@ -17,6 +22,10 @@ backup_log = logging.getLogger("lexicon.backup")
 BACKUP_DIR = getattr(
     settings, "BACKUP_DIR", os.path.join(settings.BASE_DIR, "data", "backups")
 )
+# Set while a project's hunspell forms are queued for a rebuild, so requests that
+# find them stale don't each queue another. It times out in case a worker dies.
+HUNSPELL_REBUILD_KEY = "hunspell-rebuild-{}"
+HUNSPELL_REBUILD_TIMEOUT = 30 * 60
 
 
 @shared_task
@@ -111,7 +120,7 @@ def update_lexicon_entry_search_field(entry_pk: int) -> None:
     This task is called on LexiconEntry save(), in formset.is_valid() in conjugations and on Variation save()"""
     try:
         entry = models.LexiconEntry.objects.prefetch_related(
-            "variations", "conjugations"
+            "variations", "conjugations", "conjugation_grids"
         ).get(pk=entry_pk)
 
         # Build the search string
@@ -121,8 +130,8 @@ def update_lexicon_entry_search_field(entry_pk: int) -> None:
             if var.included_in_search:
                 search_terms.append(var.text)
 
-        for conj in entry.conjugations.all():
-            search_terms.append(conj.conjugation)
+        for _, _, _, conjugation in entry.conjugation_cells():
+            search_terms.append(conjugation)
 
         new_search_field_value = " ".join(
             filter(None, search_terms)
@@ -158,6 +167,347 @@ def update_project_search_fields(lang_code: str) -> None:
         log.error(f"Error updating search fields for project {lang_code}: {e}")
 
 
+def update_entries_search_fields(entry_pks: list[int], batch_size: int = 1000) -> None:
+    """Update the search field of many entries, building the same string as
+    update_lexicon_entry_search_field.
+
+    This is used after conjugations are written in bulk. The words are read with
+    values_list rather than prefetched model instances and each batch is saved
+    with a single bulk update."""
+    changed_projects = set()
+    for start in range(0, len(entry_pks), batch_size):
+        batch = entry_pks[start : start + batch_size]
+        terms = {}
+        current = {}
+        projects = {}
+        for pk, project_id, text, search in models.LexiconEntry.objects.filter(
+            pk__in=batch
+        ).values_list("pk", "project_id", "text", "search"):
+            terms[pk] = [text]
+            current[pk] = search
+            projects[pk] = project_id
+        for word_id, text in (
+            models.Variation.objects.filter(word_id__in=batch, included_in_search=True)
+            .order_by("pk")
+            .values_list("word_id", "text")
+        ):
+            terms[word_id].append(text)
+        for word_id, _, _, _, conjugation in models.read_conjugation_cells(
+            word_id__in=batch
+        ):
+            terms[word_id].append(conjugation)
+
+        changed = []
+        for pk, search_terms in terms.items():
+            value = " ".join(filter(None, search_terms)).lower()
+            if current[pk] != value:
+                changed.append(models.LexiconEntry(pk=pk, search=value))
+                changed_projects.add(projects[pk])
+        models.LexiconEntry.objects.bulk_update(changed, ["search"])
+    if changed_projects:
+        models.mark_projects_modified(pk__in=changed_projects)
+    log.debug(f"Updated search fields for {len(entry_pks)} entries")
+
+
+def _build_hunspell_forms(
+    entry: "models.LexiconEntry", affix_file: AffixFile
+) -> list["models.HunspellForm"]:
+    """Expand an entry's words with its affixes, ready to be bulk created.
+
+    Expects the entry's affixes, conjugations, conjugation grids and variations
+    to be prefetched."""
+    flags = affix_file.parse_flags("".join(a.affix_letter for a in entry.affixes.all()))
+    roots = [entry.text]
+    roots.extend(text for _, _, _, text in entry.conjugation_cells())
+    roots.extend(v.text for v in entry.variations.all() if v.included_in_spellcheck)
+
+    max_length = models.HunspellForm._meta.get_field("form").max_length
+    forms = {}
+    for root in roots:
+        for form, flag in affix_file.expand(root, flags):
+            # The root keeps its blank flag if an affix regenerates it
+            if len(form) <= max_length:
+                forms.setdefault(form, flag)
+    return [
+        models.HunspellForm(
+            entry=entry, form=form, normalized=form.lower(), affix_letter=flag
+        )
+        for form, flag in forms.items()
+    ]
+
+
+@shared_task
+def update_entry_hunspell_forms(entry_pk: int) -> None:
+    """Regenerate the stored hunspell forms of a single entry.
+
+    This task is called on LexiconEntry text changes, when its affixes change and
+    on Conjugation and Variation save and delete."""
+    try:
+        entry = (
+            models.LexiconEntry.objects.select_related("project")
+            .prefetch_related(
+                "affixes", "conjugations", "conjugation_grids", "variations"
+            )
+            .get(pk=entry_pk)
+        )
+    except models.LexiconEntry.DoesNotExist:
+        log.debug(f"LexiconEntry with pk {entry_pk} not found for hunspell update.")
+        return
+
+    forms = _build_hunspell_forms(entry, get_affix_file(entry.project.affix_file))
+    with transaction.atomic():
+        models.HunspellForm.objects.filter(entry=entry).delete()
+        models.HunspellForm.objects.bulk_create(forms)
+        models.mark_projects_modified(pk=entry.project_id)
+    log.debug(f"Stored {len(forms)} hunspell forms for '{entry_pk}'")
+
+
+def queue_hunspell_rebuild(lang_code: str) -> None:
+    """Rebuild a project's hunspell forms in the background, unless already queued."""
+    if cache.add(
+        HUNSPELL_REBUILD_KEY.format(lang_code), True, HUNSPELL_REBUILD_TIMEOUT
+    ):
+        rebuild_project_hunspell_forms.delay(lang_code)
+
+
+@shared_task
+def rebuild_project_hunspell_forms(lang_code: str, batch_size: int = 1000) -> None:
+    """Regenerate the stored hunspell forms for every entry in a project.
+
+    This is used when the affix file changes, which can change every form. The
+    project row is locked while the forms are replaced, so rebuilds of the same
+    project run one after the other."""
+    count = 0
+    try:
+        with transaction.atomic():
+            try:
+                project = models.LexiconProject.objects.select_for_update().get(
+                    language_code=lang_code
+                )
+            except models.LexiconProject.DoesNotExist:
+                log.debug(
+                    f"LexiconProject with language_code {lang_code} not found for hunspell rebuild."
+                )
+                return
+
+            affix_file = get_affix_file(project.affix_file)
+            entries = models.LexiconEntry.objects.filter(
+                project=project
+            ).prefetch_related(
+                "affixes", "conjugations", "conjugation_grids", "variations"
+            )
+            models.HunspellForm.objects.filter(entry__project=project).delete()
+            batch = []
+            for entry in entries.iterator(chunk_size=batch_size):
+                batch.extend(_build_hunspell_forms(entry, affix_file))
+                if len(batch) >= batch_size:
+                    models.HunspellForm.objects.bulk_create(batch)
+                    count += len(batch)
+                    batch = []
+            models.HunspellForm.objects.bulk_create(batch)
+            count += len(batch)
+            models.LexiconProject.objects.filter(pk=project.pk).update(
+                hunspell_forms_affix_hash=affix_key(project.affix_file),
+                modified=timezone.now(),
+            )
+    finally:
+        cache.delete(HUNSPELL_REBUILD_KEY.format(lang_code))
+    log.info(f"Rebuilt {count} hunspell forms for {lang_code}")
+
+
+@shared_task
+def find_duplicate_entries(lang_code: str) -> None:
+    """Search a project for near duplicate headwords and store them for review.
+
+    Progress is recorded on the project's DuplicateScan as the entries are compared."""
+    from apps.lexicon.utils.duplicates import find_duplicate_pairs
+
+    try:
+        project = models.LexiconProject.objects.get(language_code=lang_code)
+    except models.LexiconProject.DoesNotExist:
+        log.debug(
+            f"LexiconProject with language_code {lang_code} not found for duplicate search."
+        )
+        return
+
+    scan, _ = models.DuplicateScan.objects.update_or_create(
+        project=project,
+        defaults={
+            "status": "running",
+            "progress": 0,
+            "started": timezone.now(),
+            "finished": None,
+        },
+    )
+
+    def record_progress(fraction):
+        models.DuplicateScan.objects.filter(pk=scan.pk).update(
+            progress=int(fraction * 100)
+        )
+
+    try:
+        # The older entry of each pair is listed first
+        entries = list(
+            models.LexiconEntry.objects.filter(project=project)
+            .order_by("pk")
+            .values_list("pk", "text")
+        )
+        pairs = find_duplicate_pairs(entries, progress=record_progress)
+        with transaction.atomic():
+            models.DuplicateCandidate.objects.filter(project=project).delete()
+            models.DuplicateCandidate.objects.bulk_create(
+                models.DuplicateCandidate(
+                    project=project,
+                    entry_id=entry_pk,
+                    duplicate_id=duplicate_pk,
+                    similarity=similarity,
+                )
+                for entry_pk, duplicate_pk, similarity in pairs
+            )
+    except Exception as e:
+        log.error(f"Error searching for duplicates in {lang_code}: {e}")
+        models.DuplicateScan.objects.filter(pk=scan.pk).update(
+            status="failed", finished=timezone.now()
+        )
+        return
+
+    models.DuplicateScan.objects.filter(pk=scan.pk).update(
+        status="done", progress=100, finished=timezone.now()
+    )
+    log.info(f"Found {len(pairs)} possible duplicates in {lang_code}")
+
+
+@shared_task
+def generate_paradigm_conjugations(template_pk: int) -> None:
+    """Fill a paradigm's empty cells for all its entries from a generation template.
+
+    The report of what was created and any conflicts is stored on the template."""
+    from apps.lexicon.utils.paradigm_generator import (
+        GenerationRuleError,
+        generate_conjugations,
+    )
+
+    try:
+        template = models.GenerationTemplate.objects.select_related(
+            "paradigm__project"
+        ).get(pk=template_pk)
+    except models.GenerationTemplate.DoesNotExist:
+        log.debug(f"GenerationTemplate with pk {template_pk} not found.")
+        return
+
+    models.GenerationTemplate.objects.filter(pk=template_pk).update(status="running")
+    try:
+        report = generate_conjugations(template)
+        status = "done"
+    except GenerationRuleError as e:
+        report = {"error": str(e)}
+        status = "failed"
+    except Exception as e:
+        log.error(f"Error generating conjugations for {template.paradigm}: {e}")
+        report = {"error": "Generating the conjugations failed."}
+        status = "failed"
+    models.GenerationTemplate.objects.filter(pk=template_pk).update(
+        status=status, report=report, last_run=timezone.now()
+    )
+
+
+@shared_task
+def run_export_job(job_pk: int, base_url: str = "") -> None:
+    """Build the file for an ExportJob and keep it for download.
+
+    Each job's file is written straight to its own folder, as the shared path per
+    project version is the same whatever the options."""
+    from apps.lexicon.utils import export, export_store
+
+    try:
+        job = models.ExportJob.objects.select_related("project").get(pk=job_pk)
+    except models.ExportJob.DoesNotExist:
+        log.debug(f"ExportJob with pk {job_pk} not found.")
+        return
+
+    models.ExportJob.objects.filter(pk=job_pk).update(status="running")
+    started = timezone.now()
+
+    def record_progress(fraction):
+        models.ExportJob.objects.filter(pk=job_pk).update(
+            progress=min(int(fraction * 100), 99)
+        )
+
+    try:
+        job_folder = os.path.join(export.export_folder, "jobs", str(job_pk))
+        os.makedirs(job_folder, exist_ok=True)
+        artifact = export.export_entries(
+            job.export_type,
+            job.project,
+            None,
+            checked=job.checked,
+            hunspell=job.hunspell,
+            ignore_word_flag=job.ignore_words,
+            base_url=base_url,
+            progress=record_progress,
+            path=os.path.join(
+                job_folder, export.get_export_filename(job.project, job.export_type)
+            ),
+        )
+        export_store.record_artifact(artifact, job.project, job.project_version)
+    except Exception as e:
+        log.error(f"Error in export job {job_pk} for {job.project}: {e}")
+        shutil.rmtree(job_folder, ignore_errors=True)
+        models.ExportJob.objects.filter(pk=job_pk).update(
+            status="failed", finished=timezone.now()
+        )
+        return
+
+    finished = timezone.now()
+    models.ExportJob.objects.filter(pk=job_pk).update(
+        status="done",
+        progress=100,
+        artifact=artifact,
+        size=os.path.getsize(artifact),
+        duration=finished - started,
+        finished=finished,
+    )
+    log.info(f"Finished export job {job_pk} for {job.project} in {finished - started}")
+
+
+@shared_task
+def remove_expired_exports() -> None:
+    """Delete export jobs and their files once they are past the retention period.
+
+    Jobs that never finished are removed after the same time."""
+    from apps.lexicon.utils import export, export_store
+
+    cutoff = timezone.now() - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    expired = models.ExportJob.objects.filter(created__lt=cutoff).exclude(
+        finished__gte=cutoff
+    )
+    artifacts = []
+    for job in expired:
+        if not job.artifact:
+            continue
+        artifacts.append(job.artifact)
+        job_folder = os.path.join(export.export_folder, "jobs", str(job.pk))
+        # Older jobs may point at a shared export path, only the file is theirs
+        if os.path.dirname(job.artifact) == job_folder:
+            shutil.rmtree(job_folder, ignore_errors=True)
+        else:
+            try:
+                os.remove(job.artifact)
+            except FileNotFoundError:
+                pass
+    export_store.forget_artifacts(artifacts)
+    count, _ = expired.delete()
+    log.info(f"Removed {count} expired exports")
+
+
+@shared_task
+def enforce_export_store_budget() -> None:
+    """Remove the least recently used export files while the folder is over budget."""
+    from apps.lexicon.utils import export_store
+
+    export_store.enforce_budget()
+
+
 @shared_task
 def backup_projects() -> None:
     """Runs the export project management command to backup all projects as .json files.
@@ -215,13 +565,15 @@ def backup_projects() -> None:
             # but export_project command prepends "data/".
 
             # Since the management command is simple, let's just use the utility it uses.
-            from apps.lexicon.utils.project_import_export import export_project_to_json
+            from apps.lexicon.utils.project_import_export import write_project_json
 
             try:
-                data = export_project_to_json(project.pk)
                 output_path = os.path.join(project_backup_dir, filename)
-                with open(output_path, "w", encoding="utf-8") as f:
-                    f.write(data)
+                # Written as it's read, so moved into place once complete
+                temp_path = f"{output_path}.tmp"
+                with open(temp_path, "w", encoding="utf-8") as f:
+                    write_project_json(project.pk, f)
+                os.replace(temp_path, output_path)
                 log.info(f"Created backup for {project.language_code} at {output_path}")
                 backup_log.info(
                     f"Created backup for {project.language_code} at {output_path}. Version: {project.version}"
@@ -1,8 +1,30 @@
+import shutil
+import tempfile
+
 import pytest
 from django.contrib.auth.models import User
+from django.core.cache import cache
 from guardian.shortcuts import assign_perm
 
 from apps.lexicon import models
+from apps.lexicon.utils import export
+
+
+@pytest.fixture(autouse=True)
+def clear_cache():
+    """Stop cached results leaking between tests."""
+    cache.clear()
+    yield
+    cache.clear()
+
+
+@pytest.fixture
+def temp_export_folder(monkeypatch):
+    """Temporarily override the export_folder for tests."""
+    temp_dir = tempfile.mkdtemp()
+    monkeypatch.setattr(export, "export_folder", temp_dir)
+    yield temp_dir
+    shutil.rmtree(temp_dir)
 
 
 @pytest.fixture
@@ -0,0 +1,67 @@
+import re
+
+from apps.lexicon.utils.affix_analyzer import analyze_affix_file, rule_match_regex
+from apps.lexicon.utils.affix_file import parse_affix_file
+
+AFF = """SFX A Y 2
+SFX A 0 yam .
+SFX A o im o
+
+SFX B Y 2
+SFX B 0 s .
+
+PFX C Y 1
+PFX C 0 re .
+"""
+
+
+def messages(report):
+    return [(f.line, f.message) for f in report.findings]
+
+
+def test_rule_match_regex_matches_applies_to():
+    """Test that the joined word regex agrees with AffixRule.applies_to()."""
+    words = ["hobolo", "bili", "o", "ato", "ra"]
+    affix_file = parse_affix_file(
+        "SFX A Y 3\nSFX A o im o\nSFX A 0 s [^i]\nSFX A 0 k .\n"
+        "PFX B Y 2\nPFX B r 0 r\nPFX B 0 a [^a]"
+    )
+    text = "\n".join(words)
+    for block in affix_file.blocks:
+        for rule in block.rules:
+            matched = re.findall(rule_match_regex(rule), text, re.MULTILINE)
+            assert matched == [w for w in words if rule.applies_to(w)]
+
+
+def test_analyzer_reports_problems():
+    """Test that syntax, count, flag and matching problems are all reported."""
+    report = analyze_affix_file(
+        AFF + "SFX D 0 s .",
+        affix_letters={"A", "B", "E"},
+        used_letters={"A"},
+        words=["hobol", "bili"],
+    )
+    assert messages(report) == [
+        (3, "SFX A rule 'o im o' doesn't match any project words"),
+        (5, "SFX B declares 2 rules but has 1"),
+        (5, "SFX B isn't used by any words"),
+        (8, "PFX C has no affix in the project, so it can't be given to words"),
+        (10, "Rule for SFX D has no header line"),
+        (None, "Affix E has no PFX or SFX rules in the affix file"),
+    ]
+    assert len(report.errors) == 3
+
+
+def test_analyzer_only_rechecks_changed_blocks():
+    """Test that unchanged blocks reuse their cached match results."""
+    kwargs = dict(affix_letters={"A", "B", "C"}, used_letters=set(), words=["bili"])
+    report = analyze_affix_file(AFF, words_key="1:1", **kwargs)
+    assert (report.blocks_checked, report.blocks_cached) == (3, 0)
+
+    edited = AFF.replace("SFX B 0 s .", "SFX B 0 s i")
+    report = analyze_affix_file(edited, words_key="1:1", **kwargs)
+    assert (report.blocks_checked, report.blocks_cached) == (1, 2)
+
+    # A new word list invalidates every block
+    report = analyze_affix_file(edited, words_key="1:2", **kwargs)
+    assert (report.blocks_checked, report.blocks_cached) == (3, 0)
@@ -0,0 +1,180 @@
+import shutil
+import subprocess
+
+import pytest
+
+from apps.lexicon.utils.affix_file import (
+    condition_to_regex,
+    expand_dic,
+    parse_affix_file,
+)
+
+AFF = """SET UTF-8
+
+PFX A Y 1
+PFX A 0 re .
+
+SFX B Y 3
+SFX B 0 ed [^y]
+SFX B 0 ed [aeiou]y
+SFX B y ied [^aeiou]y
+
+SFX C N 1
+SFX C 0 s .
+"""
+
+
+@pytest.fixture
+def affix_file():
+    return parse_affix_file(AFF)
+
+
+def test_parse_affix_file_blocks(affix_file):
+    """Test that headers and rules are grouped into blocks."""
+    assert affix_file.errors == []
+    assert [b.flag for b in affix_file.blocks] == ["A", "B", "C"]
+    assert len(affix_file.suffixes["B"]) == 3
+    assert affix_file.flags == {"A", "B", "C"}
+
+
+def test_parse_affix_file_records_errors():
+    """Test that rules without a header are reported, not raised."""
+    affix_file = parse_affix_file("SFX Z 0 s .\nSFX Y Y 1\nSFX Y 0 [a .")
+    lines = [line for line, _ in affix_file.errors]
+    assert lines == [1]
+    assert affix_file.suffixes["Y"][0].condition == "."
+
+
+def test_condition_to_regex():
+    """Test conversion of hunspell conditions."""
+    assert condition_to_regex(".") == ""
+    assert condition_to_regex("[^y]") == "[^y]"
+    with pytest.raises(ValueError):
+        condition_to_regex("[ab")
+
+
+def test_expand_suffix_conditions(affix_file):
+    """Test that suffix conditions and strip fields are respected."""
+    assert expand_dic("play/B", affix_file) == ["play", "played"]
+    assert expand_dic("cry/B", affix_file) == ["cry", "cried"]
+
+
+def test_expand_cross_product(affix_file):
+    """Test that cross product prefixes combine with suffixes."""
+    words = expand_dic("2\nplay/AB\nwalk/AC", affix_file)
+    assert words == [
+        "play",
+        "played",
+        "replayed",
+        "replay",
+        "walk",
+        "walks",
+        "rewalk",
+    ]
+
+
+def test_expand_max_forms(affix_file):
+    """Test that expansion stops at max_forms."""
+    assert expand_dic("play/AB", affix_file, max_forms=2) == ["play", "played"]
+
+
+def test_long_flags():
+    """Test that FLAG long splits flags into pairs."""
+    affix_file = parse_affix_file("FLAG long\nSFX Aa Y 1\nSFX Aa 0 s .")
+    assert affix_file.parse_flags("AaBb") == ["Aa", "Bb"]
+    assert expand_dic("cat/Aa", affix_file) == ["cat", "cats"]
+
+
+# An affix file using cross products, conditions and strip rules, with what
+# unmunch prints for PARITY_DIC. The T rule's condition doesn't cover its strip
+# field, unmunch removes the last character anyway. test_unmunch_output_is_current
+# checks the output against the binary wherever it is installed, regenerate it with
+# `unmunch parity.dic parity.aff` if the files change.
+PARITY_AFF = """SET UTF-8
+
+PFX A Y 1
+PFX A 0 re .
+
+PFX U N 1
+PFX U 0 un .
+
+PFX K Y 1
+PFX K o bo o
+
+SFX B Y 3
+SFX B 0 ed [^y]
+SFX B 0 ed [aeiou]y
+SFX B y ied [^aeiou]y
+
+SFX S Y 2
+SFX S 0 s [^sxy]
+SFX S y ies [^aeiou]y
+
+SFX N N 1
+SFX N e ing e
+
+SFX T Y 1
+SFX T y ies [^aeiou]
+"""
+
+PARITY_DIC = """10
+play/ABS
+cry/BSU
+walk/AUS
+bake/NA
+box/S
+ok/K
+ay/B
+y/S
+tidy/T
+ask/T
+"""
+
+UNMUNCH_OUTPUT = """play
+played
+replayed
+replay
+cry
+cried
+cries
+uncry
+walk
+walks
+rewalks
+rewalk
+unwalk
+bake
+baking
+rebake
+box
+ok
+bok
+ay
+ayed
+y
+tidy
+tidies
+ask
+asies
+"""
+
+
+def test_expand_matches_unmunch():
+    """Test that the port gives the words unmunch does for a non-trivial file."""
+    words = expand_dic(PARITY_DIC, parse_affix_file(PARITY_AFF))
+    assert words == UNMUNCH_OUTPUT.split()
+
+
+@pytest.mark.skipif(shutil.which("unmunch") is None, reason="unmunch not installed")
+def test_unmunch_output_is_current(tmp_path):
+    """Test the recorded output against the unmunch binary, where it's installed."""
+    (tmp_path / "parity.dic").write_text(PARITY_DIC, encoding="utf-8")
+    (tmp_path / "parity.aff").write_text(PARITY_AFF, encoding="utf-8")
+    result = subprocess.run(
+        ["unmunch", "parity.dic", "parity.aff"],
+        cwd=tmp_path,
+        capture_output=True,
+        check=True,
+        text=True,
+    )
+    assert result.stdout.split() == UNMUNCH_OUTPUT.split()
@@ -2,6 +2,8 @@ import pytest
 from django.urls import reverse
 
 from apps.lexicon import models
+from apps.lexicon.utils.hunspell_pool import HunspellTimeout
+from apps.lexicon.views import affix_views
 
 
 @pytest.mark.django_db
@@ -40,10 +42,10 @@ class TestAffixFileViews:
 
     def test_affix_results_success(self, client, monkeypatch, english_project, user):
         """Test that the affix results view returns generated words."""
-        # Patch hunspell.unmunch to return a predictable result
+        # Patch hunspell.expand to return a predictable result
         monkeypatch.setattr(
-            "apps.lexicon.utils.hunspell.unmunch",
-            lambda words, affix: ["walked", "walking"]
+            "apps.lexicon.utils.hunspell.expand",
+            lambda words, affix, **kwargs: ["walked", "walking"]
             if words == "walk" and affix == "SFX"
             else [],
         )
@@ -58,7 +60,7 @@ class TestAffixFileViews:
         assert "walking" in response.context["generated_words"]
 
     def test_affix_results_with_unmunch(self, client, project_with_affix_file, user):
-        """Same test but using the unmunch function directly."""
+        """Same test but using the real affix expansion."""
         client.force_login(user)
         url = reverse(
             "lexicon:word_affix_results", args=[project_with_affix_file.language_code]
@@ -75,11 +77,11 @@ class TestAffixFileViews:
     def test_affix_results_error(self, client, monkeypatch, english_project, user):
         """Test that the affix results view handles errors gracefully."""
 
-        # Patch hunspell.unmunch to raise an exception
-        def raise_error(words, affix):
+        # Patch hunspell.expand to raise an exception
+        def raise_error(words, affix, **kwargs):
             raise ValueError("bad affix")
 
-        monkeypatch.setattr("apps.lexicon.utils.hunspell.unmunch", raise_error)
+        monkeypatch.setattr("apps.lexicon.utils.hunspell.expand", raise_error)
         client.force_login(user)
         url = reverse(
             "lexicon:word_affix_results", args=[english_project.language_code]
@@ -92,6 +94,143 @@ class TestAffixFileViews:
         )
         assert "bad affix" in response.json()["details"]
 
+    def test_affix_results_too_many_lines(self, client, english_project, user):
+        """Test that oversized input is refused without expanding it."""
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        words = "\n".join(["walk"] * (affix_views.AFFIX_TESTER_MAX_LINES + 1))
+        response = client.get(url, {"words": words, "affix_file": ""})
+        assert response.status_code == 400
+        assert "Too many test words" in response.content.decode()
+
+    def test_affix_results_timeout(self, client, monkeypatch, english_project, user):
+        """Test that an expansion timing out is reported as a limit error."""
+
+        def time_out(words, affix, **kwargs):
+            raise HunspellTimeout("timed out")
+
+        monkeypatch.setattr("apps.lexicon.utils.hunspell.expand", time_out)
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        response = client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert response.status_code == 400
+        assert "took longer than" in response.content.decode()
+
+    def test_affix_results_pool_crash(self, client, monkeypatch, english_project, user):
+        """Test that a crashing worker pool is reported as a server error."""
+
+        def crash(words, affix, **kwargs):
+            raise RuntimeError("Affix expansion failed, the worker pool keeps crashing")
+
+        monkeypatch.setattr("apps.lexicon.utils.hunspell.expand", crash)
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        response = client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert response.status_code == 500
+        assert "keeps crashing" in response.json()["details"]
+
+    def test_affix_results_requires_login(self, client, english_project):
+        """Test that anonymous users can't run the affix tester."""
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        response = client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert response.status_code == 302
+        assert "login" in response.url
+
+    def test_affix_results_use_the_tester_pool(
+        self, client, monkeypatch, english_project, user
+    ):
+        """Test that the tester doesn't share workers with exports."""
+        pools = []
+
+        def expand(words, affix, pool="default", **kwargs):
+            pools.append(pool)
+            return ["walk"]
+
+        monkeypatch.setattr("apps.lexicon.utils.hunspell.expand", expand)
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert pools == ["tester"]
+
+    def test_affix_results_bounded_and_paged(
+        self, client, monkeypatch, english_project, user
+    ):
+        """Test that output is capped and later pages are served from the cache."""
+        monkeypatch.setattr(affix_views, "AFFIX_TESTER_MAX_FORMS", 10)
+        monkeypatch.setattr(affix_views, "AFFIX_TESTER_PAGE_SIZE", 6)
+        calls = []
+
+        def expand(words, affix, max_forms=None, **kwargs):
+            calls.append(max_forms)
+            return [f"word{i}" for i in range(max_forms)]
+
+        monkeypatch.setattr("apps.lexicon.utils.hunspell.expand", expand)
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        response = client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert response.status_code == 200
+        assert response.context["generated_words"] == [f"word{i}" for i in range(6)]
+        assert response.context["truncated"]
+        assert response.context["next_page"] == 2
+
+        # The same input is answered from the cache
+        client.get(url, {"words": "walk", "affix_file": "SFX"})
+        assert calls == [11]
+
+        key = response.context["result_key"]
+        response = client.get(url, {"key": key, "page": 2})
+        assert response.status_code == 200
+        assert response.context["generated_words"] == [f"word{i}" for i in range(6, 10)]
+        assert response.context["next_page"] is None
+
+    def test_affix_results_expired_key(self, client, english_project, user):
+        """Test that a page request for an unknown result is refused."""
+        client.force_login(user)
+        url = reverse(
+            "lexicon:word_affix_results", args=[english_project.language_code]
+        )
+        response = client.get(url, {"key": "0" * 40, "page": 2})
+        assert response.status_code == 400
+        assert "expired" in response.content.decode()
+
+    def test_affix_file_analysis(
+        self, client, project_with_affix_file, permissioned_user
+    ):
+        """Test that the analysis partial reports problems in the edited file."""
+        client.force_login(permissioned_user)
+        url = reverse(
+            "lexicon:project_admin_affix_file_analysis",
+            args=[project_with_affix_file.language_code],
+        )
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.context["report"].findings == []
+
+        response = client.get(url, {"affix_file": "SFX A Y 2\nSFX A 0 yam ."})
+        assert "declares 2 rules but has 1" in response.content.decode()
+
+    def test_affix_file_analysis_requires_permission(
+        self, client, project_with_affix_file, user
+    ):
+        client.force_login(user)
+        url = reverse(
+            "lexicon:project_admin_affix_file_analysis",
+            args=[project_with_affix_file.language_code],
+        )
+        assert client.get(url).status_code == 403
+
 
 @pytest.mark.django_db
 class TestWordAffixViews:
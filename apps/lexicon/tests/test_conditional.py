@@ -0,0 +1,161 @@
+import pytest
+from django.urls import reverse
+from guardian.shortcuts import assign_perm
+
+from apps.lexicon import models
+from apps.lexicon.tasks import update_entries_search_fields
+
+
+def revalidate(client, url, response, **extra):
+    """Request a url again, sending the ETag of an earlier response."""
+    return client.get(url, HTTP_IF_NONE_MATCH=response["ETag"], **extra)
+
+
+@pytest.mark.django_db
+class TestProjectPages:
+    @pytest.fixture
+    def english_words(self, english_words):
+        # Building the hunspell forms on the first view would modify the project
+        english_words[0].project.ensure_hunspell_forms()
+        return english_words
+
+    @pytest.fixture
+    def detail_url(self, english_words):
+        return reverse("lexicon:entry_detail", args=["eng", english_words[0].pk])
+
+    @pytest.mark.parametrize(
+        "name", ["entry_list", "review_list", "ignore_list", "lexicon_search"]
+    )
+    def test_unchanged_page_is_not_modified(self, client, english_words, name):
+        url = reverse(f"lexicon:{name}", args=["eng"])
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response["ETag"].startswith('W/"')
+        assert "private" in response["Cache-Control"]
+        assert "no-cache" in response["Cache-Control"]
+
+        response = revalidate(client, url, response)
+        assert response.status_code == 304
+        assert not response.content
+
+    def test_not_modified_skips_rendering(
+        self, client, detail_url, django_assert_num_queries
+    ):
+        response = client.get(detail_url)
+        # Only the project is read to build the ETag
+        with django_assert_num_queries(1):
+            assert revalidate(client, detail_url, response).status_code == 304
+
+    def test_entry_edit(self, client, english_words, detail_url):
+        response = client.get(detail_url)
+        english_words[0].comments = "new comment"
+        english_words[0].save()
+        response = revalidate(client, detail_url, response)
+        assert response.status_code == 200
+        assert "new comment" in response.content.decode()
+
+    def test_sense_edit(self, client, english_words, detail_url):
+        response = client.get(detail_url)
+        sense = english_words[0].senses.get()
+        sense.eng = "edited sense"
+        sense.save()
+        response = revalidate(client, detail_url, response)
+        assert response.status_code == 200
+        assert "edited sense" in response.content.decode()
+
+    def test_new_release(self, client, detail_url, settings):
+        response = client.get(detail_url)
+        settings.VERSION = "99.0.0"
+        assert revalidate(client, detail_url, response).status_code == 200
+
+    def test_variation_and_affix_changes(self, client, english_words, detail_url):
+        response = client.get(detail_url)
+        models.Variation.objects.create(
+            word=english_words[0], type="spelling", text="tset_word"
+        )
+        response = revalidate(client, detail_url, response)
+        assert response.status_code == 200
+
+        affix = models.Affix.objects.create(
+            project=english_words[0].project,
+            name="plural",
+            applies_to="n",
+            affix_letter="A",
+        )
+        response = revalidate(client, detail_url, response)
+        assert response.status_code == 200
+        affix.delete()
+        assert revalidate(client, detail_url, response).status_code == 200
+
+    def test_search_fields_updated_in_bulk(self, client, english_words):
+        url = reverse("lexicon:lexicon_search", args=["eng"])
+        response = client.get(url, {"search": "bulk"})
+        assert not response.context["object_list"]
+
+        models.LexiconEntry.objects.filter(pk=english_words[0].pk).update(search="")
+        models.Variation.objects.bulk_create(
+            [
+                models.Variation(
+                    word=english_words[0],
+                    type="spelling",
+                    text="bulk",
+                    included_in_search=True,
+                )
+            ]
+        )
+        update_entries_search_fields([english_words[0].pk])
+        response = revalidate(client, url, response, data={"search": "bulk"})
+        assert response.status_code == 200
+        assert list(response.context["object_list"]) == [english_words[0]]
+
+    def test_query_string_and_htmx_change_etag(self, client, english_words):
+        url = reverse("lexicon:lexicon_search", args=["eng"])
+        response = client.get(url, {"search": "test"})
+        assert (
+            revalidate(client, url, response, data={"search": "extra"}).status_code
+            == 200
+        )
+        assert (
+            revalidate(
+                client, url, response, data={"search": "test"}, HTTP_HX_REQUEST="true"
+            ).status_code
+            == 200
+        )
+        assert (
+            revalidate(client, url, response, data={"search": "test"}).status_code
+            == 304
+        )
+
+    def test_login_and_permission_change_etag(
+        self, client, user, english_project, english_words, detail_url
+    ):
+        anonymous = client.get(detail_url)
+        client.force_login(user)
+        response = revalidate(client, detail_url, anonymous)
+        assert response.status_code == 200
+
+        assign_perm("edit_lexiconproject", user, english_project)
+        editor = revalidate(client, detail_url, response)
+        assert editor.status_code == 200
+        assert editor["ETag"] != response["ETag"]
+
+
+@pytest.mark.django_db
+class TestOxtUpdateNotify:
+    def test_revalidates_until_version_changes(self, client, english_project):
+        url = reverse("lexicon:oxt_update_notify", args=["eng"])
+        response = client.get(url)
+        assert "public" in response["Cache-Control"]
+        assert response.has_header("Last-Modified")
+        assert revalidate(client, url, response).status_code == 304
+        assert (
+            client.get(
+                url, HTTP_IF_MODIFIED_SINCE=response["Last-Modified"]
+            ).status_code
+            == 304
+        )
+
+        english_project.increment_version()
+        response = revalidate(client, url, response)
+        assert response.status_code == 200
+        assert str(english_project.version) in response.content.decode()
@@ -1,7 +1,10 @@
+import json
+
 import pytest
 from django.urls import reverse
 
 from apps.lexicon import models
+from apps.lexicon.views import conjugation_views
 
 
 @pytest.mark.django_db
@@ -82,8 +85,9 @@ class TestConjugationsView:
         )
         response = client.get(url)
         assert response.status_code == 200
-        assert "conjugation_grid" in response.context
-        assert "forms_grid" in response.context
+        assert response.context["conjugation_grid"] == [("row1", ["test"])]
+        # The read only view doesn't build a formset
+        assert "forms_grid" not in response.context
         assert response.context["word"].pk == words[0].pk
         assert response.context["paradigm"].pk == paradigm.pk
 
@@ -328,3 +332,272 @@ class TestConjugationsEdit:
             'name="form-5-conjugation" value="changed 123"'
             in post_response.content.decode()
         )
+
+
+@pytest.mark.django_db
+class TestConjugationGridBulkSave:
+    ROWS = 8
+    COLUMNS = 6
+
+    @pytest.fixture
+    def large_paradigm(self, english_project):
+        paradigm = models.Paradigm.objects.create(
+            name="Large Paradigm",
+            project=english_project,
+            row_labels=[str(r) for r in range(self.ROWS)],
+            column_labels=[str(c) for c in range(self.COLUMNS)],
+        )
+        word = models.LexiconEntry.objects.create(
+            text="largeword", project=english_project
+        )
+        word.paradigms.add(paradigm)
+        # Fill the first half of the grid
+        for idx in range(self.ROWS * self.COLUMNS // 2):
+            models.Conjugation.objects.create(
+                word=word,
+                paradigm=paradigm,
+                row=idx // self.COLUMNS,
+                column=idx % self.COLUMNS,
+                conjugation=f"orig{idx}",
+            )
+        return word, paradigm
+
+    def post_data(self, values):
+        data = {
+            "form-TOTAL_FORMS": len(values),
+            "form-INITIAL_FORMS": 0,
+            "form-MIN_NUM_FORMS": 0,
+            "form-MAX_NUM_FORMS": 1000,
+        }
+        for i, value in enumerate(values):
+            data[f"form-{i}-conjugation"] = value
+        return data
+
+    def test_grid_save_query_budget(
+        self,
+        client,
+        permissioned_user,
+        large_paradigm,
+        english_project,
+        django_assert_max_num_queries,
+    ):
+        """Saving a whole grid takes a fixed number of queries, not one per cell.
+
+        Every other cell is changed and the first row blanked, so the save has
+        inserts, updates and deletes."""
+        client.force_login(permissioned_user)
+        word, paradigm = large_paradigm
+        cells = self.ROWS * self.COLUMNS
+        values = [
+            "" if idx < self.COLUMNS else f"new{idx}" if idx % 2 else f"orig{idx}"
+            for idx in range(cells)
+        ]
+        version = models.LexiconProject.objects.get(pk=english_project.pk).version
+        url = reverse(
+            "lexicon:conjugation_grid", args=["eng", word.pk, paradigm.pk, "edit"]
+        )
+
+        with django_assert_max_num_queries(40):
+            response = client.post(url, self.post_data(values))
+
+        assert response.status_code == 200
+        stored = {
+            c.row * self.COLUMNS + c.column: c.conjugation
+            for c in models.Conjugation.objects.filter(word=word, paradigm=paradigm)
+        }
+        assert stored == {idx: v for idx, v in enumerate(values) if v}
+        assert (
+            models.LexiconProject.objects.get(pk=english_project.pk).version
+            == version + 1
+        )
+        assert word.hunspell_forms.filter(form="new47").exists()
+
+
+@pytest.mark.django_db
+class TestConjugationGridRendering:
+    SIZE = 10
+
+    @pytest.fixture
+    def square_paradigm(self, english_project):
+        """A full 10x10 grid."""
+        paradigm = models.Paradigm.objects.create(
+            name="Square Paradigm",
+            project=english_project,
+            row_labels=[f"r{r}" for r in range(self.SIZE)],
+            column_labels=[f"c{c}" for c in range(self.SIZE)],
+        )
+        word = models.LexiconEntry.objects.create(
+            text="squareword", project=english_project
+        )
+        models.Conjugation.objects.bulk_create(
+            models.Conjugation(
+                word=word, paradigm=paradigm, row=r, column=c, conjugation=f"f{r}x{c}"
+            )
+            for r in range(self.SIZE)
+            for c in range(self.SIZE)
+        )
+        return word, paradigm
+
+    def get_url(self, word, paradigm, mode="view"):
+        return reverse(
+            "lexicon:conjugation_grid", args=["eng", word.pk, paradigm.pk, mode]
+        )
+
+    def test_view_grid_queries(
+        self, client, permissioned_user, square_paradigm, django_assert_num_queries
+    ):
+        """The conjugations are loaded in one query and the cached grid in none."""
+        client.force_login(permissioned_user)
+        word, paradigm = square_paradigm
+        url = self.get_url(word, paradigm)
+        # Session and user, word with project, paradigm, conjugations
+        with django_assert_num_queries(5):
+            response = client.get(url)
+        content = response.content.decode()
+        assert "<td>f9x9</td>" in content
+        assert content.index("f0x1") < content.index("f1x0")
+
+        with django_assert_num_queries(4):
+            cached = client.get(url)
+        assert cached.content.decode() == content
+
+    def test_cached_grid_updates_after_save(
+        self, client, permissioned_user, square_paradigm
+    ):
+        client.force_login(permissioned_user)
+        word, paradigm = square_paradigm
+        client.get(self.get_url(word, paradigm))
+        models.Conjugation.objects.filter(word=word, row=0, column=0).get().delete()
+
+        content = client.get(self.get_url(word, paradigm)).content.decode()
+        assert "f0x0" not in content
+
+    def test_cached_grid_updates_after_label_change(
+        self, client, permissioned_user, square_paradigm
+    ):
+        client.force_login(permissioned_user)
+        word, paradigm = square_paradigm
+        client.get(self.get_url(word, paradigm))
+        paradigm.row_labels = ["renamed"] + paradigm.row_labels[1:]
+        paradigm.save()
+
+        assert "renamed" in client.get(self.get_url(word, paradigm)).content.decode()
+
+    def test_edit_grid_is_prefilled(self, client, permissioned_user, square_paradigm):
+        client.force_login(permissioned_user)
+        word, paradigm = square_paradigm
+        response = client.get(self.get_url(word, paradigm, "edit"))
+        forms_grid = response.context["forms_grid"]
+        assert len(forms_grid) == self.SIZE
+        assert forms_grid[3][7].initial["conjugation"] == "f3x7"
+
+
+@pytest.mark.django_db
+class TestParadigmSpreadsheet:
+    @pytest.fixture
+    def spreadsheet_words(self, english_words_with_paradigm):
+        words, paradigm, conjugation = english_words_with_paradigm
+        words[1].paradigms.add(paradigm)
+        return words, paradigm
+
+    def save(self, client, paradigm, cells):
+        url = reverse("lexicon:paradigm_spreadsheet_save", args=["eng", paradigm.pk])
+        return client.post(
+            url, json.dumps({"cells": cells}), content_type="application/json"
+        )
+
+    def test_page_lists_cells(self, client, permissioned_user, spreadsheet_words):
+        words, paradigm = spreadsheet_words
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:paradigm_spreadsheet", args=["eng", paradigm.pk])
+        response = client.get(url)
+        assert response.status_code == 200
+        assert response.context["cell_labels"] == ["row1 col1"]
+        assert response.context["entry_count"] == 2
+
+    def test_rows_load_in_windows(
+        self, client, permissioned_user, spreadsheet_words, english_project
+    ):
+        words, paradigm = spreadsheet_words
+        for i in range(conjugation_views.SPREADSHEET_WINDOW):
+            models.LexiconEntry.objects.create(
+                text=f"zz{i:03}", project=english_project
+            ).paradigms.add(paradigm)
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:paradigm_spreadsheet_rows", args=["eng", paradigm.pk])
+
+        first = client.get(url)
+        assert first.context["rows"][1] == (words[0].pk, "test_word", [(0, 0, "test")])
+        assert first.context["next_offset"] == conjugation_views.SPREADSHEET_WINDOW
+        assert 'hx-trigger="revealed"' in first.content.decode()
+
+        second = client.get(url, {"offset": first.context["next_offset"]})
+        # Two fixture words come first, so the last two words are in the next window
+        assert [r[1] for r in second.context["rows"]] == [
+            f"zz{conjugation_views.SPREADSHEET_WINDOW - 2:03}",
+            f"zz{conjugation_views.SPREADSHEET_WINDOW - 1:03}",
+        ]
+        assert second.context["next_offset"] is None
+
+    def test_save_batch_bumps_version_once(
+        self, client, permissioned_user, spreadsheet_words, english_project
+    ):
+        words, paradigm = spreadsheet_words
+        version = models.LexiconProject.objects.get(pk=english_project.pk).version
+        client.force_login(permissioned_user)
+        response = self.save(
+            client,
+            paradigm,
+            [
+                {"entry": words[0].pk, "row": 0, "column": 0, "value": ""},
+                {"entry": words[1].pk, "row": 0, "column": 0, "value": "Extras"},
+            ],
+        )
+        assert response.json() == {"saved": 2, "errors": []}
+        assert not words[0].conjugations.exists()
+        assert words[1].conjugations.get().conjugation == "extras"
+        project = models.LexiconProject.objects.get(pk=english_project.pk)
+        assert project.version == version + 1
+        assert "extras" in models.LexiconEntry.objects.get(pk=words[1].pk).search
+
+    def test_save_reports_invalid_cells(
+        self, client, permissioned_user, spreadsheet_words, english_project
+    ):
+        words, paradigm = spreadsheet_words
+        english_project.text_validator = "[a-z]+"
+        english_project.save()
+        other = models.LexiconEntry.objects.create(
+            text="other", project=english_project
+        )
+        client.force_login(permissioned_user)
+        response = self.save(
+            client,
+            paradigm,
+            [
+                {"entry": words[1].pk, "row": 0, "column": 0, "value": "bad 1"},
+                {"entry": other.pk, "row": 0, "column": 0, "value": "fine"},
+                {"entry": words[1].pk, "row": 3, "column": 0, "value": "fine"},
+            ],
+        )
+        errors = response.json()["errors"]
+        assert response.json()["saved"] == 0
+        assert [e["entry"] for e in errors] == [words[1].pk, other.pk, words[1].pk]
+        assert not other.conjugations.exists()
+
+    def test_save_requires_permission(self, client, user, spreadsheet_words):
+        words, paradigm = spreadsheet_words
+        client.force_login(user)
+        response = self.save(
+            client,
+            paradigm,
+            [{"entry": words[1].pk, "row": 0, "column": 0, "value": "x"}],
+        )
+        assert response.status_code == 403
+        assert not words[1].conjugations.exists()
+
+    def test_save_rejects_bad_json(self, client, permissioned_user, spreadsheet_words):
+        words, paradigm = spreadsheet_words
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:paradigm_spreadsheet_save", args=["eng", paradigm.pk])
+        response = client.post(url, "nope", content_type="application/json")
+        assert response.status_code == 400
@@ -0,0 +1,182 @@
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+
+from apps.lexicon import models, tasks
+from apps.lexicon.utils import export
+from apps.lexicon.utils.conjugations import (
+    convert_conjugation_storage,
+    save_conjugation_cells,
+)
+from apps.lexicon.utils.paradigm_generator import generate_conjugations
+
+
+@pytest.fixture
+def grid_words(english_project):
+    """Two words in a 2x3 paradigm, one with a full grid and one with one cell."""
+    paradigm = models.Paradigm.objects.create(
+        name="Grid Paradigm",
+        project=english_project,
+        row_labels=["r0", "r1"],
+        column_labels=["c0", "c1", "c2"],
+    )
+    full = models.LexiconEntry.objects.create(
+        text="full", project=english_project, checked=True
+    )
+    single = models.LexiconEntry.objects.create(text="single", project=english_project)
+    for word in (full, single):
+        word.paradigms.add(paradigm)
+    models.Conjugation.objects.bulk_create(
+        [
+            models.Conjugation(
+                word=full, paradigm=paradigm, row=r, column=c, conjugation=f"f{r}{c}"
+            )
+            for r in range(2)
+            for c in range(3)
+        ]
+        + [
+            models.Conjugation(
+                word=single, paradigm=paradigm, row=1, column=2, conjugation="s12"
+            )
+        ]
+    )
+    return full, single, paradigm
+
+
+@pytest.mark.django_db
+class TestConvertStorage:
+    def test_convert_to_grid_and_back(self, english_project, grid_words):
+        full, single, paradigm = grid_words
+        before = sorted(models.read_conjugation_cells(word__project=english_project))
+
+        assert convert_conjugation_storage(english_project, "grid") == 7
+        assert not models.Conjugation.objects.filter(word__project=english_project)
+        grid = models.ConjugationGrid.objects.get(word=single, paradigm=paradigm)
+        assert grid.cells == [["", "", ""], ["", "", "s12"]]
+        assert (
+            models.LexiconProject.objects.get(pk=english_project.pk).conjugation_storage
+            == "grid"
+        )
+        assert (
+            sorted(models.read_conjugation_cells(word__project=english_project))
+            == before
+        )
+
+        assert convert_conjugation_storage(english_project, "rows") == 7
+        assert not models.ConjugationGrid.objects.exists()
+        assert (
+            sorted(models.read_conjugation_cells(word__project=english_project))
+            == before
+        )
+
+    def test_convert_to_same_layout_does_nothing(self, english_project, grid_words):
+        assert convert_conjugation_storage(english_project, "rows") == 0
+        assert models.Conjugation.objects.count() == 7
+
+    def test_unknown_layout(self, english_project):
+        with pytest.raises(ValueError):
+            convert_conjugation_storage(english_project, "columns")
+
+    def test_command(self, english_project, grid_words):
+        call_command("convert_conjugation_storage", "eng", "grid")
+        assert models.ConjugationGrid.objects.count() == 2
+
+
+@pytest.mark.django_db
+class TestGridStorage:
+    @pytest.fixture
+    def grid_project(self, english_project, grid_words):
+        convert_conjugation_storage(english_project, "grid")
+        return english_project
+
+    def test_save_cells_updates_grid(self, grid_project, grid_words):
+        full, single, paradigm = grid_words
+        version = models.LexiconProject.objects.get(pk=grid_project.pk).version
+        _, changed = save_conjugation_cells(
+            grid_project,
+            paradigm,
+            {
+                (full.pk, 0, 0): "new",
+                (full.pk, 0, 1): "f01",
+                (single.pk, 1, 2): "",
+            },
+        )
+
+        assert changed == {full.pk, single.pk}
+        assert models.ConjugationGrid.objects.get(word=full).cells[0][:2] == [
+            "new",
+            "f01",
+        ]
+        # The single word's only cell was blanked, so its grid is removed
+        assert not models.ConjugationGrid.objects.filter(word=single).exists()
+        assert not models.Conjugation.objects.exists()
+        assert (
+            models.LexiconProject.objects.get(pk=grid_project.pk).version == version + 1
+        )
+        assert full.hunspell_forms.filter(form="new").exists()
+
+    def test_search_fields(self, grid_project, grid_words):
+        full, single, _ = grid_words
+        models.LexiconEntry.objects.filter(pk=full.pk).update(search="")
+        tasks.update_lexicon_entry_search_field(full.pk)
+        tasks.update_entries_search_fields([single.pk])
+
+        assert models.LexiconEntry.objects.get(pk=full.pk).search == (
+            "full f00 f01 f02 f10 f11 f12"
+        )
+        assert models.LexiconEntry.objects.get(pk=single.pk).search == "single s12"
+
+    def test_export_reads_grids(self, grid_project, grid_words):
+        words = export._get_word_list(grid_project, checked=True, hunspell=False)
+        assert "full" in words
+        assert "f12" in words
+        assert "s12" not in words
+
+    def test_grid_view(
+        self,
+        client,
+        permissioned_user,
+        grid_project,
+        grid_words,
+        django_assert_num_queries,
+    ):
+        full, _, paradigm = grid_words
+        client.force_login(permissioned_user)
+        url = reverse(
+            "lexicon:conjugation_grid", args=["eng", full.pk, paradigm.pk, "view"]
+        )
+        # Session and user, word with project, paradigm, grid
+        with django_assert_num_queries(5):
+            response = client.get(url)
+        assert "<td>f12</td>" in response.content.decode()
+
+        response = client.get(url.replace("/view", "/edit"))
+        assert response.context["forms_grid"][1][2].initial["conjugation"] == "f12"
+
+    def test_spreadsheet_rows(
+        self, client, permissioned_user, grid_project, grid_words
+    ):
+        _, _, paradigm = grid_words
+        client.force_login(permissioned_user)
+        response = client.get(
+            reverse("lexicon:paradigm_spreadsheet_rows", args=["eng", paradigm.pk])
+        )
+        rows = {text: cells for _, text, cells in response.context["rows"]}
+        assert rows["single"][5] == (1, 2, "s12")
+        assert rows["full"][0] == (0, 0, "f00")
+
+    def test_generate_fills_grids(self, grid_project, grid_words):
+        full, single, paradigm = grid_words
+        template = models.GenerationTemplate.objects.create(
+            paradigm=paradigm,
+            cell_rules=[["{word}a", "{word}b", "{word}c"], ["", "", ""]],
+        )
+        report = generate_conjugations(template)
+
+        assert report["created"] == 3
+        assert report["conflicts_count"] == 3
+        assert models.ConjugationGrid.objects.get(word=single).cells == [
+            ["singlea", "singleb", "singlec"],
+            ["", "", "s12"],
+        ]
+        assert not models.Conjugation.objects.exists()
@@ -0,0 +1,111 @@
+import pytest
+
+from apps.lexicon import models, tasks
+from apps.lexicon.utils.duplicates import (
+    find_duplicate_pairs,
+    merge_entries,
+    normalize,
+    trigrams,
+)
+
+
+def test_normalize_strips_diacritics_and_case():
+    assert normalize("Ndégé") == "ndege"
+
+
+def test_trigrams_are_padded():
+    assert trigrams("ab") == {"  a", " ab", "ab "}
+
+
+class TestFindDuplicatePairs:
+    def test_finds_single_edits(self):
+        entries = [(1, "hobol"), (2, "hobal"), (3, "bili"), (4, "hoboll")]
+        pairs = {(a, b) for a, b, _ in find_duplicate_pairs(entries)}
+        assert pairs == {(1, 2), (1, 4)}
+
+    def test_diacritics_are_fully_similar(self):
+        pairs = find_duplicate_pairs([(1, "kéla"), (2, "kela")])
+        assert pairs == [(1, 2, 1.0)]
+
+    def test_identical_text_is_ignored(self):
+        """Homographs are separate entries on purpose."""
+        assert find_duplicate_pairs([(1, "bili"), (2, "bili")]) == []
+
+    def test_distant_words_are_not_paired(self):
+        assert find_duplicate_pairs([(1, "hobol"), (2, "bili")]) == []
+
+    def test_matches_brute_force(self):
+        """Blocking on trigrams shouldn't lose any pairs a full comparison finds."""
+        from apps.lexicon.utils.suggestions import edit_distance
+
+        words = ["tamol", "tamul", "tamolo", "atamol", "mamol", "lomat", "tam", "tamo"]
+        entries = list(enumerate(words))
+        expected = {
+            (a, b)
+            for a, wa in entries
+            for b, wb in entries
+            if a < b and edit_distance(wa, wb, 1) <= 1
+        }
+        found = {(a, b) for a, b, _ in find_duplicate_pairs(entries)}
+        assert found == expected
+
+    def test_reports_progress(self):
+        progress = []
+        find_duplicate_pairs([(1, "a"), (2, "b")], progress=progress.append)
+        assert progress[-1] == 1.0
+
+
+@pytest.mark.django_db
+class TestMergeEntries:
+    def test_merge_moves_data_and_deletes_duplicate(self, kovol_project):
+        keep = models.LexiconEntry.objects.create(text="hobol", project=kovol_project)
+        duplicate = models.LexiconEntry.objects.create(
+            text="hobal", project=kovol_project
+        )
+        models.Sense.objects.create(entry=keep, eng="pig")
+        models.Sense.objects.create(entry=duplicate, eng="wild pig")
+
+        merge_entries(keep, duplicate)
+
+        assert not models.LexiconEntry.objects.filter(pk=duplicate.pk).exists()
+        assert [s.eng for s in keep.senses.all()] == ["pig", "wild pig"]
+        variation = keep.variations.get()
+        assert (variation.text, variation.type) == ("hobal", "spelling")
+
+    def test_merge_keeps_filled_conjugations(self, english_words_with_paradigm):
+        (keep, duplicate), paradigm, _ = english_words_with_paradigm
+        duplicate.paradigms.add(paradigm)
+        models.Conjugation.objects.create(
+            word=duplicate, paradigm=paradigm, row=0, column=0, conjugation="other"
+        )
+
+        merge_entries(keep, duplicate)
+
+        assert [c.conjugation for c in keep.conjugations.all()] == ["test"]
+
+
+@pytest.mark.django_db
+class TestFindDuplicateEntriesTask:
+    def test_task_stores_candidates(self, kovol_project, kovol_words):
+        models.LexiconEntry.objects.create(text="hobal", project=kovol_project)
+
+        tasks.find_duplicate_entries(kovol_project.language_code)
+
+        scan = kovol_project.duplicate_scan
+        assert (scan.status, scan.progress) == ("done", 100)
+        candidates = models.DuplicateCandidate.objects.filter(project=kovol_project)
+        assert [(c.entry.text, c.duplicate.text) for c in candidates] == [
+            ("hobol", "hobal")
+        ]
+
+    def test_task_replaces_old_candidates(self, kovol_project, kovol_words):
+        duplicate = models.LexiconEntry.objects.create(
+            text="hobal", project=kovol_project
+        )
+        tasks.find_duplicate_entries(kovol_project.language_code)
+        duplicate.text = "kasali"
+        duplicate.save()
+
+        tasks.find_duplicate_entries(kovol_project.language_code)
+
+        assert not models.DuplicateCandidate.objects.exists()
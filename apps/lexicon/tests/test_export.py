@@ -1,22 +1,16 @@
+import json
 import os
-import shutil
-import tempfile
+from zipfile import ZIP_DEFLATED, ZipFile
 
 import pytest
+from django.db import connection
 from django.http import HttpRequest
+from django.test.utils import CaptureQueriesContext
 
+from apps.lexicon import models
 from apps.lexicon.utils import export
 
 
-@pytest.fixture
-def temp_export_folder(monkeypatch):
-    """Temporarily override the export_folder for tests."""
-    temp_dir = tempfile.mkdtemp()
-    monkeypatch.setattr(export, "export_folder", temp_dir)
-    yield temp_dir
-    shutil.rmtree(temp_dir)
-
-
 @pytest.fixture
 def dummy_project(english_project):
     # Add a version and affix_file for export
@@ -140,6 +134,55 @@ def test_create_oxt_package_creates_zip(
         assert "META-INF/manifest.xml" in files
 
 
+@pytest.mark.django_db
+class TestOxtPackageBytes:
+    """Packages are compressed and identical when built from the same content."""
+
+    def build(self, project, request):
+        return export._create_oxt_package(
+            project, request, checked=False, hunspell=True, ignore_word_flag=True
+        )
+
+    def test_identical_builds(
+        self, temp_export_folder, dummy_project, english_words, dummy_request
+    ):
+        path = self.build(dummy_project, dummy_request)
+        with open(path, "rb") as f:
+            first = f.read()
+        os.remove(path)
+
+        assert self.build(dummy_project, dummy_request) == path
+        with open(path, "rb") as f:
+            assert f.read() == first
+        assert os.path.basename(path).startswith(f"eng_{dummy_project.version}_")
+        assert len(os.listdir(temp_export_folder)) == 1
+
+    def test_content_changes_name(
+        self, temp_export_folder, dummy_project, english_words, dummy_request
+    ):
+        path = self.build(dummy_project, dummy_request)
+        # The same version without the unchecked words
+        checked_only = export._create_oxt_package(
+            dummy_project,
+            dummy_request,
+            checked=True,
+            hunspell=True,
+            ignore_word_flag=True,
+        )
+        assert checked_only != path
+        assert len(os.listdir(temp_export_folder)) == 2
+
+    def test_entries_are_deflated_and_fixed(
+        self, temp_export_folder, dummy_project, english_words, dummy_request
+    ):
+        with ZipFile(self.build(dummy_project, dummy_request)) as z:
+            infos = z.infolist()
+        assert [i.filename for i in infos] == sorted(i.filename for i in infos)
+        for info in infos:
+            assert info.compress_type == ZIP_DEFLATED
+            assert info.date_time == export.ZIP_DATE_TIME
+
+
 @pytest.mark.django_db
 class TestDicCreate:
     """Test the creation of the dic string with different configurations."""
@@ -237,6 +280,23 @@ class TestDicCreate:
         assert "/A" not in string
         assert "\n\n" not in string  # No blank lines
 
+    def test_dic_create_string_keeps_case(self, project_with_affix_file):
+        """Test that capitalized roots are expanded in their own case."""
+        entry = project_with_affix_file.entries.get(text="hobol")
+        models.Variation.objects.create(
+            word=entry, type="spelling", text="Hobul", included_in_spellcheck=True
+        )
+        words = export._create_dic_string(
+            project_with_affix_file,
+            checked=False,
+            hunspell=True,
+            ignore_word_flag=False,
+        ).split("\n")
+        assert "Hobul" in words
+        assert "Hobulyam" in words
+        assert "hobul" not in words
+        assert project_with_affix_file.known_words(["hobulyam"]) == {"hobulyam"}
+
     def test_dic_create_string_checked(self, project_with_affix_file):
         """Test that the plain dic string is created with checked words only."""
         # 1 test that checked words are included when checked is True
@@ -380,3 +440,122 @@ class TestXmlCreate:
         assert '<Status Word="hobol" State="R" />' in string
         assert "/A" not in string
         assert "\n\n" not in string
+
+
+@pytest.mark.django_db
+class TestBundle:
+    """A bundle holds the same files as exporting each format on its own."""
+
+    def separate_exports(self, project, request, hunspell):
+        options = {"checked": False, "hunspell": hunspell, "ignore_word_flag": True}
+        return {
+            extension: export.export_entries(extension, project, request, **options)
+            for extension in ("oxt", "dic", "xml")
+        }
+
+    @pytest.mark.parametrize("hunspell", [True, False])
+    def test_bundle_matches_separate_exports(
+        self, temp_export_folder, project_with_affix_file, dummy_request, hunspell
+    ):
+        separate = {}
+        for extension, path in self.separate_exports(
+            project_with_affix_file, dummy_request, hunspell
+        ).items():
+            with open(path, "rb") as f:
+                separate[f"kgu.{extension}"] = f.read()
+
+        path = export.export_entries(
+            "zip",
+            project_with_affix_file,
+            dummy_request,
+            checked=False,
+            hunspell=hunspell,
+        )
+        assert path.endswith(".zip")
+        with ZipFile(path) as z:
+            assert {name: z.read(name) for name in z.namelist()} == separate
+
+    def test_bundle_files_are_stored(
+        self, temp_export_folder, project_with_affix_file, dummy_request
+    ):
+        export.export_entries("zip", project_with_affix_file, dummy_request)
+        artifacts = models.ExportArtifact.objects.values_list("path", flat=True)
+        assert sorted(os.path.splitext(path)[1] for path in artifacts) == [
+            ".dic",
+            ".oxt",
+            ".xml",
+        ]
+
+    def test_bundle_leaves_standalone_exports_alone(
+        self, temp_export_folder, project_with_affix_file, dummy_request
+    ):
+        dic_path = export.export_entries(
+            "dic", project_with_affix_file, dummy_request, checked=True
+        )
+        with open(dic_path, "rb") as f:
+            checked_only = f.read()
+
+        export.export_entries(
+            "zip", project_with_affix_file, dummy_request, checked=False
+        )
+        with open(dic_path, "rb") as f:
+            assert f.read() == checked_only
+        stored = models.ExportArtifact.objects.filter(path__endswith=".dic").get()
+        assert stored.path != dic_path
+        with open(stored.path, "rb") as f:
+            assert f.read() != checked_only
+        assert not [name for name in os.listdir(temp_export_folder) if "tmp" in name]
+
+    def test_bundle_reads_the_project_once(
+        self, temp_export_folder, project_with_affix_file, dummy_request
+    ):
+        """The bundle costs about one export's queries rather than three."""
+        project_with_affix_file.ensure_hunspell_forms()
+        with CaptureQueriesContext(connection) as separate:
+            self.separate_exports(project_with_affix_file, dummy_request, True)
+        with CaptureQueriesContext(connection) as bundle:
+            export.export_entries(
+                "zip", project_with_affix_file, dummy_request, checked=False
+            )
+
+        def project_reads(context):
+            return [
+                q["sql"]
+                for q in context.captured_queries
+                if 'FROM "lexicon_lexiconentry"' in q["sql"]
+                or 'FROM "lexicon_hunspellform"' in q["sql"]
+            ]
+
+        # The entries for the oxt, and the expanded forms for the .dic and .xml
+        assert len(project_reads(separate)) == 3
+        assert len(project_reads(bundle)) == 2
+        assert len(bundle) <= len(separate)
+
+
+@pytest.mark.django_db
+class TestJsonExport:
+    def test_json_replaces_the_file_once_written(
+        self, temp_export_folder, project_with_affix_file, dummy_request
+    ):
+        path = export.export_entries("jsn", project_with_affix_file, dummy_request)
+        assert path == os.path.join(temp_export_folder, "kgu.json")
+        with open(path, encoding="utf-8") as f:
+            assert json.load(f)["project"]["language_code"] == "kgu"
+
+    def test_failed_json_export_keeps_the_last_file(
+        self, temp_export_folder, project_with_affix_file, dummy_request, monkeypatch
+    ):
+        path = export.export_entries("jsn", project_with_affix_file, dummy_request)
+        with open(path, "rb") as f:
+            last = f.read()
+
+        def fail(project_pk, out):
+            out.write('{"export_version": 1,')
+            raise OSError("database went away")
+
+        monkeypatch.setattr(export, "write_project_json", fail)
+        with pytest.raises(OSError):
+            export.export_entries("jsn", project_with_affix_file, dummy_request)
+        with open(path, "rb") as f:
+            assert f.read() == last
+        assert os.listdir(temp_export_folder) == ["kgu.json"]
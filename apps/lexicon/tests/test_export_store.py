@@ -0,0 +1,143 @@
+import os
+from datetime import timedelta
+
+import pytest
+from django.core.management import call_command
+from django.urls import reverse
+from django.utils import timezone
+
+from apps.lexicon import models
+from apps.lexicon.utils import export_store
+
+
+@pytest.fixture
+def write_export(temp_export_folder):
+    """Write a file of a given size to the export folder and index it."""
+
+    def write(name, size, project=None, version=None, age_hours=0):
+        path = os.path.join(temp_export_folder, name)
+        with open(path, "wb") as f:
+            f.write(b"x" * size)
+        export_store.record_artifact(path, project, version)
+        models.ExportArtifact.objects.filter(path=path).update(
+            last_used=timezone.now() - timedelta(hours=age_hours)
+        )
+        return path
+
+    return write
+
+
+@pytest.mark.django_db
+class TestEnforceBudget:
+    def test_under_budget_keeps_everything(self, write_export, english_project):
+        path = write_export("eng_1.dic", 100, english_project, 1)
+        result = export_store.enforce_budget(budget=1000)
+        assert result == {"evicted_files": 0, "evicted_bytes": 0, "bytes": 100}
+        assert os.path.exists(path)
+
+    def test_least_recently_used_are_evicted(
+        self, write_export, english_project, settings
+    ):
+        settings.EXPORT_KEEP_VERSIONS = 1
+        oldest = write_export("eng_1.dic", 100, english_project, 1, age_hours=3)
+        older = write_export("eng_2.dic", 100, english_project, 2, age_hours=2)
+        old = write_export("eng_3.dic", 100, english_project, 3, age_hours=1)
+        latest = write_export("eng_4.dic", 100, english_project, 4, age_hours=4)
+
+        result = export_store.enforce_budget(budget=250)
+        assert result == {"evicted_files": 2, "evicted_bytes": 200, "bytes": 200}
+        assert not os.path.exists(oldest)
+        assert not os.path.exists(older)
+        assert os.path.exists(old)
+        # The latest version is kept though it's least recently used
+        assert os.path.exists(latest)
+        assert set(models.ExportArtifact.objects.values_list("path", flat=True)) == {
+            old,
+            latest,
+        }
+
+    def test_downloads_count_as_use(self, write_export, english_project, settings):
+        settings.EXPORT_KEEP_VERSIONS = 0
+        first = write_export("eng_1.dic", 100, english_project, 1, age_hours=2)
+        second = write_export("eng_2.dic", 100, english_project, 2, age_hours=1)
+        export_store.touch_artifact(first)
+        export_store.enforce_budget(budget=150)
+        assert os.path.exists(first)
+        assert not os.path.exists(second)
+
+    def test_downloadable_jobs_are_kept(self, write_export, english_project, settings):
+        settings.EXPORT_KEEP_VERSIONS = 0
+        path = write_export("eng_1.dic", 100, english_project, 1, age_hours=5)
+        models.ExportJob.objects.create(
+            project=english_project,
+            export_type="dic",
+            project_version=1,
+            project_modified=english_project.modified,
+            status="done",
+            artifact=path,
+            finished=timezone.now(),
+        )
+        result = export_store.enforce_budget(budget=0)
+        assert result["evicted_files"] == 0
+        assert os.path.exists(path)
+
+    def test_untracked_files_are_indexed(self, temp_export_folder, english_project):
+        os.makedirs(os.path.join(temp_export_folder, "jobs", "1"))
+        path = os.path.join(temp_export_folder, "jobs", "1", "eng_3_abc.oxt")
+        with open(path, "wb") as f:
+            f.write(b"x" * 10)
+        with open(os.path.join(temp_export_folder, "eng_4.dic.123.tmp"), "wb") as f:
+            f.write(b"x")
+        export_store.sync_index()
+        artifact = models.ExportArtifact.objects.get()
+        assert artifact.path == path
+        assert artifact.project == english_project
+        assert artifact.version == 3
+        assert artifact.size == 10
+
+    def test_deleted_files_are_forgotten(self, write_export):
+        path = write_export("eng_1.dic", 100)
+        os.remove(path)
+        export_store.sync_index()
+        assert not models.ExportArtifact.objects.exists()
+
+
+@pytest.mark.django_db
+class TestStoreStats:
+    def test_stats(self, write_export, english_project, kovol_project, settings):
+        settings.EXPORT_KEEP_VERSIONS = 0
+        settings.EXPORT_STORE_BYTES = 250
+        write_export("eng_1.dic", 100, english_project, 1, age_hours=1)
+        write_export("eng_2.dic", 100, english_project, 2)
+        write_export("kgu_1.dic", 100, kovol_project, 1)
+        export_store.enforce_budget()
+
+        stats = export_store.store_stats()
+        assert stats["files"] == 2
+        assert stats["bytes"] == 200
+        assert stats["budget"] == 250
+        assert stats["by_project"] == {"eng": 100, "kgu": 100}
+        assert stats["evicted_files"] == 1
+        assert stats["evicted_bytes"] == 100
+        assert stats["last_run"] is not None
+
+    def test_command(self, write_export, english_project, capsys):
+        write_export("eng_1.dic", 100, english_project, 1)
+        call_command("export_store", "--enforce")
+        output = capsys.readouterr().out
+        assert "Removed 0 files" in output
+        assert "1 files, 100\xa0bytes" in output
+        assert "eng: 100\xa0bytes" in output
+
+
+@pytest.mark.django_db
+def test_export_jobs_are_indexed(client, temp_export_folder, project_with_affix_file):
+    client.post(
+        reverse("lexicon:export_page", args=["kgu"]),
+        data={"export_type": "dic", "checked": True},
+    )
+    job = models.ExportJob.objects.get()
+    artifact = models.ExportArtifact.objects.get()
+    assert artifact.path == job.artifact
+    assert artifact.version == project_with_affix_file.version
+    assert artifact.size == job.size
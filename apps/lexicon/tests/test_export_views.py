@@ -1,8 +1,32 @@
+import os
+from datetime import timedelta
+
 import pytest
+from django.conf import settings
 from django.urls import reverse
+from django.utils import timezone
+
+from apps.lexicon import models
+from apps.lexicon.tasks import remove_expired_exports
+from apps.lexicon.utils import export
+
+
+def export_and_download(client, project, data):
+    """Post the export form, then download the file of the job it started."""
+    response = client.post(
+        reverse("lexicon:export_page", kwargs={"lang_code": project.language_code}),
+        data=data,
+    )
+    job = models.ExportJob.objects.get()
+    assert response.status_code == 302
+    assert response.url.endswith(f"?job={job.pk}")
+    return client.get(
+        reverse("lexicon:export_job_download", args=[project.language_code, job.pk])
+    )
 
 
 @pytest.mark.django_db
+@pytest.mark.usefixtures("temp_export_folder")
 class TestExportView:
     """Test the export page works for get and post."""
 
@@ -16,13 +40,11 @@ class TestExportView:
         assert response.status_code == 200
 
     def test_export_view_post_oxt(self, client, project_with_affix_file):
-        """Test that posting to the export view returns an OXT file."""
-        response = client.post(
-            reverse(
-                "lexicon:export_page",
-                kwargs={"lang_code": project_with_affix_file.language_code},
-            ),
-            data={
+        """Test that posting to the export view leads to an OXT file."""
+        response = export_and_download(
+            client,
+            project_with_affix_file,
+            {
                 "export_type": "oxt",
                 "include_hunspell": True,
                 "include_ignore": True,
@@ -34,13 +56,11 @@ class TestExportView:
         assert response["Content-Disposition"].endswith('.oxt"')
 
     def test_export_view_post_dic(self, client, project_with_affix_file):
-        """Test that posting to the export view returns a dic file."""
-        response = client.post(
-            reverse(
-                "lexicon:export_page",
-                kwargs={"lang_code": project_with_affix_file.language_code},
-            ),
-            data={
+        """Test that posting to the export view leads to a dic file."""
+        response = export_and_download(
+            client,
+            project_with_affix_file,
+            {
                 "export_type": "dic",
                 "include_hunspell": True,
                 "include_ignore": True,
@@ -51,14 +71,21 @@ class TestExportView:
         assert response["Content-Disposition"].startswith("attachment;")
         assert response["Content-Disposition"].endswith('.dic"')
 
+    def test_export_view_post_bundle(self, client, project_with_affix_file):
+        """Test that posting to the export view leads to a zip of every format."""
+        response = export_and_download(
+            client, project_with_affix_file, {"export_type": "zip", "checked": False}
+        )
+        assert response.status_code == 200
+        assert response["Content-Type"] == "application/zip"
+        assert response["Content-Disposition"].endswith('.zip"')
+
     def test_export_view_post_json(self, client, project_with_affix_file):
-        """Test that posting to the export view returns a JSON file."""
-        response = client.post(
-            reverse(
-                "lexicon:export_page",
-                kwargs={"lang_code": project_with_affix_file.language_code},
-            ),
-            data={
+        """Test that posting to the export view leads to a JSON file."""
+        response = export_and_download(
+            client,
+            project_with_affix_file,
+            {
                 "export_type": "jsn",
                 "include_hunspell": True,
                 "include_ignore": True,
@@ -81,6 +108,161 @@ class TestExportView:
         assert data["project"]["language_code"] == project_with_affix_file.language_code
 
 
+@pytest.mark.django_db
+@pytest.mark.usefixtures("temp_export_folder")
+class TestExportJobs:
+    """Exports run as jobs that are polled and kept for download."""
+
+    data = {"export_type": "dic", "include_hunspell": True, "checked": True}
+
+    def post(self, client, project, **extra):
+        return client.post(
+            reverse("lexicon:export_page", args=[project.language_code]),
+            data=self.data,
+            **extra,
+        )
+
+    def test_htmx_post_returns_panel(self, client, project_with_affix_file):
+        response = self.post(client, project_with_affix_file, HTTP_HX_REQUEST="true")
+        job = models.ExportJob.objects.get()
+        assert response.status_code == 200
+        assert reverse("lexicon:export_job_download", args=["kgu", job.pk]) in (
+            response.content.decode()
+        )
+
+    def test_job_records_result(self, client, project_with_affix_file):
+        self.post(client, project_with_affix_file)
+        job = models.ExportJob.objects.get()
+        assert job.status == "done"
+        assert job.progress == 100
+        assert job.project_version == project_with_affix_file.version
+        assert job.size == os.path.getsize(job.artifact)
+        assert job.duration is not None
+        assert job.downloadable
+
+    @pytest.mark.parametrize(
+        "export_type,filename",
+        [
+            ("dic", "kgu_{}.dic"),
+            ("xml", "kgu_{}.xml"),
+            ("oxt", "kgu_{}.oxt"),
+            ("jsn", "kgu.json"),
+        ],
+    )
+    def test_job_writes_to_its_own_folder(
+        self, client, project_with_affix_file, temp_export_folder, export_type, filename
+    ):
+        client.post(
+            reverse("lexicon:export_page", args=["kgu"]),
+            data={**self.data, "export_type": export_type},
+        )
+        job = models.ExportJob.objects.get()
+        assert job.artifact == os.path.join(
+            temp_export_folder,
+            "jobs",
+            str(job.pk),
+            filename.format(project_with_affix_file.version),
+        )
+        # Nothing is written to the paths shared by the version's exports
+        assert os.listdir(temp_export_folder) == ["jobs"]
+
+    def test_identical_request_reuses_job(self, client, project_with_affix_file):
+        self.post(client, project_with_affix_file)
+        self.post(client, project_with_affix_file)
+        assert models.ExportJob.objects.count() == 1
+
+        # Different options or a new project version start another job
+        client.post(
+            reverse("lexicon:export_page", args=["kgu"]),
+            data={**self.data, "checked": False},
+        )
+        project_with_affix_file.increment_version()
+        self.post(client, project_with_affix_file)
+        assert models.ExportJob.objects.count() == 3
+
+    def test_running_job_is_polled(self, client, project_with_affix_file):
+        job = models.ExportJob.objects.create(
+            project=project_with_affix_file,
+            export_type="dic",
+            ignore_words=False,
+            project_version=project_with_affix_file.version,
+            project_modified=project_with_affix_file.modified,
+            status="running",
+            progress=40,
+        )
+        url = reverse("lexicon:export_job", args=["kgu", job.pk])
+        response = client.get(url)
+        assert 'hx-trigger="every 2s"' in response.content.decode()
+        assert "40%" in response.content.decode()
+        assert self.post(client, project_with_affix_file).url.endswith(f"?job={job.pk}")
+        download = reverse("lexicon:export_job_download", args=["kgu", job.pk])
+        assert client.get(download).status_code == 404
+
+    def test_failed_job(self, client, project_with_affix_file, monkeypatch):
+        def fail(*args, **kwargs):
+            raise OSError("disk full")
+
+        with monkeypatch.context() as m:
+            m.setattr(export, "export_entries", fail)
+            self.post(client, project_with_affix_file)
+        job = models.ExportJob.objects.get()
+        assert job.status == "failed"
+        response = client.get(reverse("lexicon:export_job", args=["kgu", job.pk]))
+        assert "failed" in response.content.decode()
+        # The failed job's empty folder isn't left behind
+        assert not os.path.exists(
+            os.path.join(export.export_folder, "jobs", str(job.pk))
+        )
+        # A failed job isn't reused
+        self.post(client, project_with_affix_file)
+        assert models.ExportJob.objects.filter(status="done").exists()
+
+    def test_expired_exports_are_removed(self, client, project_with_affix_file):
+        self.post(client, project_with_affix_file)
+        job = models.ExportJob.objects.get()
+        remove_expired_exports()
+        assert models.ExportJob.objects.filter(pk=job.pk).exists()
+
+        past = timezone.now() - timedelta(hours=settings.EXPORT_RETENTION_HOURS + 1)
+        models.ExportJob.objects.filter(pk=job.pk).update(created=past, finished=past)
+        job.refresh_from_db()
+        assert not job.downloadable
+        remove_expired_exports()
+        assert not models.ExportJob.objects.exists()
+        assert not os.path.exists(job.artifact)
+        assert not os.path.exists(os.path.dirname(job.artifact))
+
+    def test_expired_shared_artifact_only_removes_the_file(
+        self, project_with_affix_file, temp_export_folder
+    ):
+        shared = os.path.join(temp_export_folder, "kgu_1.dic")
+        other = os.path.join(temp_export_folder, "kgu_1.xml")
+        for path in (shared, other):
+            with open(path, "w") as f:
+                f.write("1\nhobol\n")
+        past = timezone.now() - timedelta(hours=settings.EXPORT_RETENTION_HOURS + 1)
+        job = models.ExportJob.objects.create(
+            project=project_with_affix_file,
+            export_type="dic",
+            project_version=1,
+            project_modified=project_with_affix_file.modified,
+            status="done",
+            artifact=shared,
+        )
+        models.ExportJob.objects.filter(pk=job.pk).update(created=past, finished=past)
+        remove_expired_exports()
+        assert not os.path.exists(shared)
+        assert os.path.exists(other)
+
+    def test_other_projects_jobs_are_hidden(
+        self, client, project_with_affix_file, english_project
+    ):
+        self.post(client, project_with_affix_file)
+        job = models.ExportJob.objects.get()
+        url = reverse("lexicon:export_job_download", args=["eng", job.pk])
+        assert client.get(url).status_code == 404
+
+
 @pytest.mark.django_db
 class TestOxtUpdateViews:
     """Test the oxt update views work correctly."""
@@ -107,3 +289,81 @@ class TestOxtUpdateViews:
         response = client.get(url)
         assert response.status_code == 200
         assert response["Content-Type"] == "text/xml"
+
+
+@pytest.mark.django_db
+class TestOxtUpdateDelivery:
+    """The update package is built once per version and sent cheaply."""
+
+    @pytest.fixture
+    def url(self, project_with_affix_file, temp_export_folder):
+        return reverse("lexicon:oxt_update_deliver", args=["kgu"])
+
+    def test_package_is_built_once(self, client, url, monkeypatch):
+        built = []
+        build = export.build_update_package
+        monkeypatch.setattr(
+            export,
+            "build_update_package",
+            lambda *args: built.append(args) or build(*args),
+        )
+        first = client.get(url)
+        assert int(first["Content-Length"]) > 0
+        assert first["Accept-Ranges"] == "bytes"
+        second = client.get(url)
+        assert b"".join(second.streaming_content) == b"".join(first.streaming_content)
+        assert len(built) == 1
+
+    def test_not_modified(self, client, url):
+        response = client.get(url)
+        response = client.get(url, HTTP_IF_NONE_MATCH=response["ETag"])
+        assert response.status_code == 304
+
+    def test_ranges(self, client, url):
+        full = b"".join(client.get(url).streaming_content)
+
+        response = client.get(url, HTTP_RANGE="bytes=0-9")
+        assert response.status_code == 206
+        assert response["Content-Range"] == f"bytes 0-9/{len(full)}"
+        assert b"".join(response.streaming_content) == full[:10]
+
+        response = client.get(url, HTTP_RANGE="bytes=-5")
+        assert b"".join(response.streaming_content) == full[-5:]
+
+        response = client.get(url, HTTP_RANGE=f"bytes={len(full)}-")
+        assert response.status_code == 416
+        assert response["Content-Range"] == f"bytes */{len(full)}"
+
+    def test_stale_if_range_sends_whole_file(self, client, url):
+        response = client.get(url, HTTP_RANGE="bytes=0-9", HTTP_IF_RANGE='"old"')
+        assert response.status_code == 200
+
+    def test_new_version_replaces_package(
+        self, client, url, project_with_affix_file, temp_export_folder
+    ):
+        client.get(url)
+        project_with_affix_file.increment_version()
+        client.get(url)
+        packages = os.listdir(temp_export_folder)
+        assert len(packages) == 1
+        assert packages[0].startswith(f"kgu_{project_with_affix_file.version}_update_")
+
+    def test_x_accel_redirect(self, client, url, settings):
+        settings.EXPORT_SENDFILE = "x-accel"
+        response = client.get(url)
+        assert response["X-Accel-Redirect"].startswith("/protected-exports/kgu_")
+        assert not response.content
+        assert response["Content-Disposition"] == 'attachment; filename="kgu.oxt"'
+
+    def test_update_poll_is_cached(
+        self, client, project_with_affix_file, django_assert_num_queries
+    ):
+        url = reverse("lexicon:oxt_update_notify", args=["kgu"])
+        client.get(url)
+        with django_assert_num_queries(0):
+            response = client.get(url)
+        assert f"{project_with_affix_file.version}" in response.content.decode()
+
+    def test_missing_project(self, client):
+        url = reverse("lexicon:oxt_update_notify", args=["xyz"])
+        assert client.get(url).status_code == 404
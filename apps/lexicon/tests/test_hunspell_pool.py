@@ -0,0 +1,88 @@
+import os
+import threading
+import time
+
+import pytest
+
+from apps.lexicon.utils.hunspell_pool import HunspellPool, HunspellTimeout, get_pool
+
+AFF = "SFX A Y 1\nSFX A 0 s ."
+
+
+def _sleep(seconds):
+    time.sleep(seconds)
+    return seconds
+
+
+def _crash():
+    os._exit(1)
+
+
+@pytest.fixture
+def pool():
+    pool = HunspellPool(workers=1, timeout=5)
+    yield pool
+    pool.shutdown()
+
+
+def test_inline_pool_expands():
+    """Test that a pool without workers expands in the calling process."""
+    pool = HunspellPool(workers=0)
+    assert pool.expand("cat/A", AFF) == ["cat", "cats"]
+
+
+def test_inline_pool_is_time_limited():
+    """Test that inline expansion gives up at the timeout too."""
+    pool = HunspellPool(workers=0)
+    words = "\n".join(f"cat{i}/A" for i in range(200_000))
+    with pytest.raises(HunspellTimeout):
+        pool.expand(words, AFF, timeout=0.01)
+
+
+def test_tester_has_its_own_pool():
+    """Test that the affix tester's pool is separate from the default one."""
+    assert get_pool("tester") is not get_pool()
+    assert get_pool("tester") is get_pool("tester")
+
+
+def test_pool_expands_in_worker(pool):
+    """Test that workers expand words and are reused between calls."""
+    assert pool.expand("cat/A", AFF) == ["cat", "cats"]
+    [worker] = pool._idle
+    assert pool.expand("dog/A", AFF) == ["dog", "dogs"]
+    assert pool._idle == [worker]
+
+
+def test_pool_timeout_replaces_worker(pool):
+    """Test that a hung request raises and only its worker is replaced."""
+    with pytest.raises(HunspellTimeout):
+        pool.call(_sleep, 5, timeout=0.5)
+    assert pool._idle == []
+    assert pool.expand("cat/A", AFF) == ["cat", "cats"]
+
+
+def test_pool_timeout_spares_other_requests():
+    """Test that a request timing out doesn't fail one running alongside it."""
+    pool = HunspellPool(workers=2, timeout=5)
+    results = []
+    slow = threading.Thread(target=lambda: results.append(pool.call(_sleep, 1)))
+    slow.start()
+    with pytest.raises(HunspellTimeout):
+        pool.call(_sleep, 5, timeout=0.5)
+    slow.join()
+    assert results == [1]
+    pool.shutdown()
+
+
+def test_pool_raises_function_errors(pool):
+    """Test that an error in the function is raised and the worker kept."""
+    with pytest.raises(ZeroDivisionError):
+        pool.call(divmod, 1, 0)
+    assert len(pool._idle) == 1
+
+
+def test_pool_crash_raises_after_retry(pool):
+    """Test that a crashing worker is restarted and the error surfaced."""
+    with pytest.raises(RuntimeError, match="crashing"):
+        pool.call(_crash)
+    assert pool.expand("cat/A", AFF) == ["cat", "cats"]
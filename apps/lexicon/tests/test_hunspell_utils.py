@@ -1,6 +1,3 @@
-import pytest
-import subprocess
-
 from apps.lexicon.utils import hunspell
 
 
@@ -31,38 +28,3 @@ def test_check_length_dic_contents_empty():
     result = hunspell.check_length_dic_contents(content, default_length=7)
     lines = result.splitlines()
     assert lines[0] == "7"
-
-
-def test_unmunch_success(monkeypatch):
-    """Test that unmunch processes words correctly."""
-
-    # Mock subprocess.run to simulate unmunch output
-    class DummyResult:
-        def __init__(self):
-            self.stdout = "walked\nwalking"
-            self.stderr = ""
-
-        def check_returncode(self):
-            pass
-
-    monkeypatch.setattr("subprocess.run", lambda *a, **kw: DummyResult())
-    out = hunspell.unmunch("2\nwalk", "SFX")
-    assert out == ["walked", "walking"]
-
-
-def test_unmunch_failure(monkeypatch):
-    """Test that unmunch raises an error on failure."""
-
-    # Mock subprocess.run to simulate a failure
-    class DummyResult:
-        def __init__(self):
-            self.stdout = ""
-            self.stderr = "error"
-
-        def check_returncode(self):
-            raise subprocess.CalledProcessError(1, "unmunch", output="", stderr="error")
-
-    monkeypatch.setattr("subprocess.run", lambda *a, **kw: DummyResult())
-    with pytest.raises(RuntimeError) as excinfo:
-        hunspell.unmunch("2\nwalk", "SFX")
-    assert "unmunch failed: error" in str(excinfo.value)
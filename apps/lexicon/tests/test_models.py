@@ -3,11 +3,14 @@ from datetime import date
 
 import pytest
 from django.core.exceptions import ValidationError
-from django.db import transaction
+from django.db import connection, transaction
 from django.db.utils import IntegrityError
+from django.test.utils import CaptureQueriesContext
 from django.urls import reverse
 
-from apps.lexicon import models
+from apps.lexicon import models, tasks
+from apps.lexicon.signals import bulk_conjugation_write
+from apps.lexicon.utils import export
 
 
 @pytest.mark.django_db
@@ -494,6 +497,24 @@ class TestLexiconEntryModel:
         )
         assert entry.text == "changed"  # Verify change took effect
 
+    def test_entry_save_keeps_newer_project_fields(self, english_project):
+        """An entry's stale project doesn't overwrite fields changed since it was read."""
+        entry = models.LexiconEntry.objects.create(
+            project=english_project, text="original"
+        )
+        entry = models.LexiconEntry.objects.select_related("project").get(pk=entry.pk)
+        models.LexiconProject.objects.filter(pk=english_project.pk).update(
+            conjugation_storage="grid", hunspell_forms_affix_hash="rebuilt", version=7
+        )
+
+        entry.text = "changed"
+        entry.save()
+        english_project.refresh_from_db()
+        assert english_project.conjugation_storage == "grid"
+        assert english_project.hunspell_forms_affix_hash == "rebuilt"
+        assert english_project.version == 8
+        assert entry.project.version == 8
+
     def test_version_incremented_on_affix_file_change(self, project_with_affix_file):
         """Project version should increment when affix file is changed."""
         models.LexiconEntry.objects.create(
@@ -1071,3 +1092,148 @@ class TestAffixModel:
             project=english_project, name="Suffix", applies_to="n", affix_letter="H"
         )
         assert str(affix) == f"Affix H for {english_project.language_name}"
+
+
+@pytest.mark.django_db
+class TestHunspellFormModel:
+    def forms(self, entry):
+        return set(entry.hunspell_forms.values_list("form", flat=True))
+
+    def test_forms_built_on_entry_create(self, project_with_affix_file):
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="hobol"
+        )
+        assert self.forms(entry) == {"hobol", "hobolyam"}
+        assert entry.hunspell_forms.get(form="hobolyam").affix_letter == "A"
+
+    def test_forms_follow_conjugations_and_variations(self, project_with_affix_file):
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="bili"
+        )
+        paradigm = models.Paradigm.objects.create(
+            name="p",
+            project=project_with_affix_file,
+            part_of_speech="n",
+            row_labels=["a"],
+            column_labels=["b"],
+        )
+        conjugation = models.Conjugation.objects.create(
+            word=entry, paradigm=paradigm, row=0, column=0, conjugation="bilim"
+        )
+        models.Variation.objects.create(
+            word=entry, type="spelling", text="bilu", included_in_spellcheck=True
+        )
+        assert {"bilim", "bilimyam", "bilu", "biluyam"} <= self.forms(entry)
+
+        conjugation.delete()
+        assert "bilimyam" not in self.forms(entry)
+
+        models.Variation.objects.filter(word=entry).delete()
+        assert "biluyam" not in self.forms(entry)
+
+    def test_bulk_conjugation_write_skips_form_updates(self, project_with_affix_file):
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="bili"
+        )
+        models.Variation.objects.create(
+            word=entry, type="spelling", text="bilu", included_in_spellcheck=True
+        )
+        with bulk_conjugation_write():
+            models.Variation.objects.filter(word=entry).delete()
+        assert "biluyam" in self.forms(entry)
+
+    def test_forms_follow_affixes(self, project_with_affix_file):
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="hobol"
+        )
+        entry.affixes.clear()
+        assert self.forms(entry) == {"hobol"}
+
+    def test_forms_rebuilt_on_affix_file_change(self, project_with_affix_file):
+        project_with_affix_file.affix_file = "SFX A Y 1\nSFX A 0 im ."
+        project_with_affix_file.save()
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="hobol"
+        )
+        assert self.forms(entry) == {"hobol", "hobolim"}
+
+    def test_affix_file_change_queues_the_rebuild(
+        self, project_with_affix_file, monkeypatch
+    ):
+        queued = []
+        monkeypatch.setattr(
+            tasks.rebuild_project_hunspell_forms, "delay", queued.append
+        )
+        project_with_affix_file.affix_file = "SFX A Y 1\nSFX A 0 im ."
+        project_with_affix_file.save()
+        assert queued == ["kgu"]
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="hobol"
+        )
+        # The old forms are kept until the rebuild runs
+        assert self.forms(entry) == {"hobol", "hobolyam"}
+        project_with_affix_file.refresh_from_db()
+        assert project_with_affix_file.hunspell_forms_affix_hash is None
+
+    def test_affix_delete_marks_forms_stale(self, project_with_affix_file):
+        models.Affix.objects.filter(project=project_with_affix_file).delete()
+        project_with_affix_file.refresh_from_db()
+        assert project_with_affix_file.hunspell_forms_affix_hash is None
+        assert project_with_affix_file.known_words(["hobolyam", "hobol"]) == {"hobol"}
+
+    def test_stale_forms_rebuilt_in_background_once(
+        self, project_with_affix_file, monkeypatch
+    ):
+        queued = []
+        monkeypatch.setattr(
+            tasks.rebuild_project_hunspell_forms, "delay", queued.append
+        )
+        models.LexiconProject.objects.filter(pk=project_with_affix_file.pk).update(
+            hunspell_forms_affix_hash=None
+        )
+        project_with_affix_file.refresh_from_db()
+        assert project_with_affix_file.ensure_hunspell_forms() is False
+        assert project_with_affix_file.ensure_hunspell_forms() is False
+        assert queued == ["kgu"]
+        # The stale forms are served meanwhile
+        assert project_with_affix_file.known_words(["hobolyam"]) == {"hobolyam"}
+
+        tasks.rebuild_project_hunspell_forms("kgu")
+        assert project_with_affix_file.ensure_hunspell_forms() is True
+
+    def test_stale_forms_expanded_for_exports(
+        self, project_with_affix_file, monkeypatch
+    ):
+        current = export._get_plain_word_list(project_with_affix_file, checked=False)
+        monkeypatch.setattr(
+            tasks.rebuild_project_hunspell_forms, "delay", lambda lang_code: None
+        )
+        models.HunspellForm.objects.all().delete()
+        project_with_affix_file.hunspell_forms_affix_hash = None
+        models.LexiconProject.objects.filter(pk=project_with_affix_file.pk).update(
+            hunspell_forms_affix_hash=None
+        )
+        stale = export._get_plain_word_list(project_with_affix_file, checked=False)
+        assert stale == current
+
+    def test_rebuild_locks_the_project(self, project_with_affix_file):
+        with CaptureQueriesContext(connection) as context:
+            tasks.rebuild_project_hunspell_forms("kgu")
+        assert any("FOR UPDATE" in q["sql"] for q in context.captured_queries)
+
+    def test_entry_delete_cascades(self, project_with_affix_file):
+        entry = models.LexiconEntry.objects.get(
+            project=project_with_affix_file, text="hobol"
+        )
+        paradigm = models.Paradigm.objects.create(
+            name="p",
+            project=project_with_affix_file,
+            part_of_speech="n",
+            row_labels=["a"],
+            column_labels=["b"],
+        )
+        models.Conjugation.objects.create(
+            word=entry, paradigm=paradigm, row=0, column=0, conjugation="hobolim"
+        )
+        entry.delete()
+        assert not models.HunspellForm.objects.filter(entry_id=entry.pk).exists()
@@ -0,0 +1,139 @@
+import pytest
+
+from apps.lexicon import models, tasks
+from apps.lexicon.utils.paradigm_generator import (
+    GenerationRuleError,
+    ParadigmGenerator,
+    generate_conjugations,
+    parse_cell_rule,
+    parse_stem_pattern,
+)
+
+
+class TestRules:
+    def test_parse_cell_rule(self):
+        rule = parse_cell_rule("{stem}im / ii>i")
+        assert rule.apply("bili", "bili") == "bilim"
+        assert rule.apply("gi", "gi") == "gim"
+
+    def test_blank_rule(self):
+        assert parse_cell_rule("  ") is None
+
+    @pytest.mark.parametrize("text", ["am", "{stem}am / ii", "{stem} / [>i"])
+    def test_invalid_rules(self, text):
+        with pytest.raises(GenerationRuleError):
+            parse_cell_rule(text)
+
+    def test_stem_pattern_needs_one_group(self):
+        with pytest.raises(GenerationRuleError):
+            parse_stem_pattern("^.*ol$")
+
+    def test_generator(self):
+        generator = ParadigmGenerator(
+            "^(.*)ol$", [["{stem}am", ""], ["{word}i", "{stem}"]], 2, 2
+        )
+        assert generator.generate("hobol") == [
+            (0, 0, "hobam"),
+            (1, 0, "hoboli"),
+            (1, 1, "hob"),
+        ]
+        assert generator.generate("bili") is None
+
+
+@pytest.mark.django_db
+class TestGenerateConjugations:
+    @pytest.fixture
+    def paradigm(self, kovol_project, kovol_words):
+        paradigm = models.Paradigm.objects.create(
+            name="Verb",
+            project=kovol_project,
+            row_labels=["1s", "2s"],
+            column_labels=["past", "future"],
+        )
+        for word in kovol_words:
+            word.paradigms.add(paradigm)
+        return paradigm
+
+    def test_fills_empty_cells(self, paradigm, kovol_words):
+        template = models.GenerationTemplate.objects.create(
+            paradigm=paradigm, cell_rules=[["{stem}am", "{stem}ab"], ["{stem}um", ""]]
+        )
+        hobol = kovol_words[0]
+        models.Conjugation.objects.create(
+            word=hobol, paradigm=paradigm, row=0, column=0, conjugation="hobolem"
+        )
+        models.Conjugation.objects.create(
+            word=hobol, paradigm=paradigm, row=0, column=1, conjugation=""
+        )
+        version = models.LexiconProject.objects.get(pk=paradigm.project.pk).version
+
+        report = generate_conjugations(template)
+
+        stored = dict(
+            models.Conjugation.objects.filter(word=hobol)
+            .values_list("row", "conjugation")
+            .filter(column=1)
+        )
+        assert stored == {0: "hobolab"}
+        assert report["created"] == 5
+        assert report["conflicts"] == [
+            {
+                "word": "hobol",
+                "cell": "1s, past",
+                "existing": "hobolem",
+                "generated": "hobolam",
+            }
+        ]
+        project = models.LexiconProject.objects.get(pk=paradigm.project.pk)
+        assert project.version == version + 1
+        assert "bilium" in models.LexiconEntry.objects.get(text="bili").search
+
+    def test_invalid_and_skipped(self, paradigm, kovol_project):
+        kovol_project.text_validator = "[a-z]+"
+        kovol_project.save()
+        template = models.GenerationTemplate.objects.create(
+            paradigm=paradigm,
+            stem_pattern="^(.*)i$",
+            cell_rules=[["{stem}-a", "{stem}o"], ["", ""]],
+        )
+
+        report = generate_conjugations(template)
+
+        assert report["created"] == 1
+        assert report["invalid"] == [
+            {"word": "bili", "cell": "1s, past", "generated": "bil-a"}
+        ]
+        assert report["skipped"] == ["hobol"]
+
+    def test_many_entries_use_few_queries(
+        self, paradigm, kovol_project, django_assert_max_num_queries
+    ):
+        words = models.LexiconEntry.objects.bulk_create(
+            models.LexiconEntry(text=f"word{i}", project=kovol_project)
+            for i in range(300)
+        )
+        models.LexiconEntry.paradigms.through.objects.bulk_create(
+            models.LexiconEntry.paradigms.through(
+                lexiconentry_id=w.pk, paradigm_id=paradigm.pk
+            )
+            for w in words
+        )
+        template = models.GenerationTemplate.objects.create(
+            paradigm=paradigm,
+            cell_rules=[["{stem}a", "{stem}b"], ["{stem}c", "{stem}d"]],
+        )
+
+        # Includes marking the project modified after the search fields change
+        with django_assert_max_num_queries(21):
+            report = generate_conjugations(template, batch_size=200)
+
+        assert report["created"] == 302 * 4
+
+    def test_task_stores_report(self, paradigm):
+        template = models.GenerationTemplate.objects.create(
+            paradigm=paradigm, cell_rules=[["{stem}a", ""], ["", ""]]
+        )
+        tasks.generate_paradigm_conjugations(template.pk)
+        template.refresh_from_db()
+        assert template.status == "done"
+        assert template.report["created"] == 2
@@ -0,0 +1,124 @@
+import pytest
+
+from apps.lexicon import models
+from apps.lexicon.utils.conjugations import convert_conjugation_storage
+from apps.lexicon.utils.paradigm_reshape import (
+    ReshapeError,
+    position_mapping,
+    reshape_paradigm,
+)
+
+
+class TestPositionMapping:
+    def test_insert(self):
+        assert position_mapping(3, "insert", 1) == {1: 2, 2: 3}
+
+    def test_delete(self):
+        assert position_mapping(3, "delete", 0) == {0: None, 1: 0, 2: 1}
+
+    def test_move(self):
+        assert position_mapping(4, "move", 3, to=1) == {1: 2, 2: 3, 3: 1}
+
+    @pytest.mark.parametrize(
+        "operation, index, to",
+        [("insert", 4, None), ("delete", 3, None), ("move", 0, 3)],
+    )
+    def test_out_of_range(self, operation, index, to):
+        with pytest.raises(ReshapeError):
+            position_mapping(3, operation, index, to)
+
+
+def grid(word, paradigm):
+    cells = models.read_conjugation_cells(word=word, paradigm=paradigm)
+    return {(row, column): text for _, _, row, column, text in cells}
+
+
+@pytest.mark.django_db
+@pytest.mark.parametrize("layout", ["rows", "grid"])
+class TestReshapeParadigm:
+    @pytest.fixture
+    def reshaped(self, layout, english_project, multirow_paradigm):
+        """The 3x2 multirow paradigm, in the layout being tested."""
+        word, paradigm, _ = multirow_paradigm
+        convert_conjugation_storage(english_project, layout)
+        paradigm.refresh_from_db()
+        return word, paradigm
+
+    def test_insert_column(self, reshaped):
+        word, paradigm = reshaped
+        assert reshape_paradigm(paradigm, "column", "insert", 0, label="new") == 1
+
+        paradigm.refresh_from_db()
+        assert paradigm.column_labels == ["new", "1", "2"]
+        assert grid(word, paradigm) == {
+            (r, c + 1): f"orig_{r}_{c}" for r in range(3) for c in range(2)
+        }
+
+    def test_delete_row(self, reshaped, english_project):
+        word, paradigm = reshaped
+        version = models.LexiconProject.objects.get(pk=english_project.pk).version
+        reshape_paradigm(paradigm, "row", "delete", 1)
+
+        paradigm.refresh_from_db()
+        assert paradigm.row_labels == ["1", "3"]
+        assert grid(word, paradigm) == {
+            (0, 0): "orig_0_0",
+            (0, 1): "orig_0_1",
+            (1, 0): "orig_2_0",
+            (1, 1): "orig_2_1",
+        }
+        word.refresh_from_db()
+        assert "orig_1_0" not in word.search
+        project = models.LexiconProject.objects.get(pk=english_project.pk)
+        assert project.version == version + 1
+
+    def test_move_row(self, reshaped):
+        word, paradigm = reshaped
+        reshape_paradigm(paradigm, "row", "move", 2, to=0)
+
+        paradigm.refresh_from_db()
+        assert paradigm.row_labels == ["3", "1", "2"]
+        assert grid(word, paradigm)[(0, 1)] == "orig_2_1"
+        assert grid(word, paradigm)[(2, 0)] == "orig_1_0"
+
+    def test_template_rules_move_too(self, reshaped):
+        word, paradigm = reshaped
+        models.GenerationTemplate.objects.create(
+            paradigm=paradigm, cell_rules=[["a", "b"], ["c", "d"], ["e", "f"]]
+        )
+        reshape_paradigm(paradigm, "column", "move", 1, to=0)
+
+        template = models.GenerationTemplate.objects.get(paradigm=paradigm)
+        assert template.cell_rules == [["b", "a"], ["d", "c"], ["f", "e"]]
+
+    def test_last_row_cant_be_deleted(self, reshaped):
+        word, paradigm = reshaped
+        reshape_paradigm(paradigm, "column", "delete", 0)
+        with pytest.raises(ReshapeError):
+            reshape_paradigm(paradigm, "column", "delete", 0)
+
+
+@pytest.mark.django_db
+def test_reshape_queries_dont_grow_with_entries(
+    english_project, django_assert_max_num_queries
+):
+    paradigm = models.Paradigm.objects.create(
+        name="Big", project=english_project, row_labels=["a", "b"], column_labels=["c"]
+    )
+    entries = models.LexiconEntry.objects.bulk_create(
+        models.LexiconEntry(text=f"word{i}", project=english_project)
+        for i in range(200)
+    )
+    models.Conjugation.objects.bulk_create(
+        models.Conjugation(
+            word=entry, paradigm=paradigm, row=row, column=0, conjugation=f"f{row}"
+        )
+        for entry in entries
+        for row in range(2)
+    )
+
+    # Includes marking the project modified for the paradigm and the search fields
+    with django_assert_max_num_queries(14):
+        assert reshape_paradigm(paradigm, "row", "move", 1, to=0) == 200
+    assert models.Conjugation.objects.get(word=entries[0], row=0).conjugation == "f1"
+    assert models.LexiconEntry.objects.get(pk=entries[0].pk).search == "word0 f0 f1"
@@ -0,0 +1,174 @@
+import io
+import os
+import tracemalloc
+import xml.etree.ElementTree as ET
+from datetime import timedelta
+
+import pytest
+from django.core.files.uploadedfile import SimpleUploadedFile
+from django.urls import reverse
+
+from apps.lexicon import models
+from apps.lexicon.utils import paratext
+
+SPELLING_STATUS = """<?xml version="1.0" encoding="utf-8"?>
+<SpellingStatus>
+  <Status Word="hobol" State="W" />
+  <Status Word="bili" State="R" />
+  <Status Word="paratextword" State="W">
+    <Correction>paratext</Correction>
+  </Status>
+</SpellingStatus>
+"""
+
+
+def statuses(path):
+    """Return each word's state from a SpellingStatus file."""
+    return {
+        element.get("Word"): element.get("State")
+        for element in ET.parse(path).getroot()
+    }
+
+
+@pytest.mark.django_db
+class TestMergeSpellingStatus:
+    def test_merge(self, temp_export_folder):
+        path = os.path.join(temp_export_folder, "merged.xml")
+        stats = paratext.merge_spelling_status(
+            io.BytesIO(SPELLING_STATUS.encode()),
+            path,
+            words={"hobol", "bili", "newword"},
+            changed={"hobol", "bili", "newword"},
+        )
+        assert stats == {"kept": 2, "updated": 1, "added": 1}
+        assert statuses(path) == {
+            "hobol": "R",
+            "bili": "R",
+            "paratextword": "W",
+            "newword": "R",
+        }
+        # Elements the lexicon doesn't know about are written as they were
+        with open(path, encoding="utf-8") as f:
+            assert "<Correction>paratext</Correction>" in f.read()
+
+    def test_unchanged_words_keep_paratext_state(self, temp_export_folder):
+        path = os.path.join(temp_export_folder, "merged.xml")
+        stats = paratext.merge_spelling_status(
+            io.BytesIO(SPELLING_STATUS.encode()),
+            path,
+            words={"hobol", "bili"},
+            changed=set(),
+        )
+        assert stats == {"kept": 3, "updated": 0, "added": 0}
+        assert statuses(path)["hobol"] == "W"
+
+    def test_large_file_in_bounded_memory(self, temp_export_folder):
+        source = os.path.join(temp_export_folder, "SpellingStatus.xml")
+        with open(source, "w", encoding="utf-8") as f:
+            f.write("<SpellingStatus>\n")
+            for i in range(100_000):
+                f.write(f'  <Status Word="paratext{i}" State="W" />\n')
+            f.write("</SpellingStatus>\n")
+
+        path = os.path.join(temp_export_folder, "merged.xml")
+        tracemalloc.start()
+        stats = paratext.merge_spelling_status(
+            source, path, words={"paratext5", "new"}, changed={"paratext5"}
+        )
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert stats == {"kept": 99_999, "updated": 1, "added": 1}
+        # Parsing the whole file into a tree would take tens of megabytes
+        assert peak < os.path.getsize(source) / 10
+
+
+@pytest.mark.django_db
+class TestMergeWords:
+    def test_changed_since_version(self, project_with_affix_file):
+        project = project_with_affix_file
+        words, changed = paratext.get_merge_words(project, since_version=None)
+        assert changed == words
+
+        merge = models.ParatextMerge.objects.create(
+            project=project, version=project.version
+        )
+        models.ParatextMerge.objects.filter(pk=merge.pk).update(
+            created=merge.created + timedelta(days=1)
+        )
+        words, changed = paratext.get_merge_words(
+            project, since_version=project.version, checked=False
+        )
+        assert "hobol" in words
+        assert changed == set()
+
+        entry = project.entries.get(text="hobol")
+        models.LexiconEntry.objects.filter(pk=entry.pk).update(
+            modified=(merge.created + timedelta(days=1)).date()
+        )
+        words, changed = paratext.get_merge_words(
+            project, since_version=project.version, checked=False
+        )
+        assert "hobol" in changed
+        assert "bili" not in changed
+
+    def test_unknown_version_applies_everything(self, project_with_affix_file):
+        words, changed = paratext.get_merge_words(
+            project_with_affix_file, since_version=1
+        )
+        assert changed == words
+
+
+@pytest.mark.django_db
+class TestParatextMergePage:
+    def url(self):
+        return reverse("lexicon:paratext_merge", args=["kgu"])
+
+    def test_merge_download(self, client, temp_export_folder, project_with_affix_file):
+        response = client.post(
+            self.url(),
+            data={
+                "file": SimpleUploadedFile(
+                    "SpellingStatus.xml", SPELLING_STATUS.encode()
+                ),
+                "checked": False,
+                "include_hunspell": True,
+            },
+        )
+        assert response.status_code == 200
+        assert response["Content-Disposition"].endswith('"SpellingStatus.xml"')
+        content = b"".join(response.streaming_content).decode()
+        assert '<Status Word="hobol" State="R" />' in content
+        assert '<Status Word="paratextword" State="W">' in content
+
+        merge = models.ParatextMerge.objects.get()
+        assert merge.version == project_with_affix_file.version
+        # The next merge starts from this one
+        response = client.get(self.url())
+        assert response.context["form"].initial["since_version"] == merge.version
+
+    def test_each_merge_has_its_own_file(
+        self, temp_export_folder, project_with_affix_file
+    ):
+        first, _ = paratext.merge_project(
+            project_with_affix_file, io.BytesIO(SPELLING_STATUS.encode())
+        )
+        other = SPELLING_STATUS.replace("paratextword", "otherword")
+        second, _ = paratext.merge_project(
+            project_with_affix_file, io.BytesIO(other.encode())
+        )
+        assert first != second
+        assert os.path.dirname(first) == temp_export_folder
+        assert "paratextword" in statuses(first)
+        assert "otherword" in statuses(second)
+        assert models.ExportArtifact.objects.filter(path=second).exists()
+
+    def test_invalid_file(self, client, temp_export_folder, project_with_affix_file):
+        response = client.post(
+            self.url(),
+            data={"file": SimpleUploadedFile("SpellingStatus.xml", b"not xml")},
+        )
+        assert response.status_code == 200
+        assert response.context["form"].errors["file"]
+        assert not models.ParatextMerge.objects.exists()
+        assert not os.listdir(temp_export_folder)
@@ -0,0 +1,180 @@
+import pytest
+from django.contrib.auth.models import Group
+from django.http import Http404
+from django.test import RequestFactory
+from django.urls import reverse
+from guardian.shortcuts import assign_perm, remove_perm
+
+from apps.lexicon.permissions import (
+    get_request_project,
+    has_project_permission,
+    prefetch_project_permissions,
+)
+
+
+@pytest.fixture
+def request_for():
+    def build(user):
+        request = RequestFactory().get("/")
+        request.user = user
+        return request
+
+    return build
+
+
+@pytest.mark.django_db
+class TestRequestScopedLookups:
+    def test_project_is_fetched_once(
+        self, request_for, user, english_project, django_assert_num_queries
+    ):
+        request = request_for(user)
+        with django_assert_num_queries(1):
+            project = get_request_project(request, "eng")
+            assert get_request_project(request, "eng") is project
+
+    def test_missing_project_is_404(self, request_for, user):
+        with pytest.raises(Http404):
+            get_request_project(request_for(user), "xyz")
+
+    def test_permission_is_checked_once(
+        self,
+        request_for,
+        permissioned_user,
+        english_project,
+        kovol_project,
+        django_assert_max_num_queries,
+    ):
+        request = request_for(permissioned_user)
+        assert has_project_permission(request, english_project)
+        with django_assert_max_num_queries(0):
+            assert has_project_permission(request, english_project)
+        # Other projects are checked separately
+        assert has_project_permission(request, kovol_project)
+
+    def test_denied_permission_is_memoized(
+        self, request_for, user, english_project, django_assert_max_num_queries
+    ):
+        request = request_for(user)
+        assert not has_project_permission(request, english_project)
+        with django_assert_max_num_queries(0):
+            assert not has_project_permission(request, english_project)
+
+
+@pytest.mark.django_db
+class TestCachedPermissions:
+    """Permissions are cached across requests until guardian changes them."""
+
+    def test_cached_across_requests(
+        self, request_for, permissioned_user, english_project, django_assert_num_queries
+    ):
+        assert has_project_permission(request_for(permissioned_user), english_project)
+        with django_assert_num_queries(0):
+            assert has_project_permission(
+                request_for(permissioned_user), english_project
+            )
+
+    def test_assign_and_remove_invalidate(self, request_for, user, english_project):
+        assert not has_project_permission(request_for(user), english_project)
+        assign_perm("edit_lexiconproject", user, english_project)
+        assert has_project_permission(request_for(user), english_project)
+        remove_perm("edit_lexiconproject", user, english_project)
+        assert not has_project_permission(request_for(user), english_project)
+
+    def test_group_changes_invalidate(self, request_for, user, english_project):
+        group = Group.objects.create(name="editors")
+        assign_perm("edit_lexiconproject", group, english_project)
+        assert not has_project_permission(request_for(user), english_project)
+        user.groups.add(group)
+        assert has_project_permission(request_for(user), english_project)
+        user.groups.remove(group)
+        assert not has_project_permission(request_for(user), english_project)
+
+    def test_other_projects_stay_cached(
+        self,
+        request_for,
+        permissioned_user,
+        english_project,
+        kovol_project,
+        django_assert_max_num_queries,
+    ):
+        assert has_project_permission(request_for(permissioned_user), kovol_project)
+        remove_perm("edit_lexiconproject", permissioned_user, english_project)
+        with django_assert_max_num_queries(0):
+            assert has_project_permission(request_for(permissioned_user), kovol_project)
+
+    def test_prefetch(
+        self,
+        request_for,
+        user,
+        english_project,
+        kovol_project,
+        django_assert_num_queries,
+        django_assert_max_num_queries,
+    ):
+        assign_perm("edit_lexiconproject", user, kovol_project)
+        projects = [english_project, kovol_project]
+        request = request_for(user)
+        # The user's and group's permissions are checked together
+        with django_assert_num_queries(1):
+            assert prefetch_project_permissions(request, projects) == {kovol_project.pk}
+        with django_assert_max_num_queries(0):
+            assert not has_project_permission(request, english_project)
+            assert prefetch_project_permissions(request_for(user), projects) == {
+                kovol_project.pk
+            }
+
+    def test_project_list(
+        self, client, user, english_project, kovol_project, django_assert_num_queries
+    ):
+        assign_perm("edit_lexiconproject", user, english_project)
+        client.force_login(user)
+        # Session, user, projects, editable projects
+        with django_assert_num_queries(4):
+            response = client.get(reverse("lexicon:project_list"))
+        assert response.context["editable_projects"] == {english_project.pk}
+        assert reverse("lexicon:project_admin", args=["eng"]) in (
+            response.content.decode()
+        )
+        assert reverse("lexicon:project_admin", args=["kgu"]) not in (
+            response.content.decode()
+        )
+
+
+@pytest.mark.django_db
+class TestViewQueryCounts:
+    """The project and permission are looked up once however often views ask."""
+
+    def test_paradigm_list(
+        self, client, permissioned_user, multirow_paradigm, django_assert_num_queries
+    ):
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:project_admin_paradigm_list", args=["eng"])
+        # Session, user, project, user and group permissions, paradigms
+        with django_assert_num_queries(6):
+            assert client.get(url).status_code == 200
+
+    def test_affix_file_update(
+        self, client, permissioned_user, english_project, django_assert_num_queries
+    ):
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:project_admin_affix_file_update", args=["eng"])
+        with django_assert_num_queries(5):
+            assert client.get(url).status_code == 200
+
+    def test_word_affix_list(
+        self, client, permissioned_user, english_words, django_assert_num_queries
+    ):
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:word_affix_list", args=["eng", english_words[0].pk])
+        # Project, word, the word's affixes, the project's affixes
+        with django_assert_num_queries(4):
+            assert client.get(url).status_code == 200
+
+    def test_variation_list(
+        self, client, permissioned_user, english_words, django_assert_num_queries
+    ):
+        client.force_login(permissioned_user)
+        url = reverse("lexicon:variation_list", args=["eng", english_words[0].pk])
+        # Word with project, variations
+        with django_assert_num_queries(2):
+            assert client.get(url).status_code == 200
@@ -343,3 +343,158 @@ class TestProjectAdminPermissions:
             assert response.status_code == 403, (
                 f"Unpermissioned user should not be able to access {url}"
             )
+
+
+@pytest.mark.django_db
+class TestDuplicateViews:
+    @pytest.fixture
+    def duplicate_words(self, kovol_project, kovol_words):
+        models.LexiconEntry.objects.create(text="hobal", project=kovol_project)
+        return kovol_words
+
+    def test_report_requires_permission(self, client, user, kovol_project):
+        url = reverse(
+            "lexicon:project_admin_duplicates",
+            kwargs={"lang_code": kovol_project.language_code},
+        )
+        client.force_login(user)
+        response = client.get(url)
+        assert response.status_code == 403
+
+    def test_scan_lists_candidates(
+        self, client, permissioned_user, kovol_project, duplicate_words
+    ):
+        """Starting a scan runs the task (eagerly in tests) and shows the results."""
+        url = reverse(
+            "lexicon:project_admin_duplicate_scan",
+            kwargs={"lang_code": kovol_project.language_code},
+        )
+        client.force_login(permissioned_user)
+        response = client.post(url)
+        assert response.status_code == 200
+        assert models.DuplicateScan.objects.get(project=kovol_project).status == "done"
+
+        url = reverse(
+            "lexicon:project_admin_duplicates",
+            kwargs={"lang_code": kovol_project.language_code},
+        )
+        content = client.get(url).content.decode()
+        assert "hobal" in content
+        assert "Keep hobol" in content
+
+    def test_merge_keeps_chosen_entry(
+        self, client, permissioned_user, kovol_project, duplicate_words
+    ):
+        from apps.lexicon import tasks
+
+        tasks.find_duplicate_entries(kovol_project.language_code)
+        candidate = models.DuplicateCandidate.objects.get()
+        url = reverse(
+            "lexicon:project_admin_duplicate_merge",
+            kwargs={"lang_code": kovol_project.language_code, "pk": candidate.pk},
+        )
+        client.force_login(permissioned_user)
+        response = client.post(url, {"keep": "duplicate"})
+        assert response.status_code == 200
+        assert list(
+            models.LexiconEntry.objects.filter(
+                project=kovol_project, text__startswith="hob"
+            ).values_list("text", flat=True)
+        ) == ["hobal"]
+        assert not models.DuplicateCandidate.objects.exists()
+
+
+@pytest.mark.django_db
+class TestGenerateConjugationsViews:
+    def get_url(self, paradigm):
+        return reverse(
+            "lexicon:project_admin_paradigm_generate",
+            kwargs={"lang_code": "eng", "pk": paradigm.pk},
+        )
+
+    def test_get_shows_a_field_per_cell(
+        self, client, permissioned_user, multirow_paradigm
+    ):
+        _, paradigm, _ = multirow_paradigm
+        client.force_login(permissioned_user)
+        response = client.get(self.get_url(paradigm))
+        assert response.status_code == 200
+        assert 'name="cell_2_1"' in response.content.decode()
+
+    def test_invalid_rule_is_reported(
+        self, client, permissioned_user, english_words_with_paradigm
+    ):
+        _, paradigm, _ = english_words_with_paradigm
+        client.force_login(permissioned_user)
+        response = client.post(
+            self.get_url(paradigm), {"stem_pattern": "", "cell_0_0": "{stem}a / x"}
+        )
+        assert response.status_code == 200
+        assert "should be written as old&gt;new" in response.content.decode()
+        assert not models.GenerationTemplate.objects.exists()
+
+    def test_apply_fills_empty_cells(
+        self, client, permissioned_user, english_words_with_paradigm
+    ):
+        words, paradigm, _ = english_words_with_paradigm
+        words[1].paradigms.add(paradigm)
+        client.force_login(permissioned_user)
+        response = client.post(
+            self.get_url(paradigm),
+            {"stem_pattern": "^(.*)_word$", "cell_0_0": "{stem}ed", "apply": "true"},
+            follow=True,
+        )
+        assert response.status_code == 200
+        assert models.Conjugation.objects.get(word=words[1]).conjugation == "extraed"
+        # The existing conjugation is kept and reported
+        assert models.Conjugation.objects.get(word=words[0]).conjugation == "test"
+        assert "tested" in response.content.decode()
+
+    def test_requires_permission(self, client, user, english_words_with_paradigm):
+        _, paradigm, _ = english_words_with_paradigm
+        client.force_login(user)
+        assert client.get(self.get_url(paradigm)).status_code == 403
+
+
+@pytest.mark.django_db
+class TestReshapeParadigmViews:
+    def get_url(self, paradigm):
+        return reverse(
+            "lexicon:project_admin_paradigm_reshape",
+            kwargs={"lang_code": "eng", "pk": paradigm.pk},
+        )
+
+    def test_insert_row_moves_conjugations(
+        self, client, permissioned_user, multirow_paradigm
+    ):
+        _, paradigm, _ = multirow_paradigm
+        client.force_login(permissioned_user)
+        response = client.post(
+            self.get_url(paradigm),
+            {"axis": "row", "operation": "insert", "position": 1, "label": "new"},
+            follow=True,
+        )
+        assert response.status_code == 200
+        assert "The conjugations of 1 entries were updated" in response.content.decode()
+        paradigm.refresh_from_db()
+        assert paradigm.row_labels == ["new", "1", "2", "3"]
+        assert models.Conjugation.objects.get(row=1, column=1).conjugation == "orig_0_1"
+
+    def test_out_of_range_position_is_reported(
+        self, client, permissioned_user, multirow_paradigm
+    ):
+        _, paradigm, _ = multirow_paradigm
+        client.force_login(permissioned_user)
+        response = client.post(
+            self.get_url(paradigm),
+            {"axis": "column", "operation": "delete", "position": 5},
+        )
+        assert response.status_code == 200
+        assert "outside the paradigm" in response.content.decode()
+        paradigm.refresh_from_db()
+        assert paradigm.column_labels == ["1", "2"]
+
+    def test_requires_permission(self, client, user, multirow_paradigm):
+        _, paradigm, _ = multirow_paradigm
+        client.force_login(user)
+        assert client.get(self.get_url(paradigm)).status_code == 403
@@ -1,11 +1,19 @@
+import io
 import json
+import os
+import threading
+import tracemalloc
 from datetime import date
 
 import pytest
+from django.core.management import call_command
+from django.db import connection, connections
+from django.test.utils import CaptureQueriesContext
 
 from apps.lexicon.models import (
     Affix,
     Conjugation,
+    GenerationTemplate,
     IgnoreWord,
     LexiconEntry,
     LexiconProject,
@@ -13,11 +21,16 @@ from apps.lexicon.models import (
     Sense,
     Variation,
 )
+from apps.lexicon.utils import project_import_export
+from apps.lexicon.utils.conjugations import convert_conjugation_storage
 from apps.lexicon.utils.project_import_export import (
     export_project,
     export_project_to_json,
     import_project,
+    import_project_from_file,
     import_project_from_json,
+    iter_project_json,
+    write_project_json,
 )
 
 # --- Fixtures ---
@@ -114,12 +127,27 @@ class TestExport:
         assert p["language_code"] == "kgu"
         assert p["language_name"] == "Kovol"
         assert p["secondary_language"] == "Tok Pisin"
+        assert p["conjugation_storage"] == "rows"
 
     def test_paradigms_exported(self, full_project):
         data = export_project(full_project.pk)
         assert len(data["paradigms"]) == 1
         assert data["paradigms"][0]["name"] == "verb conjugation"
         assert data["paradigms"][0]["row_labels"] == ["1sg", "2sg", "3sg"]
+        assert data["paradigms"][0]["generation_template"] is None
+
+    def test_generation_template_exported(self, full_project, paradigm):
+        GenerationTemplate.objects.create(
+            paradigm=paradigm,
+            stem_pattern="^(.*)un$",
+            cell_rules=[["{stem}am", ""], ["", ""], ["", "{stem}im / ii>i"]],
+            status="done",
+        )
+        data = export_project(full_project.pk)
+        assert data["paradigms"][0]["generation_template"] == {
+            "stem_pattern": "^(.*)un$",
+            "cell_rules": [["{stem}am", ""], ["", ""], ["", "{stem}im / ii>i"]],
+        }
 
     def test_affixes_exported(self, full_project):
         data = export_project(full_project.pk)
@@ -182,6 +210,73 @@ class TestExport:
         assert data["affixes"] == []
         assert data["ignore_words"] == []
 
+    def test_json_matches_dumps(self, full_project, monkeypatch):
+        monkeypatch.setattr(
+            "apps.lexicon.utils.project_import_export.EXPORT_CHUNK_SIZE", 1
+        )
+        json_str = export_project_to_json(full_project.pk)
+        expected = export_project(full_project.pk)
+        expected["exported_at"] = json.loads(json_str)["exported_at"]
+        assert json_str == json.dumps(expected, indent=2, ensure_ascii=False)
+
+    def test_empty_project_json(self, project):
+        data = json.loads(export_project_to_json(project.pk))
+        assert data["entries"] == []
+        assert data["ignore_words"] == []
+
+    def test_queries_depend_on_chunks(
+        self, project, paradigm, affix, django_assert_num_queries
+    ):
+        for i in range(6):
+            e = LexiconEntry.objects.create(project=project, text=f"word{i}")
+            e.paradigms.add(paradigm)
+            e.affixes.add(affix)
+            Sense.objects.create(entry=e, eng=f"sense {i}", order=1)
+        out = io.StringIO()
+        # The savepoint and its release, the project, paradigms, affixes, ignore
+        # words, per chunk the entries with their 6 prefetched relations, and the
+        # empty read that ends the entries
+        with django_assert_num_queries(2 + 4 + 2 * 7 + 1):
+            write_project_json(project.pk, out, chunk_size=3)
+        data = json.loads(out.getvalue())
+        assert [e["text"] for e in data["entries"]] == [f"word{i}" for i in range(6)]
+        assert data["entries"][0]["paradigm_local_ids"] == [paradigm.pk]
+        assert data["entries"][0]["affix_local_ids"] == [affix.pk]
+
+    @pytest.mark.django_db(transaction=True)
+    def test_export_reads_one_snapshot(self, project, paradigm, monkeypatch):
+        for i in range(4):
+            LexiconEntry.objects.create(project=project, text=f"word{i}")
+
+        def add_paradigm():
+            # Committed on another connection while the entries are being read
+            late = Paradigm.objects.create(
+                project=project, name="late", row_labels=["a"], column_labels=["b"]
+            )
+            LexiconEntry.objects.get(text="word3").paradigms.add(late)
+            connections.close_all()
+
+        serialize_entry = project_import_export._serialize_entry
+
+        def serialize_and_add(e):
+            if e.text == "word0":
+                thread = threading.Thread(target=add_paradigm)
+                thread.start()
+                thread.join()
+            return serialize_entry(e)
+
+        monkeypatch.setattr(
+            project_import_export, "_serialize_entry", serialize_and_add
+        )
+        out = io.StringIO()
+        with CaptureQueriesContext(connection) as queries:
+            write_project_json(project.pk, out, chunk_size=2)
+        data = json.loads(out.getvalue())
+        assert [p["name"] for p in data["paradigms"]] == ["verb conjugation"]
+        assert data["entries"][3]["paradigm_local_ids"] == []
+        assert "REPEATABLE READ" in queries.captured_queries[1]["sql"]
+        assert Paradigm.objects.filter(name="late").exists()
+
 
 # --- Import tests ---
 
@@ -205,6 +300,22 @@ class TestImport:
             project=project, name="verb conjugation"
         ).exists()
 
+    def test_import_creates_generation_templates(self, db, full_project, paradigm):
+        GenerationTemplate.objects.create(
+            paradigm=paradigm, stem_pattern="^(.*)un$", cell_rules=[["{stem}am"]]
+        )
+        json_str = export_project_to_json(full_project.pk)
+        full_project.delete()
+
+        import_project_from_json(json_str)
+        template = GenerationTemplate.objects.get(
+            paradigm__project__language_code="kgu"
+        )
+        assert template.paradigm.name == "verb conjugation"
+        assert template.stem_pattern == "^(.*)un$"
+        assert template.cell_rules == [["{stem}am"]]
+        assert template.status == ""
+
     def test_import_creates_affixes(self, db, full_project):
         data = export_project(full_project.pk)
         full_project.delete()
@@ -246,6 +357,20 @@ class TestImport:
         entry = LexiconEntry.objects.get(text="amun")
         assert entry.conjugations.filter(conjugation="amamun", row=0, column=0).exists()
 
+    def test_import_keeps_grid_storage(self, db, full_project, paradigm):
+        convert_conjugation_storage(full_project, "grid")
+        data = export_project(full_project.pk)
+        full_project.delete()
+
+        import_project(data)
+        project = LexiconProject.objects.get(language_code="kgu")
+        assert project.conjugation_storage == "grid"
+        entry = LexiconEntry.objects.get(text="amun")
+        assert not entry.conjugations.exists()
+        grid = entry.conjugation_grids.get()
+        assert grid.cells == [["amamun", ""], ["", ""], ["", ""]]
+        assert entry.conjugation_cells() == [(grid.paradigm_id, 0, 0, "amamun")]
+
     def test_import_restores_m2m_paradigms(self, db, full_project):
         data = export_project(full_project.pk)
         full_project.delete()
@@ -285,6 +410,42 @@ class TestImport:
         with pytest.raises(ValueError, match="Unsupported export version"):
             import_project(data)
 
+    def test_import_restores_version_and_search(self, db, full_project):
+        data = export_project(full_project.pk)
+        full_project.delete()
+
+        imported = import_project(data)
+        # Restoring entries doesn't count as editing them
+        assert imported.version == data["project"]["version"]
+        entry = LexiconEntry.objects.get(text="amun")
+        assert entry.search == "amun amamun"
+
+    def test_queries_depend_on_chunks(
+        self, db, full_project, django_assert_num_queries
+    ):
+        data = export_project(full_project.pk)
+        entry = data["entries"][0]
+        data["entries"] = [{**entry, "text": f"word{i}"} for i in range(6)]
+        full_project.delete()
+
+        fractions = []
+        # The savepoint, the existing project check, the project, paradigms,
+        # affixes and ignore words, per chunk the entries and their 5 kinds of
+        # related rows, then reading 4 and writing 2 for the search fields
+        with django_assert_num_queries(2 + 1 + 4 + 2 * 6 + 4 + 2):
+            import_project(data, progress=fractions.append, chunk_size=3)
+        assert fractions == [0.5, 1.0]
+        project = LexiconProject.objects.get(language_code="kgu")
+        assert project.entries.count() == 6
+        assert Sense.objects.filter(entry__project=project).count() == 12
+        assert Conjugation.objects.filter(word__project=project).count() == 6
+        assert (
+            LexiconEntry.affixes.through.objects.filter(
+                lexiconentry__project=project
+            ).count()
+            == 6
+        )
+
     def test_roundtrip_via_json(self, db, full_project):
         json_str = export_project_to_json(full_project.pk)
         full_project.delete()
@@ -293,3 +454,84 @@ class TestImport:
         assert LexiconProject.objects.filter(language_code="kgu").exists()
         assert LexiconEntry.objects.filter(text="amun").exists()
         assert Sense.objects.filter(eng="to walk").exists()
+
+
+# --- Streaming import tests ---
+
+
+def collect_sections(pairs) -> dict:
+    """Rebuild an export dict from the pairs iter_project_json yields."""
+    data = {}
+    for section, item in pairs:
+        if section in ("paradigms", "affixes", "entries", "ignore_words"):
+            data.setdefault(section, []).append(item)
+        else:
+            data[section] = item
+    return data
+
+
+class TestStreamingImport:
+    @pytest.mark.parametrize("read_size", [1, 7, 64 * 1024])
+    def test_sections_match_export(self, db, full_project, read_size):
+        json_str = export_project_to_json(full_project.pk)
+        pairs = iter_project_json(io.StringIO(json_str), read_size=read_size)
+        assert collect_sections(pairs) == json.loads(json_str)
+
+    def test_binary_file(self, db, full_project, entry):
+        # ŋ is two bytes in utf-8, split across reads of one byte
+        entry.comments = "ŋa"
+        entry.save()
+        json_str = export_project_to_json(full_project.pk)
+        pairs = iter_project_json(io.BytesIO(json_str.encode()), read_size=1)
+        assert collect_sections(pairs) == json.loads(json_str)
+
+    def test_invalid_json(self):
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_project_json(io.StringIO('{"entries": [{"text": "amun"}')))
+        with pytest.raises(json.JSONDecodeError):
+            list(iter_project_json(io.StringIO('{"entries": [{}} ]}')))
+
+    def test_large_file_in_bounded_memory(self, tmp_path):
+        path = tmp_path / "kgu.json"
+        entry = {"text": "amun", "senses": [{"eng": "to walk", "order": 1}]}
+        with open(path, "w", encoding="utf-8") as f:
+            f.write('{"export_version": 1, "project": {}, "entries": [\n')
+            f.write(",\n".join(json.dumps({**entry, "pos": i}) for i in range(50_000)))
+            f.write("\n]}")
+
+        tracemalloc.start()
+        with open(path, "rb") as f:
+            count = sum(section == "entries" for section, _ in iter_project_json(f))
+        _, peak = tracemalloc.get_traced_memory()
+        tracemalloc.stop()
+
+        assert count == 50_000
+        # json.loads would hold every entry, several times the file's size
+        assert peak < os.path.getsize(path) / 10
+
+    def test_import_from_file(self, db, full_project, tmp_path):
+        path = tmp_path / "kgu.json"
+        path.write_text(export_project_to_json(full_project.pk), encoding="utf-8")
+        full_project.delete()
+
+        fractions = []
+        imported = import_project_from_file(str(path), progress=fractions.append)
+        assert fractions == [1]
+        assert imported.language_code == "kgu"
+        entry = LexiconEntry.objects.get(text="amun")
+        assert entry.senses.count() == 2
+        assert entry.conjugations.filter(conjugation="amamun").exists()
+        assert entry.affixes.filter(affix_letter="A").exists()
+        assert IgnoreWord.objects.filter(project=imported, text="jesus").exists()
+
+    def test_contents_before_project_raises(self, db):
+        json_str = '{"export_version": 1, "entries": [{"text": "amun"}], "project": {}}'
+        with pytest.raises(ValueError, match="come before its project"):
+            import_project_from_json(json_str)
+
+    def test_command(self, db, full_project, tmp_path, capsys):
+        path = tmp_path / "kgu.json"
+        path.write_text(export_project_to_json(full_project.pk), encoding="utf-8")
+        call_command("import_project", str(path), "--overwrite")
+        assert "Imported project" in capsys.readouterr().out
+        assert LexiconProject.objects.get().entries.get().text == "amun"
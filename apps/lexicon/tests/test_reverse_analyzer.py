@@ -0,0 +1,58 @@
+import pytest
+
+from apps.lexicon import models
+from apps.lexicon.utils.affix_file import parse_affix_file
+from apps.lexicon.utils.reverse_analyzer import (
+    Analysis,
+    ReverseAnalyzer,
+    find_lemmas,
+    get_analyzer,
+)
+
+AFF = """PFX A Y 1
+PFX A 0 re .
+
+SFX B Y 2
+SFX B 0 ed [^y]
+SFX B y ied [^aeiou]y
+"""
+
+
+@pytest.fixture
+def analyzer():
+    return ReverseAnalyzer(parse_affix_file(AFF))
+
+
+def test_analyze_suffix(analyzer):
+    """Test that suffixes are stripped and the strip field restored."""
+    assert analyzer.analyze("walked") == {Analysis("walk", frozenset("B"))}
+    assert Analysis("cry", frozenset("B")) in analyzer.analyze("cried")
+
+
+def test_analyze_cross_product(analyzer):
+    """Test that a prefix on top of a suffix needs both flags."""
+    assert analyzer.analyze("rewalked") == {
+        Analysis("walked", frozenset("A")),
+        Analysis("walk", frozenset("AB")),
+        Analysis("rewalk", frozenset("B")),
+    }
+
+
+def test_analyze_respects_conditions(analyzer):
+    """Test that stems failing the rule condition are rejected."""
+    assert analyzer.analyze("played") == set()
+
+
+def test_get_analyzer_is_cached():
+    """Test that an affix file is only compiled once."""
+    assert get_analyzer(AFF) is get_analyzer(AFF)
+
+
+@pytest.mark.django_db
+def test_find_lemmas_checks_entry_flags(project_with_affix_file):
+    """Test that only entries carrying the flag are returned."""
+    hobol = models.LexiconEntry.objects.get(
+        project=project_with_affix_file, text="hobol"
+    )
+    assert find_lemmas(project_with_affix_file, ["hobolyam"]) == [hobol.pk]
+    assert find_lemmas(project_with_affix_file, ["no_affix_wordyam"]) == []
@@ -89,6 +89,22 @@ class TestLexiconSearchResults:
         response = client.get(url)
         assert response.status_code == 404
 
+    def test_search_matches_generated_affix_forms(
+        self, client, project_with_affix_file
+    ):
+        """Test that searching a generated form finds the root entry."""
+        url = self.get_base_url(project_with_affix_file.language_code)
+        response = client.get(url, {"search": "hobolyam"})
+        assert response.status_code == 200
+        assert [e.text for e in response.context["object_list"]] == ["hobol"]
+
+    def test_morph_search_finds_lemma(self, client, project_with_affix_file):
+        """Test that the inflected forms mode strips affixes to find headwords."""
+        url = self.get_base_url(project_with_affix_file.language_code)
+        response = client.get(url, {"search": "biliyam", "morph": "true"})
+        assert response.status_code == 200
+        assert [e.text for e in response.context["object_list"]] == ["bili"]
+
 
 @pytest.mark.django_db
 class TestIgnoreSearchResults:
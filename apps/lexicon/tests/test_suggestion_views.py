@@ -0,0 +1,86 @@
+import pytest
+from django.test import Client
+from django.urls import reverse
+
+from apps.lexicon import models
+from apps.lexicon.utils import suggestions
+
+
+@pytest.fixture(autouse=True)
+def clear_indexes():
+    suggestions._indexes.clear()
+
+
+@pytest.mark.django_db
+class TestSuggestionViews:
+    def get_url(self, lang_code):
+        return reverse("lexicon:suggestions", args=[lang_code])
+
+    def test_word_suggestions(self, client, kovol_project, kovol_words):
+        response = client.get(
+            self.get_url(kovol_project.language_code), {"word": "hobl"}
+        )
+        assert response.status_code == 200
+        data = response.json()
+        assert data["known"] is False
+        assert data["suggestions"][0] == {"word": "hobol", "distance": 1}
+
+    def test_known_word(self, client, kovol_project, kovol_words):
+        response = client.get(
+            self.get_url(kovol_project.language_code), {"word": "bili"}
+        )
+        assert response.json()["known"] is True
+
+    def test_batch_suggestions(self, client, kovol_project, kovol_words):
+        response = client.post(
+            self.get_url(kovol_project.language_code), {"text": "hobol bilo"}
+        )
+        assert response.status_code == 200
+        unknown = response.json()["unknown_words"]
+        assert [u["word"] for u in unknown] == ["bilo"]
+        assert unknown[0]["suggestions"][0]["word"] == "bili"
+
+    def test_missing_word(self, client, kovol_project):
+        response = client.get(self.get_url(kovol_project.language_code))
+        assert response.status_code == 400
+
+    def test_review_list_shows_similar_words(self, client, kovol_project, kovol_words):
+        kovol_words[0].review = "1"
+        kovol_words[0].save()
+        models.LexiconEntry.objects.create(text="hobal", project=kovol_project)
+        response = client.get(
+            reverse("lexicon:review_list", args=[kovol_project.language_code])
+        )
+        assert response.context["similar_words"][kovol_words[0].pk] == ["hobal"]
+
+    def test_batch_suggestions_without_csrf_token(self, kovol_project, kovol_words):
+        client = Client(enforce_csrf_checks=True)
+        url = self.get_url(kovol_project.language_code)
+        assert client.post(url, {"text": "hobol bilo"}).status_code == 403
+        response = client.get(url, {"text": "hobol bilo"})
+        assert response.status_code == 200
+        assert [u["word"] for u in response.json()["unknown_words"]] == ["bilo"]
+
+    @pytest.mark.parametrize("limit,expected", [("0", 1), ("-5", 1), ("1000", 2)])
+    def test_limit_is_clamped(
+        self, client, monkeypatch, kovol_project, kovol_words, limit, expected
+    ):
+        monkeypatch.setattr("apps.lexicon.views.suggestion_views.MAX_SUGGESTIONS", 2)
+        models.LexiconEntry.objects.create(text="hobal", project=kovol_project)
+        models.LexiconEntry.objects.create(text="hobil", project=kovol_project)
+        response = client.get(
+            self.get_url(kovol_project.language_code), {"word": "hobl", "limit": limit}
+        )
+        assert len(response.json()["suggestions"]) == expected
+
+    def test_review_list_skips_the_word_itself(
+        self, client, kovol_project, kovol_words
+    ):
+        models.LexiconEntry.objects.filter(pk=kovol_words[0].pk).update(
+            text="Hobol", review="1"
+        )
+        models.LexiconEntry.objects.create(text="hobal", project=kovol_project)
+        response = client.get(
+            reverse("lexicon:review_list", args=[kovol_project.language_code])
+        )
+        assert response.context["similar_words"][kovol_words[0].pk] == ["hobal"]
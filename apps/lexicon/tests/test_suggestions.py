@@ -0,0 +1,75 @@
+import threading
+
+import pytest
+
+from apps.lexicon import models
+from apps.lexicon.utils import suggestions
+from apps.lexicon.utils.suggestions import SuggestionIndex, edit_distance, get_index
+
+
+def test_edit_distance():
+    """Test insertions, deletions, substitutions and transpositions."""
+    assert edit_distance("hobol", "hobol", 2) == 0
+    assert edit_distance("hobol", "hobl", 2) == 1
+    assert edit_distance("hobol", "hoblo", 2) == 1
+    assert edit_distance("hobol", "hibal", 2) == 2
+    assert edit_distance("hobol", "bili", 2) == 3
+
+
+def test_lookup_ranks_by_distance_then_count():
+    index = SuggestionIndex(["hobol", "hobal", "hobal", "hibil", "bili"])
+    results = index.lookup("hobel")
+    assert [(s.word, s.distance) for s in results] == [
+        ("hobal", 1),
+        ("hobol", 1),
+        ("hibil", 2),
+    ]
+
+
+def test_lookup_beyond_prefix_length():
+    """Test that differences after the indexed prefix are still found."""
+    index = SuggestionIndex(["ebisoyangam"])
+    assert [s.word for s in index.lookup("ebisoyanam")] == ["ebisoyangam"]
+
+
+def test_check_text_groups_unknown_words():
+    index = SuggestionIndex(["hobol", "bili"])
+    results = index.check_text("Hobol hobl bili, hobl.")
+    assert len(results) == 1
+    assert results[0]["word"] == "hobl"
+    assert results[0]["offsets"] == [6, 17]
+    assert results[0]["suggestions"][0].word == "hobol"
+
+
+@pytest.mark.django_db
+def test_get_index_rebuilds_on_version_change(kovol_project, kovol_words):
+    suggestions._indexes.clear()
+    index = get_index(kovol_project)
+    assert "bili" in index
+    assert get_index(kovol_project) is index
+
+    models.IgnoreWord.objects.create(text="bilibili", project=kovol_project, type="tpi")
+    kovol_project.refresh_from_db()
+    new_index = get_index(kovol_project)
+    assert new_index is not index
+    assert "bilibili" in new_index
+
+
+@pytest.mark.django_db
+def test_get_index_drops_least_recently_used(
+    monkeypatch, kovol_project, english_project
+):
+    suggestions._indexes.clear()
+    monkeypatch.setattr(suggestions, "INDEX_CACHE_SIZE", 1)
+    get_index(kovol_project)
+    get_index(english_project)
+    assert list(suggestions._indexes) == [english_project.pk]
+
+
+@pytest.mark.django_db
+def test_get_index_builds_projects_independently(kovol_project, english_project):
+    suggestions._indexes.clear()
+    # A build in progress for one project doesn't hold up another
+    lock = suggestions._build_locks.setdefault(kovol_project.pk, threading.Lock())
+    with lock:
+        assert get_index(english_project) is get_index(english_project)
@@ -7,6 +7,7 @@ from django.db import transaction
 
 
 from apps.lexicon import models
+from apps.lexicon.utils.conjugations import convert_conjugation_storage
 from apps.lexicon.views import word_views
 
 
@@ -208,9 +209,28 @@ class TestEntryDetail:
         )
         response = client.get(url)
         assert response.status_code == 200
-        assert conjugation in response.context["conjugations"]
+        assert (
+            paradigm.pk,
+            conjugation.row,
+            conjugation.column,
+            conjugation.conjugation,
+        ) in response.context["conjugations"]
         assert paradigm in response.context["paradigms"]
 
+    def test_entry_detail_conjugations_in_grid_storage(
+        self, client, english_project, english_words_with_paradigm
+    ):
+        words, paradigm, conjugation = english_words_with_paradigm
+        convert_conjugation_storage(english_project, "grid")
+        url = reverse(
+            "lexicon:entry_detail",
+            kwargs={"lang_code": english_project.language_code, "pk": words[0].pk},
+        )
+        response = client.get(url)
+        assert response.context["conjugations"] == [
+            (paradigm.pk, conjugation.row, conjugation.column, conjugation.conjugation)
+        ]
+
     def test_hunspell_conjugations_shown(
         self, client, project_with_affix_file, kovol_words
     ):
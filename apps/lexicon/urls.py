@@ -6,6 +6,7 @@ import apps.lexicon.views.ignore_word_views as ignore_word_views
 import apps.lexicon.views.import_export_views as import_export_views
 import apps.lexicon.views.project_admin_views as project_admin_views
 import apps.lexicon.views.search_views as search_views
+import apps.lexicon.views.suggestion_views as suggestion_views
 import apps.lexicon.views.variation_views as variation_views
 import apps.lexicon.views.word_views as word_views
 
@@ -63,6 +64,22 @@ urlpatterns = [
         conjugation_views.ConjugationGridView.as_view(),
         name="conjugation_grid",
     ),
+    # spreadsheet editing the conjugations of every entry using a paradigm
+    path(
+        "<str:lang_code>/paradigm-<int:paradigm_pk>/spreadsheet",
+        conjugation_views.ParadigmSpreadsheet.as_view(),
+        name="paradigm_spreadsheet",
+    ),
+    path(
+        "<str:lang_code>/paradigm-<int:paradigm_pk>/spreadsheet-rows",
+        conjugation_views.ParadigmSpreadsheetRows.as_view(),
+        name="paradigm_spreadsheet_rows",
+    ),
+    path(
+        "<str:lang_code>/paradigm-<int:paradigm_pk>/spreadsheet-save",
+        conjugation_views.ParadigmSpreadsheetSave.as_view(),
+        name="paradigm_spreadsheet_save",
+    ),
     # variation views that manage word variations on the word detail page.
     # these return html snippets that attach via htmx.
     path(
@@ -108,6 +125,12 @@ urlpatterns = [
         affix_views.AffixResults.as_view(),
         name="word_affix_results",
     ),
+    # json spelling suggestions for a word or passage
+    path(
+        "<str:lang_code>/suggestions",
+        suggestion_views.suggestions,
+        name="suggestions",
+    ),
     # review list displaying words marked for review
     path(
         "<str:lang_code>/review-list",
@@ -167,6 +190,21 @@ urlpatterns = [
         project_admin_views.DeleteParadigm.as_view(),
         name="project_admin_paradigm_delete",
     ),
+    path(
+        "<str:lang_code>/project-admin/paradigm-<int:pk>/reshape",
+        project_admin_views.ReshapeParadigm.as_view(),
+        name="project_admin_paradigm_reshape",
+    ),
+    path(
+        "<str:lang_code>/project-admin/paradigm-<int:pk>/generate",
+        project_admin_views.GenerateConjugations.as_view(),
+        name="project_admin_paradigm_generate",
+    ),
+    path(
+        "<str:lang_code>/project-admin/paradigm-<int:pk>/generate-report",
+        project_admin_views.GenerationReport.as_view(),
+        name="project_admin_paradigm_generate_report",
+    ),
     # Project admin affix management
     path(
         "<str:lang_code>/project-admin/affix-manage",
@@ -193,11 +231,36 @@ urlpatterns = [
         project_admin_views.DeleteAffix.as_view(),
         name="project_admin_affix_delete",
     ),
+    path(
+        "<str:lang_code>/project-admin/duplicates",
+        project_admin_views.DuplicateReport.as_view(),
+        name="project_admin_duplicates",
+    ),
+    path(
+        "<str:lang_code>/project-admin/duplicates/progress",
+        project_admin_views.DuplicateScanProgress.as_view(),
+        name="project_admin_duplicate_progress",
+    ),
+    path(
+        "<str:lang_code>/project-admin/duplicates/scan",
+        project_admin_views.StartDuplicateScan.as_view(),
+        name="project_admin_duplicate_scan",
+    ),
+    path(
+        "<str:lang_code>/project-admin/duplicates/<int:pk>/merge",
+        project_admin_views.MergeDuplicate.as_view(),
+        name="project_admin_duplicate_merge",
+    ),
     path(
         "<str:lang_code>/project-admin/affix-file-update",
         affix_views.AffixFileUpdateView.as_view(),
         name="project_admin_affix_file_update",
     ),
+    path(
+        "<str:lang_code>/project-admin/affix-file-analysis",
+        affix_views.AffixFileAnalysis.as_view(),
+        name="project_admin_affix_file_analysis",
+    ),
     # import_export_views
     path(
         "<str:lang_code>/import",
@@ -214,6 +277,21 @@ urlpatterns = [
         import_export_views.ExportPage.as_view(),
         name="export_page",
     ),
+    path(
+        "<str:lang_code>/export/paratext",
+        import_export_views.ParatextMergePage.as_view(),
+        name="paratext_merge",
+    ),
+    path(
+        "<str:lang_code>/export/job-<int:pk>",
+        import_export_views.ExportJobProgress.as_view(),
+        name="export_job",
+    ),
+    path(
+        "<str:lang_code>/export/job-<int:pk>/download",
+        import_export_views.ExportJobDownload.as_view(),
+        name="export_job_download",
+    ),
     path(
         "<str:lang_code>/oxt-deliver.oxt",
         import_export_views.oxt_update_deliver,
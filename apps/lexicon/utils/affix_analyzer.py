@@ -0,0 +1,169 @@
+# This module checks a Hunspell affix file against the project that uses it.
+# It reports problems that otherwise only surface when an export or detail page
+# expands the affix file.
+
+import hashlib
+import logging
+import re
+from dataclasses import dataclass, field
+
+from django.core.cache import cache
+
+from apps.lexicon.utils.affix_file import AffixBlock, AffixRule, parse_affix_file
+
+log = logging.getLogger("lexicon")
+
+# How long the per block match results are kept while an admin is editing
+BLOCK_CACHE_SECONDS = 60 * 60
+
+
+@dataclass(frozen=True)
+class Finding:
+    """A single problem found in an affix file."""
+
+    line: int | None
+    level: str  # "error" or "warning"
+    message: str
+
+
+@dataclass
+class AffixReport:
+    """The result of analyzing an affix file."""
+
+    findings: list[Finding] = field(default_factory=list)
+    blocks_checked: int = 0
+    blocks_cached: int = 0
+
+    @property
+    def errors(self) -> list[Finding]:
+        return [f for f in self.findings if f.level == "error"]
+
+    @property
+    def warnings(self) -> list[Finding]:
+        return [f for f in self.findings if f.level == "warning"]
+
+
+def rule_match_regex(rule: AffixRule) -> str:
+    """Return a regex that finds the words a rule can apply to, one word per line.
+
+    It mirrors AffixRule.applies_to(): the strip field and condition must match
+    and at least one character of the word must be left after stripping."""
+    condition = rule.pattern.pattern if rule.pattern else ""
+    strip = re.escape(rule.strip)
+    if rule.kind == "SFX":
+        lookahead = f"(?=[^\\n]*{condition})" if condition else ""
+        return f"^{lookahead}[^\\n]+{strip}$"
+    lookahead = f"(?={condition})" if condition else ""
+    return f"^{lookahead}{strip}[^\\n]+$"
+
+
+def _block_key(block: AffixBlock, words_key: str) -> str:
+    """Key a block's match results by its rules and the word list."""
+    rules = "\n".join(f"{r.strip}\t{r.append}\t{r.condition}" for r in block.rules)
+    source = f"{block.kind}\t{block.flag}\n{rules}\n{words_key}"
+    return "affix-block:" + hashlib.sha1(source.encode("utf-8")).hexdigest()
+
+
+def _unmatched_rules(block: AffixBlock, word_text: str) -> list[int]:
+    """Return the index of each rule in the block that matches none of the words.
+
+    The words are joined into a single string, so each rule is one regex search
+    over the whole list rather than a Python loop over the words."""
+    unmatched = []
+    for index, rule in enumerate(block.rules):
+        if not re.search(rule_match_regex(rule), word_text, re.MULTILINE):
+            unmatched.append(index)
+    return unmatched
+
+
+def analyze_affix_file(
+    content: str,
+    affix_letters: set[str],
+    used_letters: set[str],
+    words: list[str],
+    words_key: str | None = None,
+) -> AffixReport:
+    """Analyze an affix file against a project's Affix rows and word list.
+
+    Args:
+        content: The affix file text.
+        affix_letters: The letters of the project's Affix rows.
+        used_letters: The letters of Affix rows linked to at least one entry.
+        words: The project's words, used to find rules that never match.
+        words_key: A key that changes whenever the word list does, e.g. the project
+            version. Blocks whose rules are unchanged reuse their cached results,
+            so re-analyzing after a small edit only re-checks the edited blocks.
+
+    Returns:
+        An AffixReport with the findings in line order.
+    """
+    affix_file = parse_affix_file(content)
+    report = AffixReport()
+    findings = [Finding(line, "error", message) for line, message in affix_file.errors]
+
+    word_text = "\n".join(w for w in words if w)
+    if words_key is None:
+        words_key = hashlib.sha1(word_text.encode("utf-8")).hexdigest()
+
+    defined = set()
+    for block in affix_file.blocks:
+        label = f"{block.kind} {block.flag}"
+        if block.flag in defined:
+            findings.append(
+                Finding(block.line, "warning", f"{label} is defined more than once")
+            )
+        defined.add(block.flag)
+
+        if len(block.rules) != block.declared_count:
+            findings.append(
+                Finding(
+                    block.line,
+                    "error",
+                    f"{label} declares {block.declared_count} rules but has {len(block.rules)}",
+                )
+            )
+        if block.flag not in affix_letters:
+            findings.append(
+                Finding(
+                    block.line,
+                    "warning",
+                    f"{label} has no affix in the project, so it can't be given to words",
+                )
+            )
+        elif block.flag not in used_letters:
+            findings.append(
+                Finding(block.line, "warning", f"{label} isn't used by any words")
+            )
+
+        key = _block_key(block, words_key)
+        unmatched = cache.get(key)
+        if unmatched is None:
+            unmatched = _unmatched_rules(block, word_text)
+            cache.set(key, unmatched, BLOCK_CACHE_SECONDS)
+            report.blocks_checked += 1
+        else:
+            report.blocks_cached += 1
+        for index in unmatched:
+            rule = block.rules[index]
+            findings.append(
+                Finding(
+                    rule.line,
+                    "warning",
+                    f"{label} rule '{rule.strip or 0} {rule.append or 0} {rule.condition}' doesn't match any project words",
+                )
+            )
+
+    for letter in sorted(affix_letters - defined):
+        findings.append(
+            Finding(
+                None,
+                "error",
+                f"Affix {letter} has no PFX or SFX rules in the affix file",
+            )
+        )
+
+    report.findings = sorted(findings, key=lambda f: (f.line is None, f.line or 0))
+    log.debug(
+        f"Analyzed affix file, {report.blocks_checked} blocks checked and {report.blocks_cached} cached"
+    )
+    return report
@@ -0,0 +1,293 @@
+# This module parses Hunspell affix files and expands dictionary words in-process.
+# It is a Python port of the parts of Hunspell's unmunch tool the lexicon relies on,
+# so affix expansion doesn't need to spawn a process for every request.
+
+import logging
+import re
+import time
+from dataclasses import dataclass, field
+
+log = logging.getLogger("lexicon")
+
+AFFIX_KINDS = ("PFX", "SFX")
+
+
+def condition_to_regex(condition: str) -> str:
+    """Convert a Hunspell affix condition into an equivalent Python regex.
+
+    Hunspell conditions only support literal characters, '.' and bracketed
+    character classes, optionally negated with '^'. Ranges are not supported by
+    Hunspell, so '-' inside brackets is treated as a literal character.
+
+    Raises:
+        ValueError: If a character class is not closed.
+    """
+    if condition in ("", "."):
+        return ""
+    parts = []
+    i = 0
+    while i < len(condition):
+        char = condition[i]
+        if char == ".":
+            parts.append(".")
+        elif char == "[":
+            end = condition.find("]", i + 1)
+            if end == -1:
+                raise ValueError(f"Unclosed '[' in condition '{condition}'")
+            members = condition[i + 1 : end]
+            negate = members.startswith("^")
+            if negate:
+                members = members[1:]
+            escaped = "".join(re.escape(m) for m in members)
+            parts.append(f"[{'^' if negate else ''}{escaped}]")
+            i = end
+        else:
+            parts.append(re.escape(char))
+        i += 1
+    return "".join(parts)
+
+
+@dataclass(frozen=True)
+class AffixRule:
+    """A single PFX or SFX rule line from an affix file."""
+
+    kind: str
+    flag: str
+    strip: str
+    append: str
+    condition: str
+    cross_product: bool
+    line: int
+    pattern: re.Pattern = field(init=False, repr=False, compare=False)
+
+    def __post_init__(self):
+        regex = condition_to_regex(self.condition)
+        if self.kind == "SFX":
+            compiled = re.compile(f"(?:{regex})$") if regex else None
+        else:
+            compiled = re.compile(f"(?:{regex})") if regex else None
+        object.__setattr__(self, "pattern", compiled)
+
+    def applies_to(self, word: str) -> bool:
+        """Return True if the rule's condition matches the word.
+
+        Like unmunch, only the condition is checked. The strip field just has to
+        be shorter than the word, its characters are removed whatever they are."""
+        if len(self.strip) >= len(word):
+            return False
+        if self.kind == "SFX":
+            return self.pattern is None or self.pattern.search(word) is not None
+        return self.pattern is None or self.pattern.match(word) is not None
+
+    def apply(self, word: str) -> str:
+        """Return the word with this affix applied. Call applies_to() first."""
+        if self.kind == "SFX":
+            stem = word[: len(word) - len(self.strip)] if self.strip else word
+            return stem + self.append
+        return self.append + word[len(self.strip) :]
+
+
+@dataclass
+class AffixBlock:
+    """A PFX or SFX header line and the rule lines that belong to it."""
+
+    kind: str
+    flag: str
+    cross_product: bool
+    declared_count: int
+    line: int
+    rules: list[AffixRule] = field(default_factory=list)
+
+
+@dataclass
+class AffixFile:
+    """A parsed affix file.
+
+    Parsing is forgiving, malformed lines are recorded in errors and skipped so
+    the valid rules can still be used."""
+
+    flag_type: str = "char"
+    blocks: list[AffixBlock] = field(default_factory=list)
+    errors: list[tuple[int, str]] = field(default_factory=list)
+    prefixes: dict[str, list[AffixRule]] = field(default_factory=dict)
+    suffixes: dict[str, list[AffixRule]] = field(default_factory=dict)
+
+    def parse_flags(self, flags: str) -> list[str]:
+        """Split the flag section of a .dic line according to the FLAG directive."""
+        flags = flags.strip()
+        if not flags:
+            return []
+        if self.flag_type == "long":
+            return [flags[i : i + 2] for i in range(0, len(flags), 2)]
+        if self.flag_type == "num":
+            return [f.strip() for f in flags.split(",") if f.strip()]
+        return list(flags)
+
+    def expand(self, word: str, flags: list[str]) -> list[tuple[str, str]]:
+        """Return the root word and all its affixed forms with the flag that made them.
+
+        The order matches unmunch: the root, suffixed forms, cross product prefixes
+        applied to the suffixed forms and finally prefixes applied to the root, with
+        the rule blocks taken in file order. The root is returned with an empty
+        flag."""
+        flags = set(flags)
+        forms = [(word, "")]
+        suffixed = []
+        for flag, rules in self.suffixes.items():
+            if flag not in flags:
+                continue
+            for rule in rules:
+                if rule.applies_to(word):
+                    suffixed.append((rule.apply(word), flag, rule.cross_product))
+        forms.extend((form, flag) for form, flag, _ in suffixed)
+
+        for form, suffix_flag, cross_product in suffixed:
+            if not cross_product:
+                continue
+            for flag, rules in self.prefixes.items():
+                if flag not in flags:
+                    continue
+                for rule in rules:
+                    if rule.cross_product and rule.applies_to(form):
+                        forms.append((rule.apply(form), flag + suffix_flag))
+
+        for flag, rules in self.prefixes.items():
+            if flag not in flags:
+                continue
+            for rule in rules:
+                if rule.applies_to(word):
+                    forms.append((rule.apply(word), flag))
+        return forms
+
+    @property
+    def flags(self) -> set[str]:
+        """All the flags that have at least one rule block."""
+        return {b.flag for b in self.blocks}
+
+
+def parse_affix_file(content: str) -> AffixFile:
+    """Parse the text of a Hunspell affix file.
+
+    Only the directives needed for word generation are interpreted, FLAG and the
+    PFX/SFX rule blocks. Everything else (SET, TRY, WORDCHARS etc.) is ignored.
+    """
+    affix_file = AffixFile()
+    current = None
+
+    for number, raw_line in enumerate(content.splitlines(), start=1):
+        line = raw_line.strip()
+        if not line or line.startswith("#"):
+            continue
+        fields = line.split()
+        keyword = fields[0]
+
+        if keyword == "FLAG" and len(fields) > 1:
+            flag_type = fields[1].lower()
+            affix_file.flag_type = flag_type if flag_type in ("long", "num") else "char"
+            continue
+        if keyword not in AFFIX_KINDS:
+            current = None
+            continue
+        if len(fields) < 4:
+            affix_file.errors.append((number, f"Too few fields in '{line}'"))
+            continue
+
+        flag = fields[1]
+        # A header line is 'SFX A Y 2', a rule line is 'SFX A 0 yam .'
+        in_block = (
+            current is not None
+            and current.flag == flag
+            and current.kind == keyword
+            and len(current.rules) < current.declared_count
+        )
+        is_header = fields[2] in ("Y", "N") and fields[3].isdigit() and not in_block
+        if is_header:
+            current = AffixBlock(
+                kind=keyword,
+                flag=flag,
+                cross_product=fields[2] == "Y",
+                declared_count=int(fields[3]),
+                line=number,
+            )
+            affix_file.blocks.append(current)
+            continue
+
+        if not in_block and (
+            current is None or current.flag != flag or current.kind != keyword
+        ):
+            affix_file.errors.append(
+                (number, f"Rule for {keyword} {flag} has no header line")
+            )
+            continue
+
+        strip = "" if fields[2] == "0" else fields[2]
+        # continuation classes (append/flags) are not used by unmunch
+        append = fields[3].split("/", 1)[0]
+        append = "" if append == "0" else append
+        condition = fields[4] if len(fields) > 4 else "."
+        try:
+            rule = AffixRule(
+                kind=keyword,
+                flag=flag,
+                strip=strip,
+                append=append,
+                condition=condition,
+                cross_product=current.cross_product,
+                line=number,
+            )
+        except (ValueError, re.error) as e:
+            affix_file.errors.append((number, str(e)))
+            continue
+        current.rules.append(rule)
+        target = affix_file.suffixes if keyword == "SFX" else affix_file.prefixes
+        target.setdefault(flag, []).append(rule)
+
+    return affix_file
+
+
+def split_dic_line(line: str) -> tuple[str, str]:
+    """Split a .dic line into the word and its flag string."""
+    # Morphological fields follow a tab, they aren't used for expansion
+    entry = line.split("\t", 1)[0].strip()
+    word, _, flags = entry.partition("/")
+    return word.strip(), flags
+
+
+def expand_dic(
+    dic_content: str,
+    affix_file: AffixFile,
+    max_forms: int | None = None,
+    time_limit: float | None = None,
+) -> list[str]:
+    """Expand every word of a .dic file, the equivalent of running unmunch.
+
+    Args:
+        dic_content: The .dic contents. A numeric first line is treated as the
+            word count and skipped.
+        affix_file: A parsed affix file.
+        max_forms: Optionally stop once this many forms have been generated.
+        time_limit: Optionally give up after this many seconds.
+
+    Returns:
+        A list of all generated words, roots included.
+
+    Raises:
+        TimeoutError: If expansion takes longer than the time limit.
+    """
+    lines = dic_content.splitlines()
+    if lines and lines[0].strip().isdigit():
+        lines = lines[1:]
+
+    deadline = time.monotonic() + time_limit if time_limit else None
+    words = []
+    for line in lines:
+        if deadline is not None and time.monotonic() > deadline:
+            raise TimeoutError(f"Expansion took longer than {time_limit}s")
+        word, flags = split_dic_line(line)
+        if not word:
+            continue
+        for form, _ in affix_file.expand(word, affix_file.parse_flags(flags)):
+            words.append(form)
+            if max_forms is not None and len(words) >= max_forms:
+                return words
+    return words
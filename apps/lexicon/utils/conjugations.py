@@ -0,0 +1,260 @@
+# This module saves edited conjugation cells in bulk. It is shared by the
+# conjugation grid form of a single entry, the multi entry spreadsheet and the
+# paradigm generator.
+#
+# Projects store conjugations in one of two layouts, chosen by
+# LexiconProject.conjugation_storage: "rows" has a Conjugation per cell and
+# "grid" has a ConjugationGrid per word and paradigm holding every cell as json.
+# Readers use models.read_conjugation_cells() or
+# LexiconEntry.conjugation_cells(), which understand both.
+
+import logging
+from collections import defaultdict
+
+from django.db import transaction
+from django.db.models import Q
+
+from apps.lexicon import models
+from apps.lexicon.signals import bulk_conjugation_write
+from apps.lexicon.tasks import update_entry_hunspell_forms
+
+log = logging.getLogger("lexicon")
+
+STORAGE_LAYOUTS = ("rows", "grid")
+
+
+def write_conjugation_cells(
+    project: models.LexiconProject,
+    paradigm: models.Paradigm,
+    cells: dict[tuple[int, int, int], str],
+) -> None:
+    """Write already validated cells in the project's storage layout.
+
+    Nothing else is done, the version, hunspell forms and search fields are left
+    to the caller. Blank values remove the cell.
+
+    Args:
+        project: The project the paradigm and entries belong to.
+        paradigm: The paradigm the cells are in.
+        cells: The text of each cell keyed by (entry pk, row, column).
+    """
+    if project.conjugation_storage == "grid":
+        _write_grid_cells(paradigm, cells)
+        return
+
+    models.Conjugation.objects.bulk_create(
+        [
+            models.Conjugation(
+                word_id=word_pk,
+                paradigm_id=paradigm.pk,
+                row=row,
+                column=column,
+                conjugation=value,
+            )
+            for (word_pk, row, column), value in cells.items()
+            if value
+        ],
+        update_conflicts=True,
+        unique_fields=["word", "paradigm", "row", "column"],
+        update_fields=["conjugation"],
+    )
+    blank = [key for key, value in cells.items() if not value]
+    if blank:
+        positions = Q()
+        for word_pk, row, column in blank:
+            positions |= Q(word_id=word_pk, row=row, column=column)
+        with bulk_conjugation_write():
+            models.Conjugation.objects.filter(positions, paradigm=paradigm).delete()
+
+
+def _write_grid_cells(
+    paradigm: models.Paradigm, cells: dict[tuple[int, int, int], str]
+) -> None:
+    """Apply cells to the stored grids with one upsert, removing emptied grids."""
+    rows = len(paradigm.row_labels)
+    columns = len(paradigm.column_labels)
+    word_pks = {word_pk for word_pk, _, _ in cells}
+    matrices = {
+        word_id: matrix
+        for word_id, matrix in models.ConjugationGrid.objects.filter(
+            paradigm=paradigm, word_id__in=word_pks
+        ).values_list("word_id", "cells")
+    }
+    for (word_pk, row, column), value in cells.items():
+        matrix = matrices.setdefault(word_pk, [])
+        # Grids are padded out to the paradigm's size when a cell is written
+        while len(matrix) < max(rows, row + 1):
+            matrix.append([])
+        for cells_row in matrix:
+            cells_row.extend([""] * (max(columns, column + 1) - len(cells_row)))
+        matrix[row][column] = value
+
+    filled = []
+    empty = []
+    for word_pk, matrix in matrices.items():
+        if any(any(row) for row in matrix):
+            filled.append(
+                models.ConjugationGrid(
+                    word_id=word_pk, paradigm_id=paradigm.pk, cells=matrix
+                )
+            )
+        else:
+            empty.append(word_pk)
+    models.ConjugationGrid.objects.bulk_create(
+        filled,
+        update_conflicts=True,
+        unique_fields=["word", "paradigm"],
+        update_fields=["cells"],
+    )
+    models.ConjugationGrid.objects.filter(paradigm=paradigm, word_id__in=empty).delete()
+
+
+def save_conjugation_cells(
+    project: models.LexiconProject,
+    paradigm: models.Paradigm,
+    cells: dict[tuple[int, int, int], str],
+) -> tuple[list[models.Conjugation], set[int]]:
+    """Save edited cells of a paradigm in one transaction.
+
+    The cells are compared to the stored conjugations in memory and only changed
+    cells are written, see write_conjugation_cells(). The project version is
+    bumped once if anything changed.
+
+    Args:
+        project: The project the paradigm and entries belong to.
+        paradigm: The paradigm being edited.
+        cells: The text of each cell keyed by (entry pk, row, column). Values are
+            expected to be validated already, blank values delete the cell.
+
+    Returns:
+        The conjugations of every non blank cell and the pks of the entries that
+        changed. Callers are responsible for updating the entries' search fields.
+    """
+    existing = {
+        (word_id, row, column): text
+        for word_id, _, row, column, text in models.read_conjugation_cells(
+            project.conjugation_storage,
+            paradigm=paradigm,
+            word_id__in={word_pk for word_pk, _, _ in cells},
+        )
+    }
+
+    conjugations = []
+    changed = {}
+    changed_words = set()
+    for (word_pk, row, column), value in cells.items():
+        value = value.strip().lower()
+        current = existing.get((word_pk, row, column), "")
+        if value:
+            conjugations.append(
+                models.Conjugation(
+                    word_id=word_pk,
+                    paradigm=paradigm,
+                    row=row,
+                    column=column,
+                    conjugation=value,
+                )
+            )
+        if current == value:
+            continue
+        if value:
+            log.debug(
+                f"{'Updated' if current else 'Created'} conjugation: '{value}' at '({row}, {column})'"
+            )
+        else:
+            log.debug(f"Deleted empty conjugation at '({row}, {column})'")
+        changed[(word_pk, row, column)] = value
+        changed_words.add(word_pk)
+
+    if changed_words:
+        with transaction.atomic():
+            write_conjugation_cells(project, paradigm, changed)
+            project.increment_version()
+        # bulk_create doesn't send the post_save signal, so refresh once per entry here
+        for word_pk in changed_words:
+            update_entry_hunspell_forms(word_pk)
+
+    return conjugations, changed_words
+
+
+def build_conjugation_grids(
+    cells: list[tuple[int, int, int, int, str]], paradigms
+) -> list[models.ConjugationGrid]:
+    """Group (word pk, paradigm pk, row, column, text) cells into unsaved grids.
+
+    There's a grid per word and paradigm, padded out to the paradigm's size.
+
+    Args:
+        cells: The cells, as returned by models.read_conjugation_cells().
+        paradigms: The paradigms the cells are in.
+    """
+    sizes = {p.pk: (len(p.row_labels), len(p.column_labels)) for p in paradigms}
+    matrices = defaultdict(dict)
+    for word_id, paradigm_id, row, column, text in cells:
+        matrices[(word_id, paradigm_id)][(row, column)] = text
+    grids = []
+    for (word_id, paradigm_id), texts in matrices.items():
+        rows, columns = sizes[paradigm_id]
+        rows = max(rows, *(row + 1 for row, _ in texts))
+        columns = max(columns, *(column + 1 for _, column in texts))
+        grids.append(
+            models.ConjugationGrid(
+                word_id=word_id,
+                paradigm_id=paradigm_id,
+                cells=[
+                    [texts.get((row, column), "") for column in range(columns)]
+                    for row in range(rows)
+                ],
+            )
+        )
+    return grids
+
+
+@transaction.atomic
+def convert_conjugation_storage(
+    project: models.LexiconProject, layout: str, batch_size: int = 1000
+) -> int:
+    """Move every conjugation of a project into the given storage layout.
+
+    The conversion runs in one transaction, reading the old layout and writing
+    the new one in batches. The words themselves don't change, so neither does
+    the project version.
+
+    Returns:
+        The number of conjugation cells moved.
+    """
+    if layout not in STORAGE_LAYOUTS:
+        raise ValueError(f"Unknown conjugation storage '{layout}'.")
+    if project.conjugation_storage == layout:
+        return 0
+
+    cells = models.read_conjugation_cells(word__project=project)
+    if layout == "grid":
+        grids = build_conjugation_grids(
+            cells, models.Paradigm.objects.filter(project=project)
+        )
+        models.ConjugationGrid.objects.bulk_create(grids, batch_size=batch_size)
+        with bulk_conjugation_write():
+            models.Conjugation.objects.filter(word__project=project).delete()
+    else:
+        models.Conjugation.objects.bulk_create(
+            [
+                models.Conjugation(
+                    word_id=word_id,
+                    paradigm_id=paradigm_id,
+                    row=row,
+                    column=column,
+                    conjugation=text,
+                )
+                for word_id, paradigm_id, row, column, text in cells
+            ],
+            batch_size=batch_size,
+        )
+        models.ConjugationGrid.objects.filter(word__project=project).delete()
+
+    models.LexiconProject.objects.filter(pk=project.pk).update(
+        conjugation_storage=layout
+    )
+    project.conjugation_storage = layout
+    log.info(f"Converted {len(cells)} conjugations of {project} to {layout} storage")
+    return len(cells)
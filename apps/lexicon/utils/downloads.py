@@ -0,0 +1,118 @@
+# This module sends built export files to the user. Files can be streamed by
+# Django, with support for resuming a download with a Range request, or handed to
+# the web server in front of it with X-Accel-Redirect (nginx) or X-Sendfile
+# (apache) so the bytes never pass through Python.
+
+import logging
+import os
+import re
+
+from django.conf import settings
+from django.http import FileResponse, HttpResponse, StreamingHttpResponse
+
+from apps.lexicon.utils import export, export_store
+
+log = logging.getLogger("lexicon")
+
+RANGE_PATTERN = re.compile(r"^bytes=(\d*)-(\d*)$")
+CHUNK_SIZE = 64 * 1024
+
+
+class RangeNotSatisfiable(Exception):
+    """Raised when a requested byte range starts beyond the end of the file."""
+
+
+def requested_range(request, size: int, etag: str | None = None):
+    """Return the (first, last) byte a request asks for, or None for the whole file.
+
+    Only a single range is supported, anything else is answered with the whole
+    file as the HTTP spec allows. An If-Range that doesn't match the ETag also
+    means the client's partial copy is out of date and needs the whole file.
+
+    Raises:
+        RangeNotSatisfiable: If the range starts beyond the end of the file.
+    """
+    header = request.headers.get("Range")
+    if not header or request.method != "GET":
+        return None
+    if_range = request.headers.get("If-Range")
+    if if_range and if_range != etag:
+        return None
+    match = RANGE_PATTERN.match(header.strip())
+    if not match or match.groups() == ("", ""):
+        return None
+
+    first, last = match.groups()
+    if first == "":
+        # A suffix range, the last n bytes
+        length = int(last)
+        if length == 0:
+            raise RangeNotSatisfiable()
+        return max(size - length, 0), size - 1
+    first = int(first)
+    last = min(int(last), size - 1) if last else size - 1
+    if first >= size:
+        raise RangeNotSatisfiable()
+    if last < first:
+        return None
+    return first, last
+
+
+def _read_range(path: str, first: int, last: int):
+    with open(path, "rb") as f:
+        f.seek(first)
+        remaining = last - first + 1
+        while remaining > 0:
+            chunk = f.read(min(CHUNK_SIZE, remaining))
+            if not chunk:
+                break
+            remaining -= len(chunk)
+            yield chunk
+
+
+def file_download(
+    request, path: str, filename: str, content_type: str, etag: str | None = None
+) -> HttpResponse:
+    """Return a response that downloads the file at path as filename.
+
+    settings.EXPORT_SENDFILE chooses how the bytes are sent, "x-accel" or
+    "x-sendfile" leave it to the web server, which also handles ranges. Otherwise
+    the file is streamed with a Content-Length, and a single Range is honoured.
+    The file is marked as used so the export store keeps it longer."""
+    mode = getattr(settings, "EXPORT_SENDFILE", "")
+    export_store.touch_artifact(path)
+    disposition = f'attachment; filename="{filename}"'
+
+    if mode in ("x-accel", "x-sendfile"):
+        response = HttpResponse(content_type=content_type)
+        if mode == "x-accel":
+            relative = os.path.relpath(path, export.export_folder)
+            response["X-Accel-Redirect"] = (
+                settings.EXPORT_ACCEL_PREFIX.rstrip("/") + "/" + relative
+            )
+        else:
+            response["X-Sendfile"] = os.path.abspath(path)
+        response["Content-Disposition"] = disposition
+        return response
+
+    size = os.path.getsize(path)
+    try:
+        byte_range = requested_range(request, size, etag)
+    except RangeNotSatisfiable:
+        response = HttpResponse(status=416)
+        response["Content-Range"] = f"bytes */{size}"
+        return response
+
+    if byte_range is None:
+        response = FileResponse(open(path, "rb"), content_type=content_type)
+    else:
+        first, last = byte_range
+        response = StreamingHttpResponse(
+            _read_range(path, first, last), status=206, content_type=content_type
+        )
+        response["Content-Length"] = str(last - first + 1)
+        response["Content-Range"] = f"bytes {first}-{last}/{size}"
+        log.debug(f"Sending bytes {first}-{last} of {path}")
+    response["Accept-Ranges"] = "bytes"
+    response["Content-Disposition"] = disposition
+    return response
@@ -0,0 +1,145 @@
+# This module finds and merges entries whose headwords are nearly the same, e.g.
+# spellings that differ by a single letter or a diacritic after a large import.
+
+import logging
+import unicodedata
+from collections import Counter, defaultdict
+
+from django.db import transaction
+
+from apps.lexicon import models
+from apps.lexicon.tasks import (
+    update_entry_hunspell_forms,
+    update_lexicon_entry_search_field,
+)
+from apps.lexicon.utils.conjugations import write_conjugation_cells
+from apps.lexicon.utils.suggestions import edit_distance
+
+log = logging.getLogger("lexicon")
+
+MAX_DISTANCE = 1
+# Trigrams shared by more entries than this (e.g. the start of a common prefix)
+# are too common to narrow down the candidates, so they aren't compared on
+MAX_BLOCK_SIZE = 1000
+
+
+def normalize(text: str) -> str:
+    """Lower case the text and remove its diacritics."""
+    decomposed = unicodedata.normalize("NFKD", text.lower())
+    return "".join(c for c in decomposed if not unicodedata.combining(c))
+
+
+def trigrams(text: str) -> set[str]:
+    """Return the trigrams of a word, padded like postgres' pg_trgm."""
+    padded = f"  {text} "
+    return {padded[i : i + 3] for i in range(len(padded) - 2)}
+
+
+def find_duplicate_pairs(
+    entries: list[tuple[int, str]], max_distance: int = MAX_DISTANCE, progress=None
+) -> list[tuple[int, int, float]]:
+    """Return the pairs of entries whose normalized text is within max_distance edits.
+
+    Rather than comparing every pair, entries are blocked by shared trigrams. An
+    edit changes at most 3 trigrams, so a pair can only be within max_distance if
+    they share all but 3 * max_distance of their trigrams. Only pairs passing that
+    count filter have their edit distance calculated.
+
+    Args:
+        entries: (pk, text) for each entry.
+        max_distance: The largest edit distance to report.
+        progress: An optional callable, passed the fraction of entries compared.
+
+    Returns:
+        (pk, duplicate pk, similarity) tuples, similarity being 1 for identical
+        normalized text down to 0.
+    """
+    texts = [(pk, text, normalize(text)) for pk, text in entries]
+    grams = [trigrams(normalized) for _, _, normalized in texts]
+
+    postings = defaultdict(list)
+    for number, entry_grams in enumerate(grams):
+        for gram in entry_grams:
+            postings[gram].append(number)
+
+    pairs = []
+    total = len(texts)
+    reported = 0
+    for number, (pk, text, normalized) in enumerate(texts):
+        shared = Counter()
+        skipped = 0
+        for gram in grams[number]:
+            posting = postings[gram]
+            if len(posting) > MAX_BLOCK_SIZE:
+                skipped += 1
+                continue
+            # Each pair is only compared once, from its first entry
+            shared.update(other for other in posting if other > number)
+
+        for other, count in shared.items():
+            required = max(len(grams[number]), len(grams[other])) - 3 * max_distance
+            if count + skipped < required:
+                continue
+            other_pk, other_text, other_normalized = texts[other]
+            if text == other_text:
+                # The same headword with a disambiguation is intentional
+                continue
+            distance = edit_distance(normalized, other_normalized, max_distance)
+            if distance <= max_distance:
+                longest = max(len(normalized), len(other_normalized))
+                pairs.append((pk, other_pk, round(1 - distance / longest, 3)))
+
+        if progress and total and (number + 1) * 100 // total > reported:
+            reported = (number + 1) * 100 // total
+            progress(reported / 100)
+
+    return pairs
+
+
+@transaction.atomic
+def merge_entries(
+    keep: models.LexiconEntry, duplicate: models.LexiconEntry
+) -> models.LexiconEntry:
+    """Move everything from the duplicate onto the kept entry, then delete it.
+
+    The duplicate's spelling is kept as a spelling variation. Conjugations are
+    only moved into grid cells the kept entry hasn't filled."""
+    sense_offset = keep.senses.count()
+    for sense in duplicate.senses.all():
+        sense.entry = keep
+        sense.order += sense_offset
+        sense.save()
+
+    duplicate.variations.update(word=keep)
+    models.Variation.objects.create(
+        word=keep,
+        type="spelling",
+        text=duplicate.text,
+        included_in_search=True,
+        notes="Merged from a duplicate entry",
+    )
+
+    filled = {
+        (paradigm_id, row, column)
+        for _, paradigm_id, row, column, _ in models.read_conjugation_cells(word=keep)
+    }
+    moved = defaultdict(dict)
+    for _, paradigm_id, row, column, text in models.read_conjugation_cells(
+        word=duplicate
+    ):
+        if (paradigm_id, row, column) not in filled:
+            moved[paradigm_id][(keep.pk, row, column)] = text
+    for paradigm in models.Paradigm.objects.filter(pk__in=moved):
+        write_conjugation_cells(keep.project, paradigm, moved[paradigm.pk])
+    keep.paradigms.add(*duplicate.paradigms.all())
+    keep.affixes.add(*duplicate.affixes.all())
+
+    if duplicate.comments and duplicate.comments != keep.comments:
+        keep.comments = "\n".join(filter(None, [keep.comments, duplicate.comments]))
+        keep.save()
+
+    log.info(f"Merged entry '{duplicate.text}' into '{keep.text}'")
+    duplicate.delete()
+    update_lexicon_entry_search_field(keep.pk)
+    update_entry_hunspell_forms(keep.pk)
+    return keep
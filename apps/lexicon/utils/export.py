@@ -1,22 +1,36 @@
 # This module contains user facing export options. These can be triggered in a view
 # with files to be downloaded by users
 
+import glob
+import hashlib
+import io
 import json
 import logging
 import os
 import re
-from zipfile import ZipFile
+import tempfile
+from contextlib import contextmanager
+from zipfile import ZIP_DEFLATED, ZipFile, ZipInfo
 
 from django.http import HttpRequest
 from django.urls import reverse
 
 from apps.lexicon import models
-from apps.lexicon.utils.hunspell import unmunch
-from apps.lexicon.utils.project_import_export import export_project_to_json
+from apps.lexicon.tasks import _build_hunspell_forms
+from apps.lexicon.utils.hunspell_pool import get_affix_file
+from apps.lexicon.utils.project_import_export import write_project_json
 
 log = logging.getLogger("lexicon")
 export_folder = os.path.join("data", "exports")
 
+# Deflate level for oxt packages. On a 1.2MB .dic level 6 is within 1% of the size
+# of level 9 in a third of the time, and level 1 is 12% bigger.
+OXT_COMPRESSION_LEVEL = 6
+# The earliest time a zip entry can record
+ZIP_DATE_TIME = (1980, 1, 1, 0, 0, 0)
+# How many entries are read between progress reports
+PROGRESS_CHUNK_SIZE = 2000
+
 
 # Main callable function for exporting entries.
 def export_entries(
@@ -26,11 +40,19 @@ def export_entries(
     checked: bool = True,
     hunspell: bool = True,
     ignore_word_flag: bool = True,
+    base_url: str = "",
+    progress=None,
+    path: str | None = None,
 ) -> str:
     """The view calls this function to export entries in the given format.
 
     It takes the file format, the project to export from, whether to export only checked entries,
-    It returns the path to the created file."""
+    It returns the path to the created file.
+
+    Without a request, e.g. in a background job, an .oxt links back to its update
+    url on base_url. progress is called with the fraction of entries exported.
+    The file is written to path if given, otherwise to a path shared by the
+    project version's exports in that format."""
     _check_export_folder()
     match file_format:
         case "dic":
@@ -39,6 +61,8 @@ def export_entries(
                 checked=checked,
                 hunspell=hunspell,
                 ignore_word_flag=ignore_word_flag,
+                progress=progress,
+                path=path,
             )
         case "oxt":
             return _create_oxt_package(
@@ -47,6 +71,9 @@ def export_entries(
                 checked=checked,
                 hunspell=hunspell,
                 ignore_word_flag=ignore_word_flag,
+                zip_path=path,
+                base_url=base_url,
+                progress=progress,
             )
         case "xml":
             return _create_xml_file(
@@ -54,13 +81,27 @@ def export_entries(
                 checked=checked,
                 hunspell=hunspell,
                 ignore_word_flag=ignore_word_flag,
+                progress=progress,
+                path=path,
+            )
+        case "zip":
+            return _create_bundle(
+                project,
+                request,
+                checked=checked,
+                hunspell=hunspell,
+                ignore_word_flag=ignore_word_flag,
+                base_url=base_url,
+                progress=progress,
+                path=path,
             )
         # TODO write a test case
         case "jsn":
-            json_string = export_project_to_json(project.pk)
-            path = os.path.join(export_folder, f"{project.language_code}.json")
-            with open(path, "w", encoding="utf-8") as f:
-                f.write(json_string)
+            path = path or os.path.join(
+                export_folder, get_export_filename(project, "jsn")
+            )
+            with _replace_when_written(path) as f:
+                write_project_json(project.pk, f)
             return path
 
 
@@ -79,10 +120,71 @@ def _check_export_folder() -> None:
         raise PermissionError(f"Export folder {export_folder} is not writable.")
 
 
-def _get_export_path(project, extension: str) -> str:
+def _get_export_path(project, extension: str, content_hash: str = "") -> str:
     safe_lang_code = _sanitize_filename_component(project.language_code)
     safe_version = _sanitize_filename_component(str(project.version))
-    return os.path.join(export_folder, f"{safe_lang_code}_{safe_version}.{extension}")
+    name = f"{safe_lang_code}_{safe_version}"
+    if content_hash:
+        name += f"_{_sanitize_filename_component(content_hash)}"
+    return os.path.join(export_folder, f"{name}.{extension}")
+
+
+def get_export_filename(project, file_format: str) -> str:
+    """Return the name an export in the given format is downloaded as."""
+    if file_format == "jsn":
+        return f"{project.language_code}.json"
+    return os.path.basename(_get_export_path(project, file_format))
+
+
+def _get_update_url(project, request: HttpRequest | None, base_url: str = "") -> str:
+    url = reverse("lexicon:oxt_update_notify", args=[project.language_code])
+    if request is None:
+        return base_url.rstrip("/") + url
+    return request.build_absolute_uri(url)
+
+
+def get_update_package_path(lang_code: str, version: int, update_url: str) -> str:
+    """Return where the oxt package LibreOffice downloads as an update is kept.
+
+    The package links back to the update url, so a hash of it is part of the name
+    in case the site is reached under more than one host name."""
+    safe_lang_code = _sanitize_filename_component(lang_code)
+    safe_version = _sanitize_filename_component(str(version))
+    url_hash = hashlib.sha1(update_url.encode()).hexdigest()[:8]
+    return os.path.join(
+        export_folder, f"{safe_lang_code}_{safe_version}_update_{url_hash}.oxt"
+    )
+
+
+def build_update_package(project: models.LexiconProject, request: HttpRequest) -> str:
+    """Build the update package for the project's current version and return its path.
+
+    The package is written under a temporary name and moved into place, so a
+    concurrent download never sees a half written file. Packages of older
+    versions are removed."""
+    _check_export_folder()
+    path = get_update_package_path(
+        project.language_code, project.version, _get_update_url(project, request)
+    )
+    temp_path = f"{path}.{os.getpid()}.tmp"
+    _create_oxt_package(
+        project,
+        request,
+        checked=True,
+        hunspell=True,
+        ignore_word_flag=True,
+        zip_path=temp_path,
+    )
+    os.replace(temp_path, path)
+
+    safe_lang_code = _sanitize_filename_component(project.language_code)
+    current = f"{safe_lang_code}_{_sanitize_filename_component(str(project.version))}_"
+    for old in glob.glob(
+        os.path.join(glob.escape(export_folder), f"{safe_lang_code}_*_update_*.oxt")
+    ):
+        if not os.path.basename(old).startswith(current):
+            os.remove(old)
+    return path
 
 
 # Helper functions for retrieving export content from the database.
@@ -91,33 +193,49 @@ def _get_word_list(
     checked: bool = True,
     hunspell: bool = True,
     ignore_word_flag: bool = True,
+    progress=None,
+    modified_since=None,
 ) -> list:
-    """Returns the entries to be exported from the database."""
+    """Returns the entries to be exported from the database.
+
+    progress is called with the fraction of entries read, if given. With
+    modified_since only the words of entries changed on or after that date are
+    returned."""
     base_query = models.LexiconEntry.objects.filter(project=project)
 
     if checked:
         base_query = base_query.filter(checked=True)
+    if modified_since:
+        base_query = base_query.filter(modified__gte=modified_since)
 
     # Use prefetch_related to grab all related objects efficiently
-    entries = base_query.prefetch_related("affixes", "conjugations", "variations")
+    entries = base_query.prefetch_related(
+        "affixes", "conjugations", "conjugation_grids", "variations"
+    )
+    if progress:
+        total = base_query.count()
+        entries = entries.iterator(chunk_size=PROGRESS_CHUNK_SIZE)
 
     word_list = []
-    for entry in entries:
+    for count, entry in enumerate(entries, 1):
+        if progress and count % PROGRESS_CHUNK_SIZE == 0:
+            progress(count / total)
         # gather all the related model data
         affix_letters = "".join(a.affix_letter for a in entry.affixes.all())
-        conjugation_objects = entry.conjugations.all()
-        variation_objects = entry.variations.filter(included_in_spellcheck=True)
+        conjugation_texts = [text for _, _, _, text in entry.conjugation_cells()]
+        # Filtered here, a queryset filter would skip the prefetched variations
+        variation_objects = [
+            v for v in entry.variations.all() if v.included_in_spellcheck
+        ]
 
         # If hunspell is enabled, append the affix letters to the word and conjugations
         if hunspell and affix_letters:
             base_word = f"{entry.text}/{affix_letters}"
-            conjugations = (
-                f"{c.conjugation}/{affix_letters}" for c in conjugation_objects
-            )
+            conjugations = (f"{text}/{affix_letters}" for text in conjugation_texts)
             variations = (f"{v.text}/{affix_letters}" for v in variation_objects)
         else:
             base_word = entry.text
-            conjugations = (c.conjugation for c in conjugation_objects)
+            conjugations = conjugation_texts
             variations = (v.text for v in variation_objects)
 
         # Add all generated words and their forms to the main list
@@ -137,9 +255,79 @@ def _get_word_list(
     return word_list
 
 
+def _get_plain_word_list(
+    project: models.LexiconProject,
+    checked: bool = True,
+    hunspell: bool = True,
+    ignore_word_flag: bool = True,
+    progress=None,
+    modified_since=None,
+) -> list:
+    """Returns the words for a .dic or .xml file used outside of hunspell.
+
+    These need every affix conjugation, which are read from the forms generated
+    ahead of time rather than expanded on the fly. modified_since limits the
+    words as for _get_word_list."""
+    if not hunspell:
+        return _get_word_list(
+            project,
+            checked=checked,
+            hunspell=False,
+            ignore_word_flag=ignore_word_flag,
+            progress=progress,
+            modified_since=modified_since,
+        )
+
+    if project.ensure_hunspell_forms():
+        forms = models.HunspellForm.objects.filter(entry__project=project)
+        if checked:
+            forms = forms.filter(entry__checked=True)
+        if modified_since:
+            forms = forms.filter(entry__modified__gte=modified_since)
+        word_list = list(
+            forms.order_by("entry__text", "entry_id", "pk").values_list(
+                "form", flat=True
+            )
+        )
+    else:
+        # The stored forms are being rebuilt, expand them in the same order meanwhile
+        word_list = _expand_word_list(project, checked, modified_since)
+    if ignore_word_flag:
+        word_list.extend(
+            models.IgnoreWord.objects.filter(project=project).values_list(
+                "text", flat=True
+            )
+        )
+    return word_list
+
+
+def _expand_word_list(
+    project: models.LexiconProject, checked: bool = True, modified_since=None
+) -> list[str]:
+    """Return the forms _get_plain_word_list reads, expanded from the affix file."""
+    affix_file = get_affix_file(project.affix_file)
+    entries = models.LexiconEntry.objects.filter(project=project)
+    if checked:
+        entries = entries.filter(checked=True)
+    if modified_since:
+        entries = entries.filter(modified__gte=modified_since)
+    entries = entries.order_by("text", "pk").prefetch_related(
+        "affixes", "conjugations", "conjugation_grids", "variations"
+    )
+    return [
+        form.form
+        for entry in entries.iterator(chunk_size=PROGRESS_CHUNK_SIZE)
+        for form in _build_hunspell_forms(entry, affix_file)
+    ]
+
+
 # Helper functions that format the export content.
 def _create_dic_oxt_string(
-    project: models.LexiconProject, checked=True, hunspell=True, ignore_word_flag=True
+    project: models.LexiconProject,
+    checked=True,
+    hunspell=True,
+    ignore_word_flag=True,
+    progress=None,
 ) -> str:
     """
     Queries the database for Entries and creates a string for a .dic file suitable for an oxt.
@@ -155,14 +343,17 @@ def _create_dic_oxt_string(
     Returns:
         str: A newline-separated string formatted for a .dic file.
     """
-    word_list = _get_word_list(project, checked, hunspell, ignore_word_flag)
-    word_list.insert(0, str(len(word_list)))
-
-    return "\n".join(word_list)
+    return _format_dic(
+        _get_word_list(project, checked, hunspell, ignore_word_flag, progress)
+    )
 
 
 def _create_xml_string(
-    project: models.LexiconProject, checked=True, hunspell=True, ignore_word_flag=True
+    project: models.LexiconProject,
+    checked=True,
+    hunspell=True,
+    ignore_word_flag=True,
+    progress=None,
 ) -> str:
     """Returns a .xml string to be used in .xml file.
 
@@ -173,26 +364,26 @@ def _create_xml_string(
 
     Returns:
         str: A newline-separated string formatted for a .xml file."""
-    words = _create_dic_string(
-        project, checked=checked, hunspell=hunspell, ignore_word_flag=ignore_word_flag
+    return _format_xml(
+        _get_plain_word_list(
+            project,
+            checked=checked,
+            hunspell=hunspell,
+            ignore_word_flag=ignore_word_flag,
+            progress=progress,
+        )
     )
-    words = words.split("\n")[1:]  # skip the first line with the count
-
-    xml_lines = ['<?xml version="1.0" encoding="utf-8"?>', "<SpellingStatus>"]
-    for w in words:
-        xml_lines.append(f'  <Status Word="{w}" State="R" />')
-    xml_lines.append("</SpellingStatus>")
-
-    return "\n".join(xml_lines)
 
 
 def _create_dic_string(
-    project: models.LexiconProject, checked=True, hunspell=True, ignore_word_flag=True
+    project: models.LexiconProject,
+    checked=True,
+    hunspell=True,
+    ignore_word_flag=True,
+    progress=None,
 ) -> str:
     """Returns a plain .dic string to be used in a plain .dic file.
 
-    A .dic file outside of hunspell needs to be unmunched to build all affix conjugations.
-
     Args:
         project (models.LexiconProject): The project to query for entries.
         checked (bool, optional): If True, only include checked entries. Defaults to True.
@@ -200,38 +391,68 @@ def _create_dic_string(
 
     Returns:
         str: A newline-separated string formatted for a .dic file."""
-
-    if hunspell:
-        word_list = unmunch(
-            _create_dic_oxt_string(
-                project,
-                checked=checked,
-                hunspell=hunspell,
-                ignore_word_flag=ignore_word_flag,
-            ),
-            project.affix_file,
-        )
-    else:
-        word_list = _get_word_list(
-            project, checked=checked, hunspell=False, ignore_word_flag=ignore_word_flag
+    return _format_dic(
+        _get_plain_word_list(
+            project,
+            checked=checked,
+            hunspell=hunspell,
+            ignore_word_flag=ignore_word_flag,
+            progress=progress,
         )
+    )
+
 
-    word_list.insert(0, str(len(word_list)))
-    return "\n".join(word_list)
+def _format_dic(word_list: list[str]) -> str:
+    """Returns a .dic string, the number of words followed by a word per line."""
+    return "\n".join([str(len(word_list)), *word_list])
+
+
+def _format_xml(word_list: list[str]) -> str:
+    """Returns a Paratext spelling status .xml string marking every word as correct."""
+    xml_lines = ['<?xml version="1.0" encoding="utf-8"?>', "<SpellingStatus>"]
+    for w in word_list:
+        xml_lines.append(f'  <Status Word="{w}" State="R" />')
+    xml_lines.append("</SpellingStatus>")
+    return "\n".join(xml_lines)
 
 
 # Helper functions that create the actual export files and return their paths.
+def _build_zip(files: dict[str, str | bytes]) -> bytes:
+    """Return a deflated zip of the files that is the same every time it's built.
+
+    Zip entries normally record when and where they were written, so the entries
+    are given a fixed time, system and mode and written in name order."""
+    buffer = io.BytesIO()
+    with ZipFile(buffer, "w") as zip_file:
+        for name in sorted(files):
+            info = ZipInfo(name, date_time=ZIP_DATE_TIME)
+            info.compress_type = ZIP_DEFLATED
+            info.create_system = 3  # unix, the default depends on the platform
+            info.external_attr = 0o644 << 16
+            zip_file.writestr(info, files[name], compresslevel=OXT_COMPRESSION_LEVEL)
+    return buffer.getvalue()
+
+
 def _create_dic_file(
-    project: models.LexiconProject, checked=True, hunspell=True, ignore_word_flag=True
+    project: models.LexiconProject,
+    checked=True,
+    hunspell=True,
+    ignore_word_flag=True,
+    progress=None,
+    path: str | None = None,
 ) -> str:
     """Creates a new .dic file and returns it's path.
 
-    The path is in the format {lang code}_{version}.dic."""
+    Unless a path is given it's in the format {lang code}_{version}.dic."""
 
-    path = _get_export_path(project, "dic")
+    path = path or _get_export_path(project, "dic")
 
     dic_string = _create_dic_string(
-        project, checked=checked, hunspell=hunspell, ignore_word_flag=ignore_word_flag
+        project,
+        checked=checked,
+        hunspell=hunspell,
+        ignore_word_flag=ignore_word_flag,
+        progress=progress,
     )
     try:
         with open(path, "w", encoding="utf-8") as file:
@@ -248,11 +469,13 @@ def _create_xml_file(
     checked: bool = True,
     hunspell: bool = True,
     ignore_word_flag: bool = True,
+    progress=None,
+    path: str | None = None,
 ) -> str:
     """Creates a new .xml file and returns it's path.
 
-    The path is in the format {lang ruff checcode}_{version}.xml."""
-    path = _get_export_path(project, "xml")
+    Unless a path is given it's in the format {lang code}_{version}.xml."""
+    path = path or _get_export_path(project, "xml")
     try:
         with open(path, "w", encoding="utf-8") as file:
             file.write(
@@ -261,6 +484,7 @@ def _create_xml_file(
                     checked=checked,
                     hunspell=hunspell,
                     ignore_word_flag=ignore_word_flag,
+                    progress=progress,
                 )
             )
         return path
@@ -275,12 +499,25 @@ def _create_oxt_package(
     checked: bool,
     hunspell: bool,
     ignore_word_flag: bool,
+    zip_path: str | None = None,
+    base_url: str = "",
+    progress=None,
+    dic_contents: str | None = None,
 ) -> str:
-    """Creates a Libre office oxt zip file and returns it's path."""
-
-    dic_contents = _create_dic_oxt_string(
-        project, checked=checked, hunspell=hunspell, ignore_word_flag=ignore_word_flag
-    )
+    """Creates a Libre office oxt zip file and returns it's path.
+
+    The file is written to zip_path if given. Otherwise a hash of the package is
+    part of its name, so a package that was already built isn't written again.
+    dic_contents may be given if the .dic was already built from the database."""
+
+    if dic_contents is None:
+        dic_contents = _create_dic_oxt_string(
+            project,
+            checked=checked,
+            hunspell=hunspell,
+            ignore_word_flag=ignore_word_flag,
+            progress=progress,
+        )
 
     template_path = os.path.join("apps", "lexicon", "templates", "oxt")
     if not os.path.exists(template_path):
@@ -308,10 +545,7 @@ def _create_oxt_package(
             )
             desc_contents = desc_contents.replace("$LANG_CODE", project.language_code)
             desc_contents = desc_contents.replace(
-                "$UPDATE_URL",
-                request.build_absolute_uri(
-                    reverse("lexicon:oxt_update_notify", args=[project.language_code])
-                ),
+                "$UPDATE_URL", _get_update_url(project, request, base_url)
             )
     except IOError as e:
         log.error(f"Failed to read file {path}: {e}")
@@ -327,33 +561,122 @@ def _create_oxt_package(
         log.error(f"Failed to read file {path}: {e}")
         raise
 
-    zip_path = _get_export_path(project, "oxt")
-    # Build the zip file
     try:
-        with ZipFile(
-            zip_path,
-            "w",
-        ) as myzip:
-            # write the .dic
-            myzip.writestr(
-                os.path.join("dictionaries", f"{project.language_code}_PG.dic"),
-                dic_contents,
-            )
-            # write the .add
-            myzip.writestr(
-                os.path.join("dictionaries", f"{project.language_code}_PG.aff"),
-                project.affix_file,
-            )
-            # write the other files
-            myzip.writestr("dictionaries.xcu", xcu_contents)
-            myzip.writestr("description.xml", desc_contents)
-            myzip.write(os.path.join(template_path, "License.txt"), "License.txt")
-            myzip.write(
-                os.path.join(template_path, "manifest.xml"),
-                os.path.join("META-INF", "manifest.xml"),
-            )
+        with open(os.path.join(template_path, "License.txt"), "rb") as f:
+            license_contents = f.read()
+        with open(os.path.join(template_path, "manifest.xml"), "rb") as f:
+            manifest_contents = f.read()
+    except IOError as e:
+        log.error(f"Failed to read oxt template files: {e}")
+        raise
 
+    zip_bytes = _build_zip(
+        {
+            f"dictionaries/{project.language_code}_PG.dic": dic_contents,
+            f"dictionaries/{project.language_code}_PG.aff": project.affix_file,
+            "dictionaries.xcu": xcu_contents,
+            "description.xml": desc_contents,
+            "License.txt": license_contents,
+            "META-INF/manifest.xml": manifest_contents,
+        }
+    )
+    if zip_path is None:
+        content_hash = hashlib.sha256(zip_bytes).hexdigest()[:16]
+        zip_path = _get_export_path(project, "oxt", content_hash)
+        if os.path.exists(zip_path):
+            # The same content was built before
+            return zip_path
+    try:
+        with open(zip_path, "wb") as f:
+            f.write(zip_bytes)
         return zip_path
     except IOError as e:
         log.error(f"Failed to write file {zip_path}: {e}")
         raise
+
+
+@contextmanager
+def _replace_when_written(path: str, mode: str = "w"):
+    """Open a temporary file next to path, moved over path once it's written.
+
+    A reader of path never sees a half written file, and the file isn't left
+    behind if writing fails."""
+    fd, temp_path = tempfile.mkstemp(dir=os.path.dirname(path), suffix=".tmp")
+    # mkstemp makes the file private, the web server may be the one sending it
+    os.chmod(temp_path, 0o644)
+    try:
+        with os.fdopen(fd, mode, encoding=None if "b" in mode else "utf-8") as f:
+            yield f
+        os.replace(temp_path, path)
+    except BaseException:
+        os.remove(temp_path)
+        raise
+
+
+def _write_content_addressed(project, extension: str, data: bytes) -> str:
+    """Write data to a path named by its hash and return the path.
+
+    A file with the same content is reused. Otherwise it's written under a
+    temporary name and moved into place, so a reader never sees part of it."""
+    content_hash = hashlib.sha256(data).hexdigest()[:16]
+    path = _get_export_path(project, extension, content_hash)
+    if os.path.exists(path):
+        return path
+    with _replace_when_written(path, "wb") as f:
+        f.write(data)
+    return path
+
+
+def _create_bundle(
+    project: models.LexiconProject,
+    request: HttpRequest,
+    checked: bool = True,
+    hunspell: bool = True,
+    ignore_word_flag: bool = True,
+    base_url: str = "",
+    progress=None,
+    path: str | None = None,
+) -> str:
+    """Creates a zip of the .oxt, .dic and .xml exports and returns it's path.
+
+    The project's entries are read once for the oxt's flagged word list and its
+    expanded hunspell forms once for both the .dic and .xml, rather than once per
+    format. Without hunspell all three use the same word list. Each format is
+    also kept as its own file in the export store, named by a hash of its
+    contents as the options aren't part of the standalone exports' names."""
+    from apps.lexicon.utils import export_store
+
+    oxt_words = _get_word_list(project, checked, hunspell, ignore_word_flag, progress)
+    if hunspell:
+        plain_words = _get_plain_word_list(project, checked, True, ignore_word_flag)
+    else:
+        plain_words = oxt_words
+
+    files = {
+        "oxt": _create_oxt_package(
+            project,
+            request,
+            checked=checked,
+            hunspell=hunspell,
+            ignore_word_flag=ignore_word_flag,
+            base_url=base_url,
+            dic_contents=_format_dic(oxt_words),
+        )
+    }
+    for extension, contents in (
+        ("dic", _format_dic(plain_words)),
+        ("xml", _format_xml(plain_words)),
+    ):
+        files[extension] = _write_content_addressed(
+            project, extension, contents.encode("utf-8")
+        )
+
+    export_store.record_artifacts(files.values(), project, project.version)
+    bundle = {}
+    for extension, file_path in files.items():
+        with open(file_path, "rb") as f:
+            bundle[f"{project.language_code}.{extension}"] = f.read()
+    path = path or _get_export_path(project, "zip")
+    with open(path, "wb") as f:
+        f.write(_build_zip(bundle))
+    return path
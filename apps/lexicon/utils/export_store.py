@@ -0,0 +1,198 @@
+# This module keeps data/exports to a size. Every file written there is indexed
+# as an ExportArtifact, and when the folder grows past settings.EXPORT_STORE_BYTES
+# the least recently used files are removed. Files of each project's latest few
+# versions, and those of export jobs that can still be downloaded, are kept.
+
+import logging
+import os
+import re
+from datetime import UTC, datetime, timedelta
+
+from django.conf import settings
+from django.core.cache import cache
+from django.db.models import Count, Sum
+from django.utils import timezone
+
+from apps.lexicon import models
+from apps.lexicon.utils import export
+
+log = logging.getLogger("lexicon")
+
+STATS_KEY = "export-store-stats"
+# {lang code}_{version}... as written by the export functions
+VERSION_PATTERN = re.compile(r"^(?P<lang_code>[a-zA-Z0-9-]+)_(?P<version>\d+)[_.]")
+
+
+def record_artifact(path: str, project=None, version: int | None = None) -> None:
+    """Add a newly written file to the index, or mark an indexed one as used."""
+    record_artifacts([path], project, version)
+
+
+def record_artifacts(paths, project=None, version: int | None = None) -> None:
+    """Index several files written from the same project version in one query."""
+    now = timezone.now()
+    models.ExportArtifact.objects.bulk_create(
+        [
+            models.ExportArtifact(
+                path=path,
+                project=project,
+                version=version,
+                size=os.path.getsize(path),
+                last_used=now,
+            )
+            for path in paths
+        ],
+        update_conflicts=True,
+        unique_fields=["path"],
+        update_fields=["project", "version", "size", "last_used"],
+    )
+
+
+def touch_artifact(path: str) -> None:
+    """Mark a file as used, e.g. when it's downloaded."""
+    models.ExportArtifact.objects.filter(path=path).update(last_used=timezone.now())
+
+
+def forget_artifacts(paths) -> None:
+    """Remove deleted files from the index."""
+    models.ExportArtifact.objects.filter(path__in=list(paths)).delete()
+
+
+def _files_on_disk() -> dict[str, os.stat_result]:
+    files = {}
+    for folder, _, filenames in os.walk(export.export_folder):
+        for filename in filenames:
+            # Files still being written are moved into place when finished
+            if filename.endswith(".tmp"):
+                continue
+            path = os.path.join(folder, filename)
+            files[path] = os.stat(path)
+    return files
+
+
+def sync_index() -> None:
+    """Index files written before the index existed, and forget deleted files.
+
+    A file found on disk is attributed to a project and version from its name,
+    and counts as last used when it was last modified."""
+    on_disk = _files_on_disk()
+    indexed = set(models.ExportArtifact.objects.values_list("path", flat=True))
+    forget_artifacts(indexed - on_disk.keys())
+
+    untracked = on_disk.keys() - indexed
+    if not untracked:
+        return
+    projects = {
+        project.language_code: project
+        for project in models.LexiconProject.objects.only("pk", "language_code")
+    }
+    artifacts = []
+    for path in untracked:
+        match = VERSION_PATTERN.match(os.path.basename(path))
+        stat = on_disk[path]
+        artifacts.append(
+            models.ExportArtifact(
+                path=path,
+                project=projects.get(match["lang_code"]) if match else None,
+                version=int(match["version"]) if match else None,
+                size=stat.st_size,
+                last_used=datetime.fromtimestamp(stat.st_mtime, tz=UTC),
+            )
+        )
+    models.ExportArtifact.objects.bulk_create(artifacts, ignore_conflicts=True)
+    log.debug(f"Indexed {len(artifacts)} export files")
+
+
+def _protected_paths() -> set[str]:
+    """Return the files that are kept however large the folder grows."""
+    cutoff = timezone.now() - timedelta(hours=settings.EXPORT_RETENTION_HOURS)
+    protected = set(
+        models.ExportJob.objects.filter(
+            status="done", finished__gte=cutoff
+        ).values_list("artifact", flat=True)
+    )
+
+    artifacts = models.ExportArtifact.objects.filter(version__isnull=False).values_list(
+        "path", "project", "version"
+    )
+    versions = {}
+    for _, project_pk, version in artifacts:
+        versions.setdefault(project_pk, set()).add(version)
+    kept = {
+        project_pk: set(
+            sorted(project_versions, reverse=True)[: settings.EXPORT_KEEP_VERSIONS]
+        )
+        for project_pk, project_versions in versions.items()
+    }
+    protected.update(
+        path for path, project_pk, version in artifacts if version in kept[project_pk]
+    )
+    return protected
+
+
+def enforce_budget(budget: int | None = None) -> dict:
+    """Remove the least recently used files until the export folder fits the budget.
+
+    Returns the number and size of the files removed, and the folder's size after."""
+    if budget is None:
+        budget = settings.EXPORT_STORE_BYTES
+    sync_index()
+    total = models.ExportArtifact.objects.aggregate(total=Sum("size"))["total"] or 0
+
+    evicted = []
+    evicted_bytes = 0
+    if total > budget:
+        protected = _protected_paths()
+        for artifact in models.ExportArtifact.objects.order_by("last_used"):
+            if total - evicted_bytes <= budget:
+                break
+            if artifact.path in protected:
+                continue
+            try:
+                os.remove(artifact.path)
+            except FileNotFoundError:
+                pass
+            evicted.append(artifact.path)
+            evicted_bytes += artifact.size
+        forget_artifacts(evicted)
+        if total - evicted_bytes > budget:
+            log.warning(
+                f"Export folder is {total - evicted_bytes} bytes, over its budget of "
+                f"{budget}, but the remaining files are protected"
+            )
+
+    result = {
+        "evicted_files": len(evicted),
+        "evicted_bytes": evicted_bytes,
+        "bytes": total - evicted_bytes,
+    }
+    stats = cache.get(STATS_KEY, {"evicted_files": 0, "evicted_bytes": 0})
+    stats["evicted_files"] += len(evicted)
+    stats["evicted_bytes"] += evicted_bytes
+    stats["last_run"] = timezone.now()
+    cache.set(STATS_KEY, stats, None)
+    log.info(f"Export store: removed {len(evicted)} files, {evicted_bytes} bytes")
+    return result
+
+
+def store_stats() -> dict:
+    """Return the size of the export folder and how much has been evicted from it."""
+    usage = models.ExportArtifact.objects.aggregate(
+        files=Count("pk"), bytes=Sum("size")
+    )
+    by_project = {
+        row["project__language_code"]: row["bytes"]
+        for row in models.ExportArtifact.objects.order_by()
+        .values("project__language_code")
+        .annotate(bytes=Sum("size"))
+    }
+    stats = cache.get(STATS_KEY, {})
+    return {
+        "files": usage["files"],
+        "bytes": usage["bytes"] or 0,
+        "budget": settings.EXPORT_STORE_BYTES,
+        "by_project": by_project,
+        "evicted_files": stats.get("evicted_files", 0),
+        "evicted_bytes": stats.get("evicted_bytes", 0),
+        "last_run": stats.get("last_run"),
+    }
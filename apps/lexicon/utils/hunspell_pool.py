@@ -0,0 +1,234 @@
+# A pool of long-lived worker processes that expand Hunspell affixes.
+# Each worker keeps recently used affix files parsed in memory, so repeated
+# requests for the same project skip process creation, temp files and parsing.
+
+import hashlib
+import logging
+import multiprocessing
+import os
+import threading
+from collections import OrderedDict
+
+from django.conf import settings
+
+from apps.lexicon.utils.affix_file import AffixFile, expand_dic, parse_affix_file
+
+log = logging.getLogger("lexicon")
+
+PARSED_AFFIX_CACHE_SIZE = 32
+
+# Parsed affix files for the current process, keyed by a hash of their contents.
+# Editing an affix file changes its hash, so stale entries simply age out.
+_parsed_affix_files: OrderedDict[str, AffixFile] = OrderedDict()
+
+
+class HunspellTimeout(RuntimeError):
+    """Raised when an expansion runs longer than its timeout."""
+
+
+def affix_key(aff_content: str) -> str:
+    """Return a stable key for an affix file's contents."""
+    return hashlib.sha1(aff_content.encode("utf-8")).hexdigest()
+
+
+def get_affix_file(aff_content: str, key: str | None = None) -> AffixFile:
+    """Return the parsed affix file from this process's cache, parsing on a miss."""
+    key = key or affix_key(aff_content)
+    affix_file = _parsed_affix_files.get(key)
+    if affix_file is None:
+        affix_file = parse_affix_file(aff_content)
+        _parsed_affix_files[key] = affix_file
+        if len(_parsed_affix_files) > PARSED_AFFIX_CACHE_SIZE:
+            _parsed_affix_files.popitem(last=False)
+    else:
+        _parsed_affix_files.move_to_end(key)
+    return affix_file
+
+
+def _expand_in_worker(
+    key: str,
+    aff_content: str,
+    dic_content: str,
+    max_forms: int | None,
+    time_limit: float | None = None,
+) -> list[str]:
+    """The function run inside a worker process."""
+    return expand_dic(
+        dic_content, get_affix_file(aff_content, key), max_forms, time_limit
+    )
+
+
+def _worker_main(conn) -> None:
+    """Run the requests sent over conn until the pool closes it."""
+    while True:
+        try:
+            fn, args = conn.recv()
+        except EOFError:
+            return
+        try:
+            reply = (True, fn(*args))
+        except Exception as e:
+            reply = (False, e)
+        conn.send(reply)
+
+
+class _Worker:
+    """A worker process and the pipe its requests are sent over.
+
+    A worker runs one request at a time, so a request that hangs can be stopped
+    by killing its worker without affecting requests running in the others."""
+
+    def __init__(self, context):
+        self.conn, child_conn = context.Pipe()
+        self.process = context.Process(
+            target=_worker_main, args=(child_conn,), daemon=True
+        )
+        self.process.start()
+        child_conn.close()
+
+    def call(self, fn, args, timeout: float) -> tuple[bool, object]:
+        """Run fn in the worker, returning whether it succeeded and its result.
+
+        Raises:
+            HunspellTimeout: If there's no reply within the timeout.
+            EOFError, OSError: If the worker process has died.
+        """
+        self.conn.send((fn, args))
+        if not self.conn.poll(timeout):
+            raise HunspellTimeout(f"Affix expansion timed out after {timeout}s")
+        return self.conn.recv()
+
+    def kill(self) -> None:
+        self.process.kill()
+        self.process.join(timeout=1)
+        self.conn.close()
+
+
+class HunspellPool:
+    """Multiplexes affix expansion requests over a set of worker processes.
+
+    Each request gets a worker to itself. A request that runs longer than its
+    timeout has its worker killed and replaced, other requests carry on. If a
+    worker crashes the request is retried once on a new one. With workers=0
+    expansion runs inline in the calling process, which is how the test suite
+    uses it."""
+
+    def __init__(self, workers: int = 2, timeout: float = 10.0):
+        self.workers = workers
+        self.timeout = timeout
+        self._idle: list[_Worker] = []
+        self._slots = threading.BoundedSemaphore(max(workers, 1))
+        self._lock = threading.Lock()
+        self._context = multiprocessing.get_context("spawn")
+
+    def expand(
+        self,
+        dic_content: str,
+        aff_content: str,
+        timeout: float | None = None,
+        max_forms: int | None = None,
+    ) -> list[str]:
+        """Expand the .dic contents with the affix file, the equivalent of unmunch.
+
+        Raises:
+            HunspellTimeout: If expansion takes longer than the timeout.
+            RuntimeError: If the pool keeps crashing.
+        """
+        timeout = timeout or self.timeout
+        try:
+            # The time limit also bounds inline expansion, which can't be killed
+            return self.call(
+                _expand_in_worker,
+                affix_key(aff_content),
+                aff_content,
+                dic_content,
+                max_forms,
+                timeout,
+                timeout=timeout,
+            )
+        except TimeoutError as e:
+            raise HunspellTimeout(f"Affix expansion timed out after {timeout}s") from e
+
+    def call(self, fn, *args, timeout: float | None = None):
+        """Run a picklable function in a worker and return its result.
+
+        Raises:
+            HunspellTimeout: If no worker is free, or fn doesn't finish, within
+                the timeout.
+            RuntimeError: If the workers keep crashing.
+        """
+        if not self.workers:
+            return fn(*args)
+        timeout = timeout or self.timeout
+        if not self._slots.acquire(timeout=timeout):
+            raise HunspellTimeout(f"No Hunspell worker was free within {timeout}s")
+        try:
+            for attempt in range(2):
+                worker = self._checkout()
+                try:
+                    succeeded, result = worker.call(fn, args, timeout)
+                except HunspellTimeout:
+                    log.error(
+                        f"Hunspell worker timed out after {timeout}s, replacing it"
+                    )
+                    worker.kill()
+                    raise
+                except (EOFError, OSError):
+                    log.warning(
+                        f"Hunspell worker crashed (attempt {attempt + 1}), replacing it"
+                    )
+                    worker.kill()
+                    continue
+                self._checkin(worker)
+                if not succeeded:
+                    raise result
+                return result
+        finally:
+            self._slots.release()
+        raise RuntimeError("Affix expansion failed, the worker pool keeps crashing")
+
+    def _checkout(self) -> _Worker:
+        with self._lock:
+            if self._idle:
+                return self._idle.pop()
+        return _Worker(self._context)
+
+    def _checkin(self, worker: _Worker) -> None:
+        with self._lock:
+            self._idle.append(worker)
+
+    def shutdown(self) -> None:
+        """Stop the idle workers, requests that are running finish first."""
+        with self._lock:
+            idle, self._idle = self._idle, []
+        for worker in idle:
+            worker.conn.close()
+            worker.process.join(timeout=1)
+            if worker.process.is_alive():
+                worker.process.kill()
+
+
+_pools: dict[str, HunspellPool] = {}
+_pools_pid = None
+
+
+def get_pool(name: str = "default") -> HunspellPool:
+    """Return this process's pool of the given name, creating it on first use.
+
+    "default" serves exports and generated forms, "tester" the affix tester, so
+    requests to the tester can't hold up or kill the workers others rely on.
+    Pools are tied to the process that created them, gunicorn workers forked
+    after they were created get their own."""
+    global _pools_pid
+    if _pools_pid != os.getpid():
+        _pools.clear()
+        _pools_pid = os.getpid()
+    if name not in _pools:
+        if name == "tester":
+            workers = getattr(settings, "HUNSPELL_TESTER_WORKERS", 1)
+        else:
+            workers = getattr(settings, "HUNSPELL_POOL_WORKERS", 2)
+        _pools[name] = HunspellPool(
+            workers=workers, timeout=getattr(settings, "HUNSPELL_TIMEOUT", 10.0)
+        )
+    return _pools[name]
@@ -0,0 +1,226 @@
+# This module fills paradigm grids from a paradigm's generation template. A
+# template has a regex that finds the stem of a headword and a rule for each
+# cell, e.g. "{stem}am" or "{stem}i / ii>i" (substitutions are applied after the
+# stem is filled in). Rules are compiled once and applied to every entry that
+# uses the paradigm, so thousands of entries only take a handful of queries.
+
+import logging
+import re
+from dataclasses import dataclass
+
+from django.db import transaction
+
+from apps.lexicon import models
+from apps.lexicon.tasks import update_entries_search_fields
+from apps.lexicon.utils.conjugations import write_conjugation_cells
+
+log = logging.getLogger("lexicon")
+
+SUBSTITUTION_SEPARATOR = " / "
+# Only this many conflicts, invalid and skipped words are listed in a report
+REPORT_LIMIT = 100
+
+
+class GenerationRuleError(ValueError):
+    """Raised when a generation template or cell rule can't be parsed."""
+
+
+@dataclass(frozen=True)
+class CellRule:
+    """How to build the form for one cell of a paradigm."""
+
+    template: str
+    substitutions: tuple[tuple[re.Pattern, str], ...] = ()
+
+    def apply(self, stem: str, word: str) -> str:
+        form = self.template.replace("{stem}", stem).replace("{word}", word)
+        for pattern, replacement in self.substitutions:
+            form = pattern.sub(replacement, form)
+        return form.strip().lower()
+
+
+def parse_cell_rule(text: str) -> CellRule | None:
+    """Parse a cell rule, returning None for a blank rule.
+
+    Raises:
+        GenerationRuleError: If a substitution isn't written as old>new or old is
+            an invalid regex.
+    """
+    text = text.strip()
+    if not text:
+        return None
+    template, *parts = text.split(SUBSTITUTION_SEPARATOR)
+    if "{stem}" not in template and "{word}" not in template:
+        raise GenerationRuleError(f"Rule '{text}' must contain {{stem}} or {{word}}.")
+    substitutions = []
+    for part in parts:
+        old, separator, new = part.strip().partition(">")
+        if not separator or not old:
+            raise GenerationRuleError(
+                f"Substitution '{part.strip()}' should be written as old>new."
+            )
+        try:
+            substitutions.append((re.compile(old), new))
+        except re.error as e:
+            raise GenerationRuleError(f"Invalid regex '{old}': {e}")
+    return CellRule(template.strip(), tuple(substitutions))
+
+
+def parse_stem_pattern(pattern: str) -> re.Pattern | None:
+    """Compile a stem pattern, which must have exactly one group if it's set."""
+    if not pattern:
+        return None
+    try:
+        compiled = re.compile(pattern)
+    except re.error as e:
+        raise GenerationRuleError(f"Invalid stem pattern: {e}")
+    if compiled.groups != 1:
+        raise GenerationRuleError("The stem pattern must have exactly one (group).")
+    return compiled
+
+
+class ParadigmGenerator:
+    """Generates the forms of a paradigm's cells for a headword."""
+
+    def __init__(self, stem_pattern: str, cell_rules: list[list[str]], rows, columns):
+        self.stem_pattern = parse_stem_pattern(stem_pattern)
+        self.cells = []
+        for row, row_rules in enumerate(cell_rules[:rows]):
+            for column, text in enumerate(row_rules[:columns]):
+                rule = parse_cell_rule(text)
+                if rule:
+                    self.cells.append((row, column, rule))
+
+    def stem(self, word: str) -> str | None:
+        """Return the stem of a word, or None if the stem pattern doesn't match it."""
+        if self.stem_pattern is None:
+            return word
+        match = self.stem_pattern.fullmatch(word)
+        return match.group(1) if match else None
+
+    def generate(self, word: str) -> list[tuple[int, int, str]] | None:
+        """Return (row, column, form) for every cell with a rule."""
+        stem = self.stem(word)
+        if stem is None:
+            return None
+        return [
+            (row, column, rule.apply(stem, word)) for row, column, rule in self.cells
+        ]
+
+
+def _add_to_report(report: dict, key: str, item) -> None:
+    report[f"{key}_count"] += 1
+    if len(report[key]) < REPORT_LIMIT:
+        report[key].append(item)
+
+
+def generate_conjugations(
+    template: "models.GenerationTemplate", batch_size: int = 1000
+) -> dict:
+    """Fill the empty cells of every entry using the template's paradigm.
+
+    Cells that already have a different form are left alone and reported as
+    conflicts. Generated forms that don't pass the project's text validator are
+    reported as invalid rather than saved.
+
+    Returns:
+        A report dict with the number of entries, created forms, conflicts,
+        invalid forms and entries the stem pattern didn't match.
+    """
+    paradigm = template.paradigm
+    project = paradigm.project
+    generator = ParadigmGenerator(
+        template.stem_pattern,
+        template.cell_rules,
+        len(paradigm.row_labels),
+        len(paradigm.column_labels),
+    )
+    validator = (
+        re.compile(project.text_validator, re.IGNORECASE)
+        if project.text_validator
+        else None
+    )
+    max_length = models.Conjugation._meta.get_field("conjugation").max_length
+    labels = [
+        [f"{row}, {column}" for column in paradigm.column_labels]
+        for row in paradigm.row_labels
+    ]
+
+    report = {"entries": 0, "created": 0}
+    for key in ("conflicts", "invalid", "skipped"):
+        report[key] = []
+        report[f"{key}_count"] = 0
+
+    entries = list(
+        models.LexiconEntry.objects.filter(paradigms=paradigm)
+        .order_by("text", "pk")
+        .values_list("pk", "text")
+    )
+    report["entries"] = len(entries)
+    changed_pks = []
+
+    with transaction.atomic():
+        for start in range(0, len(entries), batch_size):
+            batch = entries[start : start + batch_size]
+            existing = {
+                (word_id, row, column): conjugation
+                for word_id, _, row, column, conjugation in models.read_conjugation_cells(
+                    project.conjugation_storage,
+                    paradigm=paradigm,
+                    word_id__in=[pk for pk, _ in batch],
+                )
+            }
+            new = {}
+            for pk, text in batch:
+                forms = generator.generate(text.lower())
+                if forms is None:
+                    _add_to_report(report, "skipped", text)
+                    continue
+                entry_changed = False
+                for row, column, form in forms:
+                    current = existing.get((pk, row, column), "")
+                    if current == form:
+                        continue
+                    cell = labels[row][column]
+                    if current:
+                        _add_to_report(
+                            report,
+                            "conflicts",
+                            {
+                                "word": text,
+                                "cell": cell,
+                                "existing": current,
+                                "generated": form,
+                            },
+                        )
+                        continue
+                    if (
+                        not form
+                        or len(form) > max_length
+                        or (validator and not validator.fullmatch(form))
+                    ):
+                        _add_to_report(
+                            report,
+                            "invalid",
+                            {"word": text, "cell": cell, "generated": form},
+                        )
+                        continue
+                    new[(pk, row, column)] = form
+                    entry_changed = True
+                if entry_changed:
+                    changed_pks.append(pk)
+            write_conjugation_cells(project, paradigm, new)
+            report["created"] += len(new)
+
+        if changed_pks:
+            project.increment_version()
+            # Mark the hunspell forms stale rather than regenerating them per entry
+            models.LexiconProject.objects.filter(pk=project.pk).update(
+                hunspell_forms_affix_hash=None
+            )
+
+    update_entries_search_fields(changed_pks, batch_size)
+    log.info(
+        f"Generated {report['created']} conjugations for {paradigm}, {report['conflicts_count']} conflicts"
+    )
+    return report
@@ -0,0 +1,225 @@
+# This module inserts, deletes and moves the rows and columns of a paradigm. The
+# stored conjugations are remapped to their new positions with a couple of set
+# based UPDATEs, however many entries use the paradigm, so a cell keeps its
+# meaning when the grid around it changes.
+
+import logging
+
+from django.db import transaction
+from django.db.models import Case, F, Value, When
+
+from apps.lexicon import models
+from apps.lexicon.signals import bulk_conjugation_write
+from apps.lexicon.tasks import update_entries_search_fields
+
+log = logging.getLogger("lexicon")
+
+OPERATIONS = ("insert", "delete", "move")
+AXES = ("row", "column")
+
+
+class ReshapeError(ValueError):
+    """Raised when a reshape operation doesn't fit the paradigm."""
+
+
+def reshape_list(items: list, operation: str, index: int, to=None, filler=None):
+    """Return a copy of items with one position inserted, deleted or moved.
+
+    Args:
+        items: The list to reshape, e.g. labels or the cells of a grid row.
+        operation: "insert", "delete" or "move".
+        index: The position to insert at, delete or move from.
+        to: The position to move to.
+        filler: The value inserted at index.
+    """
+    items = list(items)
+    if operation == "insert":
+        items.insert(index, filler)
+    elif operation == "delete":
+        del items[index]
+    elif operation == "move":
+        items.insert(to, items.pop(index))
+    else:
+        raise ReshapeError(f"Unknown operation '{operation}'.")
+    return items
+
+
+def position_mapping(
+    size: int, operation: str, index: int, to=None
+) -> dict[int, int | None]:
+    """Return the new position of every old position that changes, None if deleted.
+
+    Raises:
+        ReshapeError: If index or to is outside the paradigm.
+    """
+    last = size if operation == "insert" else size - 1
+    if not 0 <= index <= last:
+        raise ReshapeError(f"Position {index + 1} is outside the paradigm.")
+    if operation == "move" and (to is None or not 0 <= to < size):
+        raise ReshapeError("The position to move to is outside the paradigm.")
+    reshaped = reshape_list(range(size), operation, index, to)
+    new_positions = {old: new for new, old in enumerate(reshaped) if old is not None}
+    return {
+        old: new_positions.get(old)
+        for old in range(size)
+        if new_positions.get(old) != old
+    }
+
+
+def _pad(items: list, size: int, filler) -> list:
+    return list(items) + [filler] * (size - len(items))
+
+
+def _reshape_matrix(
+    matrix: list[list], rows: int, columns: int, axis: str, operation, index, to
+) -> list[list]:
+    """Reshape a list of rows, padding it to the paradigm's size first."""
+    matrix = [_pad(row, columns, "") for row in _pad(matrix, rows, [])]
+    if axis == "row":
+        return reshape_list(matrix, operation, index, to, [""] * columns)
+    return [reshape_list(row, operation, index, to, "") for row in matrix]
+
+
+def _remap_conjugation_rows(paradigm, field: str, mapping: dict) -> set[int]:
+    """Move and delete Conjugation rows, returning the pks of the words changed."""
+    conjugations = models.Conjugation.objects.filter(paradigm=paradigm)
+    changed = conjugations.filter(**{f"{field}__in": list(mapping)})
+    word_pks = set(changed.values_list("word_id", flat=True).distinct())
+    if not word_pks:
+        return word_pks
+
+    deleted = [old for old, new in mapping.items() if new is None]
+    if deleted:
+        with bulk_conjugation_write():
+            conjugations.filter(**{f"{field}__in": deleted}).delete()
+    moved = {old: new for old, new in mapping.items() if new is not None}
+    if moved:
+        # The unique constraint is checked row by row, so cells are first moved to
+        # negative positions that can't collide, then flipped back
+        conjugations.filter(**{f"{field}__in": list(moved)}).update(
+            **{
+                field: Case(
+                    *[
+                        When(**{field: old}, then=Value(-new - 1))
+                        for old, new in moved.items()
+                    ]
+                )
+            }
+        )
+        conjugations.filter(**{f"{field}__lt": 0}).update(**{field: -F(field) - 1})
+    return word_pks
+
+
+def _remap_conjugation_grids(
+    paradigm, axis, operation, index, to, batch_size
+) -> set[int]:
+    """Reshape the stored grids, returning the pks of the words changed."""
+    rows = len(paradigm.row_labels)
+    columns = len(paradigm.column_labels)
+    word_pks = set()
+    updated = []
+    emptied = []
+    for grid in models.ConjugationGrid.objects.filter(paradigm=paradigm).only(
+        "pk", "word_id", "cells"
+    ):
+        before = grid.filled_cells()
+        grid.cells = _reshape_matrix(
+            grid.cells, rows, columns, axis, operation, index, to
+        )
+        if grid.filled_cells() == before:
+            continue
+        word_pks.add(grid.word_id)
+        if any(any(row) for row in grid.cells):
+            updated.append(grid)
+        else:
+            emptied.append(grid.pk)
+    models.ConjugationGrid.objects.bulk_update(
+        updated, ["cells"], batch_size=batch_size
+    )
+    models.ConjugationGrid.objects.filter(pk__in=emptied).delete()
+    return word_pks
+
+
+def reshape_paradigm(
+    paradigm: models.Paradigm,
+    axis: str,
+    operation: str,
+    index: int,
+    to: int | None = None,
+    label: str = "",
+    batch_size: int = 1000,
+) -> int:
+    """Insert, delete or move a row or column of a paradigm and its conjugations.
+
+    The labels, the stored conjugations of every entry and the generation
+    template are all changed in one transaction. The search fields of the
+    entries whose cells moved are then rebuilt in bulk.
+
+    Args:
+        paradigm: The paradigm to reshape.
+        axis: "row" or "column".
+        operation: "insert", "delete" or "move".
+        index: The 0 based position to insert at, delete or move from.
+        to: The 0 based position to move to.
+        label: The label of an inserted row or column.
+
+    Returns:
+        The number of entries whose conjugations changed.
+
+    Raises:
+        ReshapeError: If the operation doesn't fit the paradigm.
+    """
+    if axis not in AXES:
+        raise ReshapeError(f"Unknown axis '{axis}'.")
+    if operation not in OPERATIONS:
+        raise ReshapeError(f"Unknown operation '{operation}'.")
+    labels_field = f"{axis}_labels"
+    labels = getattr(paradigm, labels_field)
+    mapping = position_mapping(len(labels), operation, index, to)
+    if operation == "delete" and len(labels) == 1:
+        raise ReshapeError(f"A paradigm needs at least one {axis}.")
+    project = paradigm.project
+
+    with transaction.atomic():
+        if project.conjugation_storage == "grid":
+            word_pks = _remap_conjugation_grids(
+                paradigm, axis, operation, index, to, batch_size
+            )
+        else:
+            word_pks = _remap_conjugation_rows(paradigm, axis, mapping)
+
+        try:
+            template = paradigm.generation_template
+        except models.GenerationTemplate.DoesNotExist:
+            template = None
+        if template is not None and template.cell_rules:
+            template.cell_rules = _reshape_matrix(
+                template.cell_rules,
+                len(paradigm.row_labels),
+                len(paradigm.column_labels),
+                axis,
+                operation,
+                index,
+                to,
+            )
+            template.save(update_fields=["cell_rules"])
+
+        setattr(
+            paradigm,
+            labels_field,
+            reshape_list(labels, operation, index, to, label),
+        )
+        paradigm.save(update_fields=[labels_field])
+
+        if word_pks and operation == "delete":
+            # The deleted forms are no longer part of the spellcheck
+            project.increment_version()
+            models.LexiconProject.objects.filter(pk=project.pk).update(
+                hunspell_forms_affix_hash=None
+            )
+
+    update_entries_search_fields(sorted(word_pks), batch_size)
+    log.info(
+        f"Reshaped {paradigm}: {operation} {axis} {index}, {len(word_pks)} entries changed"
+    )
+    return len(word_pks)
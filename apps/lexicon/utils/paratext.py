@@ -0,0 +1,158 @@
+# This module merges the lexicon into a Paratext SpellingStatus.xml file rather
+# than replacing it, so spelling decisions made in Paratext aren't lost. The
+# Paratext file is read and written a Status element at a time, as a project's
+# file can hold hundreds of thousands of words.
+
+import logging
+import os
+import tempfile
+import xml.etree.ElementTree as ET
+from xml.sax.saxutils import quoteattr
+
+from apps.lexicon import models
+from apps.lexicon.utils import export, export_store
+
+log = logging.getLogger("lexicon")
+
+STATE_CORRECT = "R"
+
+
+def get_merge_words(
+    project: models.LexiconProject,
+    since_version: int | None = None,
+    checked: bool = True,
+    hunspell: bool = True,
+    ignore_word_flag: bool = True,
+) -> tuple[set[str], set[str]]:
+    """Return the lexicon's words, and those that changed since a version.
+
+    The version is dated by the merge that exported it. Without one, or if it
+    was never merged, every word counts as changed. Entries only record the day
+    they changed, so words changed on the day of the merge are included."""
+    words = set(
+        export._get_plain_word_list(project, checked, hunspell, ignore_word_flag)
+    )
+    merge = None
+    if since_version is not None:
+        merge = (
+            models.ParatextMerge.objects.filter(
+                project=project, version__gte=since_version
+            )
+            .order_by("created")
+            .first()
+        )
+    if merge is None:
+        return words, words
+
+    changed = set(
+        export._get_plain_word_list(
+            project,
+            checked,
+            hunspell,
+            ignore_word_flag=False,
+            modified_since=merge.created.date(),
+        )
+    )
+    return words, changed
+
+
+def _start_tag(element: ET.Element) -> str:
+    attributes = "".join(
+        f" {name}={quoteattr(value)}" for name, value in element.attrib.items()
+    )
+    return f"<{element.tag}{attributes}>\n"
+
+
+def _status_line(element: ET.Element) -> str:
+    element.tail = None
+    return f"  {ET.tostring(element, encoding='unicode')}\n"
+
+
+def merge_spelling_status(
+    source, output_path: str, words: set[str], changed: set[str]
+) -> dict:
+    """Write source, a SpellingStatus.xml file, to output_path with the lexicon merged in.
+
+    Statuses of words outside the lexicon are kept as they are. A lexicon word
+    Paratext marked otherwise keeps Paratext's state unless the word is in
+    changed, and lexicon words missing from the file are added as correct.
+    Returns how many statuses were kept, updated and added."""
+    stats = {"kept": 0, "updated": 0, "added": 0}
+    seen = set()
+    root = None
+    depth = 0
+
+    with open(output_path, "w", encoding="utf-8") as out:
+        out.write('<?xml version="1.0" encoding="utf-8"?>\n')
+        for event, element in ET.iterparse(source, events=("start", "end")):
+            if event == "start":
+                depth += 1
+                if root is None:
+                    root = element
+                    out.write(_start_tag(root))
+                continue
+
+            depth -= 1
+            if depth != 1:
+                # The root, or an element inside a Status written with it
+                continue
+            word = element.get("Word")
+            if element.tag == "Status" and word in words:
+                seen.add(word)
+                if element.get("State") != STATE_CORRECT and word in changed:
+                    element.set("State", STATE_CORRECT)
+                    stats["updated"] += 1
+                else:
+                    stats["kept"] += 1
+            else:
+                stats["kept"] += 1
+            out.write(_status_line(element))
+            # Drop the written element so memory doesn't grow with the file
+            del root[:]
+
+        for word in sorted(words - seen):
+            out.write(
+                _status_line(ET.Element("Status", Word=word, State=STATE_CORRECT))
+            )
+            stats["added"] += 1
+        out.write(f"</{root.tag}>\n")
+    return stats
+
+
+def merge_project(
+    project: models.LexiconProject,
+    source,
+    since_version: int | None = None,
+    checked: bool = True,
+    hunspell: bool = True,
+    ignore_word_flag: bool = True,
+) -> tuple[str, dict]:
+    """Merge the project into an uploaded SpellingStatus file and record the merge.
+
+    Returns the path of the merged file and the counts from merge_spelling_status.
+    The file is only this merge's, under a unique name in the export folder.
+
+    Raises:
+        ET.ParseError: If the uploaded file isn't well formed xml.
+    """
+    export._check_export_folder()
+    words, changed = get_merge_words(
+        project, since_version, checked, hunspell, ignore_word_flag
+    )
+    # Every merge has its own file, as each one merges a different upload
+    name = os.path.basename(export._get_export_path(project, "xml", "SpellingStatus"))
+    fd, path = tempfile.mkstemp(
+        prefix=f"{os.path.splitext(name)[0]}_", suffix=".xml", dir=export.export_folder
+    )
+    os.close(fd)
+    # mkstemp makes the file private, the web server may be the one sending it
+    os.chmod(path, 0o644)
+    try:
+        stats = merge_spelling_status(source, path, words, changed)
+    except ET.ParseError:
+        os.remove(path)
+        raise
+    export_store.record_artifact(path, project, project.version)
+    models.ParatextMerge.objects.create(project=project, version=project.version)
+    log.info(f"Merged {project} into a SpellingStatus file: {stats}")
+    return path, stats
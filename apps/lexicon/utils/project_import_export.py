@@ -1,7 +1,12 @@
 # This module is for admins to import and export projects via a django management command
 
+import codecs
+import io
 import json
 import logging
+import os
+import re
+from contextlib import contextmanager
 from datetime import date, datetime, timezone
 
 from django.db import transaction
@@ -9,6 +14,8 @@ from django.db import transaction
 from apps.lexicon.models import (
     Affix,
     Conjugation,
+    ConjugationGrid,
+    GenerationTemplate,
     IgnoreWord,
     LexiconEntry,
     LexiconProject,
@@ -16,9 +23,23 @@ from apps.lexicon.models import (
     Sense,
     Variation,
 )
+from apps.lexicon.tasks import update_entries_search_fields
+from apps.lexicon.utils.conjugations import build_conjugation_grids
 
 log = logging.getLogger("lexicon")
 
+# How many entries are read, with their related objects, at a time
+EXPORT_CHUNK_SIZE = 500
+# How many entries are written, with their related objects, at a time
+IMPORT_CHUNK_SIZE = 500
+# How much of a json file is read at a time when importing
+READ_SIZE = 64 * 1024
+# Sections of an export that are lists, imported an item at a time
+LIST_SECTIONS = ("paradigms", "affixes", "entries", "ignore_words")
+
+WHITESPACE = re.compile(r"[ \t\n\r]*")
+_decoder = json.JSONDecoder()
+
 
 def _serialize_date(value):
     return value.isoformat() if value is not None else None
@@ -28,138 +49,341 @@ def _deserialize_date(value):
     return date.fromisoformat(value) if isinstance(value, str) else value
 
 
-def export_project(project_pk: int) -> dict:
-    """
-    Serialize a full LexiconProject and all related data to a dict.
-    PKs are preserved in the export so relationships can be reconstructed,
-    but they are treated as local IDs only — the importer remaps them.
-    """
-    project = LexiconProject.objects.get(pk=project_pk)
+def _serialize_project(p):
+    return {
+        "language_name": p.language_name,
+        "language_code": p.language_code,
+        "secondary_language": p.secondary_language,
+        "version": p.version,
+        "text_validator": p.text_validator,
+        "affix_file": p.affix_file,
+        "conjugation_storage": p.conjugation_storage,
+    }
 
-    entries = LexiconEntry.objects.filter(project=project).prefetch_related(
-        "senses", "variations", "conjugations", "paradigms", "affixes"
-    )
-    paradigms = Paradigm.objects.filter(project=project)
-    affixes = Affix.objects.filter(project=project)
-    ignore_words = IgnoreWord.objects.filter(project=project)
 
-    def serialize_project(p):
-        return {
-            "language_name": p.language_name,
-            "language_code": p.language_code,
-            "secondary_language": p.secondary_language,
-            "version": p.version,
-            "text_validator": p.text_validator,
-            "affix_file": p.affix_file,
-        }
+def _serialize_paradigm(p):
+    try:
+        template = p.generation_template
+    except GenerationTemplate.DoesNotExist:
+        template = None
+    return {
+        "local_id": p.pk,
+        "name": p.name,
+        "part_of_speech": p.part_of_speech,
+        "row_labels": p.row_labels,
+        "column_labels": p.column_labels,
+        # The rules only, a generation run's status and report aren't restored
+        "generation_template": (
+            {"stem_pattern": template.stem_pattern, "cell_rules": template.cell_rules}
+            if template is not None
+            else None
+        ),
+    }
 
-    def serialize_paradigm(p):
-        return {
-            "local_id": p.pk,
-            "name": p.name,
-            "part_of_speech": p.part_of_speech,
-            "row_labels": p.row_labels,
-            "column_labels": p.column_labels,
-        }
 
-    def serialize_affix(a):
-        return {
-            "local_id": a.pk,
-            "name": a.name,
-            "applies_to": a.applies_to,
-            "affix_letter": a.affix_letter,
-        }
+def _serialize_affix(a):
+    return {
+        "local_id": a.pk,
+        "name": a.name,
+        "applies_to": a.applies_to,
+        "affix_letter": a.affix_letter,
+    }
 
-    def serialize_entry(e):
-        return {
-            "local_id": e.pk,
-            "text": e.text,
-            "disambiguation": e.disambiguation,
-            "comments": e.comments,
-            "review": e.review,
-            "review_comments": e.review_comments,
-            "pos": e.pos,
-            "checked": e.checked,
-            "created": _serialize_date(e.created),
-            "modified": _serialize_date(e.modified),
-            "modified_by": e.modified_by,
-            "review_user": e.review_user,
-            "review_time": _serialize_date(e.review_time),
-            "paradigm_local_ids": list(e.paradigms.values_list("pk", flat=True)),
-            "affix_local_ids": list(e.affixes.values_list("pk", flat=True)),
-            "senses": [
-                {
-                    "eng": s.eng,
-                    "oth_lang": s.oth_lang,
-                    "example": s.example,
-                    "order": s.order,
-                }
-                for s in e.senses.all()
-            ],
-            "variations": [
-                {
-                    "type": v.type,
-                    "text": v.text,
-                    "included_in_spellcheck": v.included_in_spellcheck,
-                    "included_in_search": v.included_in_search,
-                    "notes": v.notes,
-                }
-                for v in e.variations.all()
-            ],
-            "conjugations": [
-                {
-                    "paradigm_local_id": c.paradigm_id,
-                    "row": c.row,
-                    "column": c.column,
-                    "conjugation": c.conjugation,
-                }
-                for c in e.conjugations.all()
-            ],
-        }
 
-    def serialize_ignore_word(iw):
-        return {
-            "text": iw.text,
-            "type": iw.type,
-            "eng": iw.eng,
-            "comments": iw.comments,
-        }
+def _serialize_entry(e):
+    return {
+        "local_id": e.pk,
+        "text": e.text,
+        "disambiguation": e.disambiguation,
+        "comments": e.comments,
+        "review": e.review,
+        "review_comments": e.review_comments,
+        "pos": e.pos,
+        "checked": e.checked,
+        "created": _serialize_date(e.created),
+        "modified": _serialize_date(e.modified),
+        "modified_by": e.modified_by,
+        "review_user": e.review_user,
+        "review_time": _serialize_date(e.review_time),
+        # Read from the prefetched objects, values_list() would query each entry
+        "paradigm_local_ids": [p.pk for p in e.paradigms.all()],
+        "affix_local_ids": [a.pk for a in e.affixes.all()],
+        "senses": [
+            {
+                "eng": s.eng,
+                "oth_lang": s.oth_lang,
+                "example": s.example,
+                "order": s.order,
+            }
+            for s in e.senses.all()
+        ],
+        "variations": [
+            {
+                "type": v.type,
+                "text": v.text,
+                "included_in_spellcheck": v.included_in_spellcheck,
+                "included_in_search": v.included_in_search,
+                "notes": v.notes,
+            }
+            for v in e.variations.all()
+        ],
+        "conjugations": [
+            {
+                "paradigm_local_id": paradigm_id,
+                "row": row,
+                "column": column,
+                "conjugation": text,
+            }
+            for paradigm_id, row, column, text in e.conjugation_cells()
+        ],
+    }
+
+
+def _serialize_ignore_word(iw):
+    return {
+        "text": iw.text,
+        "type": iw.type,
+        "eng": iw.eng,
+        "comments": iw.comments,
+    }
+
+
+def _iter_entries(project: LexiconProject, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Yield a project's entries in pk order, a chunk at a time.
+
+    Each chunk is fetched with its related objects prefetched, so the queries
+    depend on the number of chunks rather than entries, and only one chunk is
+    held in memory."""
+    entries = (
+        LexiconEntry.objects.filter(project=project)
+        .order_by("pk")
+        .prefetch_related(
+            "senses",
+            "variations",
+            "conjugations",
+            "conjugation_grids",
+            "paradigms",
+            "affixes",
+        )
+    )
+    last_pk = 0
+    while True:
+        chunk = list(entries.filter(pk__gt=last_pk)[:chunk_size])
+        yield from chunk
+        if len(chunk) < chunk_size:
+            return
+        last_pk = chunk[-1].pk
 
+
+def _project_sections(project: LexiconProject, chunk_size: int = EXPORT_CHUNK_SIZE):
+    """Return the export's sections in order, lists as iterators of dicts."""
     return {
         "export_version": 1,
         "exported_at": datetime.now(timezone.utc).isoformat(),
-        "project": serialize_project(project),
-        "paradigms": [serialize_paradigm(p) for p in paradigms],
-        "affixes": [serialize_affix(a) for a in affixes],
-        "entries": [serialize_entry(e) for e in entries],
-        "ignore_words": [serialize_ignore_word(iw) for iw in ignore_words],
+        "project": _serialize_project(project),
+        "paradigms": map(
+            _serialize_paradigm,
+            Paradigm.objects.filter(project=project).select_related(
+                "generation_template"
+            ),
+        ),
+        "affixes": map(_serialize_affix, Affix.objects.filter(project=project)),
+        "entries": map(_serialize_entry, _iter_entries(project, chunk_size)),
+        "ignore_words": map(
+            _serialize_ignore_word, IgnoreWord.objects.filter(project=project)
+        ),
     }
 
 
-def export_project_to_json(project_pk: int) -> str:
-    return json.dumps(export_project(project_pk), indent=2, ensure_ascii=False)
+@contextmanager
+def _consistent_read():
+    """Run the export's queries in one transaction that sees a single snapshot.
 
+    An export takes a query per section and per chunk of entries. Under
+    postgres' default isolation each of them sees what was committed before it
+    started, so an entry could link a paradigm added after the paradigms were
+    written and the link would be dropped on import. Inside an outer
+    transaction its isolation level is kept."""
+    connection = transaction.get_connection()
+    outermost = not connection.in_atomic_block
+    with transaction.atomic():
+        if outermost and connection.vendor == "postgresql":
+            with connection.cursor() as cursor:
+                cursor.execute("SET TRANSACTION ISOLATION LEVEL REPEATABLE READ")
+        yield
 
-@transaction.atomic
-def import_project(data: dict, overwrite: bool = False) -> LexiconProject:
+
+def export_project(project_pk: int) -> dict:
     """
-    Import a project bundle produced by export_project().
+    Serialize a full LexiconProject and all related data to a dict.
+    PKs are preserved in the export so relationships can be reconstructed,
+    but they are treated as local IDs only — the importer remaps them.
+    """
+    with _consistent_read():
+        project = LexiconProject.objects.get(pk=project_pk)
+        return {
+            key: value if isinstance(value, (int, str, dict)) else list(value)
+            for key, value in _project_sections(project).items()
+        }
 
-    If overwrite=True and a project with the same language_code exists,
-    it will be deleted and recreated. Otherwise a conflict raises ValueError.
 
-    Returns the newly created LexiconProject.
-    """
-    if data.get("export_version") != 1:
-        raise ValueError(f"Unsupported export version: {data.get('export_version')}")
+def _dumps(value, indent: str) -> str:
+    # Strings are escaped, so every newline is between json tokens
+    return json.dumps(value, indent=2, ensure_ascii=False).replace("\n", "\n" + indent)
+
+
+def write_project_json(
+    project_pk: int, out, chunk_size: int = EXPORT_CHUNK_SIZE
+) -> None:
+    """Write the export_project() bundle as json to out, a text file or stream.
+
+    The output is the same as json.dumps(export_project(), indent=2), but entries
+    are written as each chunk is read rather than after the whole project. All of
+    it is read from one snapshot of the database."""
+    with _consistent_read():
+        project = LexiconProject.objects.get(pk=project_pk)
+        sections = list(_project_sections(project, chunk_size).items())
+        out.write("{")
+        for position, (key, value) in enumerate(sections):
+            out.write(f"\n  {json.dumps(key)}: ")
+            if isinstance(value, (int, str, dict)):
+                out.write(_dumps(value, "  "))
+            else:
+                written = False
+                for item in value:
+                    out.write(",\n    " if written else "[\n    ")
+                    out.write(_dumps(item, "    "))
+                    written = True
+                out.write("\n  ]" if written else "[]")
+            if position < len(sections) - 1:
+                out.write(",")
+        out.write("\n}")
 
-    proj_data = data["project"]
+
+def export_project_to_json(project_pk: int) -> str:
+    out = io.StringIO()
+    write_project_json(project_pk, out)
+    return out.getvalue()
+
+
+def _import_entries(
+    project: LexiconProject,
+    entries: list[dict],
+    paradigm_map: dict[int, Paradigm],
+    affix_map: dict[int, Affix],
+) -> list[int]:
+    """Write a chunk of exported entries and their related rows in bulk.
+
+    Entries are created without LexiconEntry.save(), which would bump the
+    project's version and rebuild each entry's forms, as we're restoring not
+    editing. The M2M through rows are written directly for the same reason.
+    Returns the new entries' pks."""
+    created = LexiconEntry.objects.bulk_create(
+        [
+            LexiconEntry(
+                project=project,
+                text=e["text"],
+                disambiguation=e.get("disambiguation", ""),
+                comments=e.get("comments"),
+                review=e.get("review", "0"),
+                review_comments=e.get("review_comments"),
+                pos=e.get("pos"),
+                checked=e.get("checked", False),
+                created=_deserialize_date(e.get("created")),
+                modified=_deserialize_date(e.get("modified")),
+                modified_by=e.get("modified_by"),
+                review_user=e.get("review_user"),
+                review_time=_deserialize_date(e.get("review_time")),
+            )
+            for e in entries
+        ]
+    )
+
+    senses, variations, conjugations = [], [], []
+    entry_paradigms, entry_affixes = [], []
+    ParadigmThrough = LexiconEntry.paradigms.through
+    AffixThrough = LexiconEntry.affixes.through
+    for e, entry in zip(entries, created):
+        entry_paradigms.extend(
+            ParadigmThrough(lexiconentry_id=entry.pk, paradigm_id=paradigm_map[lid].pk)
+            for lid in dict.fromkeys(e.get("paradigm_local_ids", []))
+            if lid in paradigm_map
+        )
+        entry_affixes.extend(
+            AffixThrough(lexiconentry_id=entry.pk, affix_id=affix_map[lid].pk)
+            for lid in dict.fromkeys(e.get("affix_local_ids", []))
+            if lid in affix_map
+        )
+        senses.extend(
+            Sense(
+                entry=entry,
+                eng=s["eng"],
+                oth_lang=s.get("oth_lang"),
+                example=s.get("example"),
+                order=s.get("order", 1),
+            )
+            for s in e.get("senses", [])
+        )
+        variations.extend(
+            Variation(
+                word=entry,
+                type=v["type"],
+                text=v["text"],
+                included_in_spellcheck=v.get("included_in_spellcheck", False),
+                included_in_search=v.get("included_in_search", False),
+                notes=v.get("notes"),
+            )
+            for v in e.get("variations", [])
+        )
+        # Conjugations (paradigm_map lookup needed)
+        conjugations.extend(
+            (
+                entry.pk,
+                paradigm_map[c["paradigm_local_id"]].pk,
+                c["row"],
+                c["column"],
+                c.get("conjugation", ""),
+            )
+            for c in e.get("conjugations", [])
+            if c["paradigm_local_id"] in paradigm_map
+        )
+
+    ParadigmThrough.objects.bulk_create(entry_paradigms)
+    AffixThrough.objects.bulk_create(entry_affixes)
+    Sense.objects.bulk_create(senses)
+    Variation.objects.bulk_create(variations)
+    if project.conjugation_storage == "grid":
+        ConjugationGrid.objects.bulk_create(
+            build_conjugation_grids(
+                [cell for cell in conjugations if cell[4]], paradigm_map.values()
+            )
+        )
+    else:
+        Conjugation.objects.bulk_create(
+            Conjugation(
+                word_id=word_id,
+                paradigm_id=paradigm_id,
+                row=row,
+                column=column,
+                conjugation=text,
+            )
+            for word_id, paradigm_id, row, column, text in conjugations
+        )
+    return [entry.pk for entry in created]
+
+
+def _create_project(proj_data: dict, overwrite: bool) -> LexiconProject:
     language_code = proj_data["language_code"]
 
     existing = LexiconProject.objects.filter(language_code=language_code).first()
     if existing:
         if overwrite:
             log.warning(f"Deleting existing project '{language_code}' for overwrite.")
+            # The delete collects every related object for their signals, a
+            # chunk of entries at a time keeps that from growing with the project
+            entries = existing.entries.order_by()
+            while pks := list(entries.values_list("pk", flat=True)[:IMPORT_CHUNK_SIZE]):
+                LexiconEntry.objects.filter(pk__in=pks).delete()
             existing.delete()
         else:
             raise ValueError(
@@ -167,137 +391,295 @@ def import_project(data: dict, overwrite: bool = False) -> LexiconProject:
                 "Pass overwrite=True to replace it."
             )
 
-    project = LexiconProject.objects.create(
+    return LexiconProject.objects.create(
         language_name=proj_data["language_name"],
         language_code=language_code,
         secondary_language=proj_data.get("secondary_language"),
         version=proj_data["version"],
         text_validator=proj_data.get("text_validator"),
         affix_file=proj_data["affix_file"],
+        conjugation_storage=proj_data.get("conjugation_storage", "rows"),
     )
 
-    # --- Paradigms: build local_id -> new pk map ---
-    paradigm_map: dict[int, Paradigm] = {}
-    for p in data.get("paradigms", []):
-        new_paradigm = Paradigm.objects.create(
-            project=project,
-            name=p["name"],
-            part_of_speech=p["part_of_speech"],
-            row_labels=p["row_labels"],
-            column_labels=p["column_labels"],
-        )
-        paradigm_map[p["local_id"]] = new_paradigm
 
-    # --- Affixes: build local_id -> new pk map ---
-    affix_map: dict[int, Affix] = {}
-    for a in data.get("affixes", []):
-        new_affix = Affix.objects.create(
-            project=project,
-            name=a["name"],
-            applies_to=a["applies_to"],
-            affix_letter=a["affix_letter"],
+def _import_batch(
+    project: LexiconProject,
+    section: str,
+    items: list[dict],
+    paradigm_map: dict[int, Paradigm],
+    affix_map: dict[int, Affix],
+    entry_pks: list[int],
+) -> None:
+    """Write a batch of items from one of the export's list sections.
+
+    The local_id maps and entry_pks are updated with what's written."""
+    if section == "paradigms":
+        paradigms = Paradigm.objects.bulk_create(
+            [
+                Paradigm(
+                    project=project,
+                    name=p["name"],
+                    part_of_speech=p["part_of_speech"],
+                    row_labels=p["row_labels"],
+                    column_labels=p["column_labels"],
+                )
+                for p in items
+            ]
         )
-        affix_map[a["local_id"]] = new_affix
-
-    # --- Entries ---
-    for e in data.get("entries", []):
-        # Use update_fields or direct field assignment to skip the version-bumping
-        # save() override — we're restoring, not editing.
-        entry = LexiconEntry(
-            project=project,
-            text=e["text"],
-            disambiguation=e.get("disambiguation", ""),
-            comments=e.get("comments"),
-            review=e.get("review", "0"),
-            review_comments=e.get("review_comments"),
-            pos=e.get("pos"),
-            checked=e.get("checked", False),
-            created=_deserialize_date(e.get("created")),
-            modified=_deserialize_date(e.get("modified")),
-            modified_by=e.get("modified_by"),
-            review_user=e.get("review_user"),
-            review_time=_deserialize_date(e.get("review_time")),
+        paradigm_map.update(
+            (p["local_id"], paradigm) for p, paradigm in zip(items, paradigms)
         )
-        # Bypass the custom save() to avoid version bumps and Celery tasks
-        # during a bulk restore. Call super().save() via the base class directly.
-        LexiconEntry.save.__wrapped__(entry) if hasattr(
-            LexiconEntry.save, "__wrapped__"
-        ) else super(LexiconEntry, entry).save()
-
-        # M2M relationships
-        if e.get("paradigm_local_ids"):
-            entry.paradigms.set(
-                paradigm_map[lid]
-                for lid in e["paradigm_local_ids"]
-                if lid in paradigm_map
-            )
-        if e.get("affix_local_ids"):
-            entry.affixes.set(
-                affix_map[lid] for lid in e["affix_local_ids"] if lid in affix_map
-            )
-
-        # Senses
-        Sense.objects.bulk_create(
+        GenerationTemplate.objects.bulk_create(
             [
-                Sense(
-                    entry=entry,
-                    eng=s["eng"],
-                    oth_lang=s.get("oth_lang"),
-                    example=s.get("example"),
-                    order=s.get("order", 1),
+                GenerationTemplate(
+                    paradigm=paradigm,
+                    stem_pattern=p["generation_template"].get("stem_pattern", ""),
+                    cell_rules=p["generation_template"].get("cell_rules", []),
                 )
-                for s in e.get("senses", [])
+                for p, paradigm in zip(items, paradigms)
+                if p.get("generation_template")
             ]
         )
-
-        # Variations
-        Variation.objects.bulk_create(
+    elif section == "affixes":
+        affixes = Affix.objects.bulk_create(
             [
-                Variation(
-                    word=entry,
-                    type=v["type"],
-                    text=v["text"],
-                    included_in_spellcheck=v.get("included_in_spellcheck", False),
-                    included_in_search=v.get("included_in_search", False),
-                    notes=v.get("notes"),
+                Affix(
+                    project=project,
+                    name=a["name"],
+                    applies_to=a["applies_to"],
+                    affix_letter=a["affix_letter"],
                 )
-                for v in e.get("variations", [])
+                for a in items
             ]
         )
-
-        # Conjugations (paradigm_map lookup needed)
-        Conjugation.objects.bulk_create(
+        affix_map.update((a["local_id"], affix) for a, affix in zip(items, affixes))
+    elif section == "entries":
+        entry_pks.extend(_import_entries(project, items, paradigm_map, affix_map))
+    elif section == "ignore_words":
+        IgnoreWord.objects.bulk_create(
             [
-                Conjugation(
-                    word=entry,
-                    paradigm=paradigm_map[c["paradigm_local_id"]],
-                    row=c["row"],
-                    column=c["column"],
-                    conjugation=c.get("conjugation", ""),
+                IgnoreWord(
+                    project=project,
+                    text=iw["text"],
+                    type=iw["type"],
+                    eng=iw["eng"],
+                    comments=iw.get("comments"),
                 )
-                for c in e.get("conjugations", [])
-                if c["paradigm_local_id"] in paradigm_map
+                for iw in items
             ]
         )
 
-    # --- Ignore words ---
-    IgnoreWord.objects.bulk_create(
-        [
-            IgnoreWord(
-                project=project,
-                text=iw["text"],
-                type=iw["type"],
-                eng=iw["eng"],
-                comments=iw.get("comments"),
-            )
-            for iw in data.get("ignore_words", [])
-        ]
-    )
 
-    log.info(f"Import complete for project '{language_code}'.")
+@transaction.atomic
+def _import_sections(
+    sections, overwrite: bool, chunk_size: int, on_chunk=None
+) -> LexiconProject:
+    """Import an export from its (section, item) pairs, as iter_project_json yields them.
+
+    The export version must come first and the project before its contents, the
+    order export_project writes them in. Items of the list sections are written
+    chunk_size at a time, and on_chunk is called with the number of entries
+    imported after each chunk of them."""
+    sections = iter(sections)
+    section, version = next(sections, (None, None))
+    if section != "export_version" or version != 1:
+        raise ValueError(f"Unsupported export version: {version}")
+
+    project = None
+    paradigm_map: dict[int, Paradigm] = {}
+    affix_map: dict[int, Affix] = {}
+    entry_pks: list[int] = []
+    batch_section, batch = None, []
+    for section, item in sections:
+        if batch and (section != batch_section or len(batch) >= chunk_size):
+            _import_batch(
+                project, batch_section, batch, paradigm_map, affix_map, entry_pks
+            )
+            if on_chunk and batch_section == "entries":
+                on_chunk(len(entry_pks))
+            batch = []
+        batch_section = section
+
+        if section == "project":
+            project = _create_project(item, overwrite)
+        elif section in LIST_SECTIONS:
+            if project is None:
+                raise ValueError(f"The export's {section} come before its project")
+            batch.append(item)
+    if project is None:
+        raise ValueError("The export has no project")
+    if batch:
+        _import_batch(project, batch_section, batch, paradigm_map, affix_map, entry_pks)
+        if on_chunk and batch_section == "entries":
+            on_chunk(len(entry_pks))
+
+    # Entries were written without their save() side effects. The search field
+    # is built here, the hunspell forms are built the first time they're read
+    # as the new project has no hunspell_forms_affix_hash.
+    update_entries_search_fields(entry_pks)
+
+    log.info(f"Import complete for project '{project.language_code}'.")
     return project
 
 
-def import_project_from_json(json_str: str, overwrite: bool = False) -> LexiconProject:
-    data = json.loads(json_str)
-    return import_project(data, overwrite=overwrite)
+def _dict_sections(data: dict):
+    yield "export_version", data.get("export_version")
+    if "project" in data:
+        yield "project", data["project"]
+    for section in LIST_SECTIONS:
+        for item in data.get(section, []):
+            yield section, item
+
+
+def import_project(
+    data: dict,
+    overwrite: bool = False,
+    progress=None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> LexiconProject:
+    """
+    Import a project bundle produced by export_project().
+
+    If overwrite=True and a project with the same language_code exists,
+    it will be deleted and recreated. Otherwise a conflict raises ValueError.
+
+    Entries are written chunk_size at a time, so the number of queries doesn't
+    grow with each entry. progress is called with the fraction of entries
+    imported, if given.
+
+    Returns the newly created LexiconProject.
+    """
+    on_chunk = None
+    if progress:
+        total = len(data.get("entries", []))
+        on_chunk = lambda count: progress(count / total)
+    return _import_sections(_dict_sections(data), overwrite, chunk_size, on_chunk)
+
+
+class _JSONReader:
+    """Parses json values one at a time from a file.
+
+    Only the part of the file that hasn't been parsed yet is kept in memory."""
+
+    def __init__(self, f, read_size: int):
+        self.f = f
+        self.read_size = read_size
+        self.decoder = codecs.getincrementaldecoder("utf-8")()
+        self.buffer = ""
+        self.pos = 0
+
+    def _read(self, size: int = 0) -> bool:
+        """Add the next part of the file to the buffer, False at the end of the file."""
+        chunk = self.f.read(max(size, self.read_size))
+        if isinstance(chunk, bytes):
+            text = self.decoder.decode(chunk, final=not chunk)
+        else:
+            text = chunk
+        self.buffer = self.buffer[self.pos :] + text
+        self.pos = 0
+        return bool(chunk)
+
+    def peek(self) -> str:
+        """Skip whitespace and return the next character, "" at the end of the file."""
+        while True:
+            self.pos = WHITESPACE.match(self.buffer, self.pos).end()
+            if self.pos < len(self.buffer):
+                return self.buffer[self.pos]
+            if not self._read():
+                return ""
+
+    def expect(self, char: str) -> None:
+        if self.peek() != char:
+            raise json.JSONDecodeError(f"Expecting {char!r}", self.buffer, self.pos)
+        self.pos += 1
+
+    def more(self, closing: str) -> bool:
+        """Consume the comma before another item, or the bracket that closes the list."""
+        if self.peek() == ",":
+            self.pos += 1
+            return True
+        self.expect(closing)
+        return False
+
+    def value(self):
+        self.peek()
+        while True:
+            try:
+                value, end = _decoder.raw_decode(self.buffer, self.pos)
+            except json.JSONDecodeError:
+                # The value may be cut off by the end of the buffer. Reading at
+                # least as much again keeps retries of long values linear.
+                if not self._read(len(self.buffer) - self.pos):
+                    raise
+                continue
+            # A number at the end of the buffer may carry on in the next read
+            if end < len(self.buffer) or not self._read():
+                self.pos = end
+                return value
+
+
+def iter_project_json(f, read_size: int = READ_SIZE):
+    """Yield (section, item) pairs from a json export read from f, a text or binary file.
+
+    Each item of the paradigms, affixes, entries and ignore words is yielded as
+    soon as it's parsed, other sections with their whole value, so memory
+    doesn't grow with the size of the project.
+
+    Raises:
+        json.JSONDecodeError: If the file isn't valid json.
+    """
+    reader = _JSONReader(f, read_size)
+    reader.expect("{")
+    if reader.peek() == "}":
+        return
+    while True:
+        key = reader.value()
+        if not isinstance(key, str):
+            raise json.JSONDecodeError(
+                "Expecting property name", reader.buffer, reader.pos
+            )
+        reader.expect(":")
+        if key in LIST_SECTIONS and reader.peek() == "[":
+            reader.expect("[")
+            if reader.peek() == "]":
+                reader.expect("]")
+            else:
+                yield key, reader.value()
+                while reader.more("]"):
+                    yield key, reader.value()
+        else:
+            yield key, reader.value()
+        if not reader.more("}"):
+            return
+
+
+def _import_stream(
+    f, size: int, overwrite: bool, progress, chunk_size: int
+) -> LexiconProject:
+    on_chunk = None
+    if progress:
+        # Progress through the file, as the number of entries isn't known
+        on_chunk = lambda count: progress(min(f.tell() / size, 1))
+    return _import_sections(iter_project_json(f), overwrite, chunk_size, on_chunk)
+
+
+def import_project_from_file(
+    path: str,
+    overwrite: bool = False,
+    progress=None,
+    chunk_size: int = IMPORT_CHUNK_SIZE,
+) -> LexiconProject:
+    """Import a json export from a file without loading the whole file.
+
+    The file is parsed an item at a time as it's imported. progress is called
+    with the fraction of the file read, if given."""
+    with open(path, "rb") as f:
+        return _import_stream(f, os.path.getsize(path), overwrite, progress, chunk_size)
+
+
+def import_project_from_json(
+    json_str: str, overwrite: bool = False, progress=None
+) -> LexiconProject:
+    return _import_stream(
+        io.StringIO(json_str), len(json_str), overwrite, progress, IMPORT_CHUNK_SIZE
+    )
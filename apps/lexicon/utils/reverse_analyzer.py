@@ -0,0 +1,124 @@
+# This module runs Hunspell affix rules backwards, finding the stems an inflected
+# word could have been generated from. It lets search find the headword of forms
+# that aren't stored anywhere.
+
+import logging
+from collections import OrderedDict
+from dataclasses import dataclass
+
+from apps.lexicon import models
+from apps.lexicon.utils.affix_file import AffixFile, AffixRule
+from apps.lexicon.utils.hunspell_pool import affix_key, get_affix_file
+
+log = logging.getLogger("lexicon")
+
+ANALYZER_CACHE_SIZE = 32
+
+_analyzers: OrderedDict[str, "ReverseAnalyzer"] = OrderedDict()
+
+
+@dataclass(frozen=True)
+class Analysis:
+    """A stem a word could be generated from and the flags it needs to carry."""
+
+    stem: str
+    flags: frozenset[str]
+
+
+class ReverseAnalyzer:
+    """Strips candidate prefixes and suffixes from a word.
+
+    The rules are grouped by the affix they append, so analyzing a word only
+    looks at rules whose affix the word actually starts or ends with."""
+
+    def __init__(self, affix_file: AffixFile):
+        self.suffixes = self._index(affix_file.suffixes)
+        self.prefixes = self._index(affix_file.prefixes)
+        self.suffix_lengths = sorted({len(a) for a in self.suffixes})
+        self.prefix_lengths = sorted({len(a) for a in self.prefixes})
+
+    @staticmethod
+    def _index(rules: dict[str, list[AffixRule]]) -> dict[str, list[AffixRule]]:
+        index = {}
+        for flag_rules in rules.values():
+            for rule in flag_rules:
+                index.setdefault(rule.append, []).append(rule)
+        return index
+
+    def _strip_suffixes(self, word: str):
+        for length in self.suffix_lengths:
+            if length >= len(word):
+                break
+            append = word[len(word) - length :] if length else ""
+            for rule in self.suffixes.get(append, ()):
+                stem = word[: len(word) - length] + rule.strip
+                if rule.applies_to(stem):
+                    yield stem, rule
+
+    def _strip_prefixes(self, word: str):
+        for length in self.prefix_lengths:
+            if length >= len(word):
+                break
+            for rule in self.prefixes.get(word[:length], ()):
+                stem = rule.strip + word[length:]
+                if rule.applies_to(stem):
+                    yield stem, rule
+
+    def analyze(self, word: str) -> set[Analysis]:
+        """Return every stem and flag combination that could generate the word.
+
+        The word itself is not included, only stems reached by removing an affix."""
+        analyses = set()
+        for stem, rule in self._strip_suffixes(word):
+            analyses.add(Analysis(stem, frozenset([rule.flag])))
+        for stem, prefix in self._strip_prefixes(word):
+            analyses.add(Analysis(stem, frozenset([prefix.flag])))
+            if not prefix.cross_product:
+                continue
+            # Prefixes can also be applied on top of a cross product suffix
+            for root, suffix in self._strip_suffixes(stem):
+                if suffix.cross_product:
+                    analyses.add(Analysis(root, frozenset([prefix.flag, suffix.flag])))
+        return analyses
+
+
+def get_analyzer(aff_content: str) -> ReverseAnalyzer:
+    """Return the analyzer for an affix file, compiled once per affix file version."""
+    key = affix_key(aff_content)
+    analyzer = _analyzers.get(key)
+    if analyzer is None:
+        analyzer = ReverseAnalyzer(get_affix_file(aff_content, key))
+        _analyzers[key] = analyzer
+        if len(_analyzers) > ANALYZER_CACHE_SIZE:
+            _analyzers.popitem(last=False)
+    else:
+        _analyzers.move_to_end(key)
+    return analyzer
+
+
+def find_lemmas(project: models.LexiconProject, words: list[str]) -> list[int]:
+    """Return the pks of entries the words could be inflected forms of.
+
+    Candidate stems are looked up by text in a single query, then kept only if
+    the entry carries every flag the analysis needs."""
+    analyzer = get_analyzer(project.affix_file)
+    analyses = set()
+    for word in words:
+        analyses |= analyzer.analyze(word.lower())
+    if not analyses:
+        return []
+
+    flags_by_stem = {}
+    for analysis in analyses:
+        flags_by_stem.setdefault(analysis.stem, []).append(analysis.flags)
+    candidates = models.LexiconEntry.objects.filter(
+        project=project, text__in=flags_by_stem
+    ).prefetch_related("affixes")
+
+    lemmas = []
+    for entry in candidates:
+        letters = {a.affix_letter for a in entry.affixes.all()}
+        if any(flags <= letters for flags in flags_by_stem[entry.text]):
+            lemmas.append(entry.pk)
+    log.debug(f"Reverse analysis of {words} found {len(lemmas)} lemmas")
+    return lemmas
@@ -0,0 +1,208 @@
+# This module suggests corrections for misspelled words using the symmetric delete
+# algorithm (as in SymSpell). Every word in a project is indexed by the strings
+# left after deleting up to MAX_DISTANCE characters, so a lookup only has to
+# generate the deletes of the misspelled word instead of comparing it to every word.
+
+import logging
+import re
+import threading
+from array import array
+from collections import Counter, OrderedDict
+from dataclasses import dataclass
+
+from apps.lexicon import models
+
+log = logging.getLogger("lexicon")
+
+MAX_DISTANCE = 2
+# Only the start of long words is used for the deletes, which keeps the index
+# small without losing many suggestions
+PREFIX_LENGTH = 7
+MAX_SUGGESTIONS = 10
+# Indexes kept in memory at once, the least recently used is dropped first
+INDEX_CACHE_SIZE = 16
+TOKEN_PATTERN = re.compile(r"[^\W\d_]+(?:['-][^\W\d_]+)*")
+
+
+@dataclass(frozen=True)
+class Suggestion:
+    word: str
+    distance: int
+    count: int
+
+
+def _deletes(word: str, max_distance: int) -> set[str]:
+    """Return every string made by deleting up to max_distance characters."""
+    deletes = {word}
+    edge = {word}
+    for _ in range(max_distance):
+        next_edge = set()
+        for item in edge:
+            if len(item) <= 1:
+                continue
+            for i in range(len(item)):
+                next_edge.add(item[:i] + item[i + 1 :])
+        next_edge -= deletes
+        deletes |= next_edge
+        edge = next_edge
+    return deletes
+
+
+def edit_distance(a: str, b: str, max_distance: int) -> int:
+    """Return the optimal string alignment distance between two words.
+
+    Transpositions count as a single edit. Returns max_distance + 1 as soon as the
+    distance is known to be larger than max_distance."""
+    if abs(len(a) - len(b)) > max_distance:
+        return max_distance + 1
+    previous_previous = None
+    previous = list(range(len(b) + 1))
+    for i in range(1, len(a) + 1):
+        current = [i] + [0] * len(b)
+        for j in range(1, len(b) + 1):
+            cost = 0 if a[i - 1] == b[j - 1] else 1
+            current[j] = min(
+                previous[j] + 1, current[j - 1] + 1, previous[j - 1] + cost
+            )
+            if (
+                previous_previous is not None
+                and i > 1
+                and j > 1
+                and a[i - 1] == b[j - 2]
+                and a[i - 2] == b[j - 1]
+            ):
+                current[j] = min(current[j], previous_previous[j - 2] + 1)
+        if min(current) > max_distance:
+            return max_distance + 1
+        previous_previous, previous = previous, current
+    return previous[-1]
+
+
+class SuggestionIndex:
+    """A symmetric delete index over a word list.
+
+    Words are stored once in a list with their counts in an array, and each
+    delete maps to an array of word numbers rather than a list of strings."""
+
+    def __init__(self, words, max_distance: int = MAX_DISTANCE):
+        self.max_distance = max_distance
+        counts = Counter(w.lower() for w in words if w)
+        self.words = sorted(counts)
+        self.counts = array("I", (counts[w] for w in self.words))
+        self.word_numbers = {w: i for i, w in enumerate(self.words)}
+        deletes: dict[str, array] = {}
+        for number, word in enumerate(self.words):
+            for delete in _deletes(word[:PREFIX_LENGTH], max_distance):
+                deletes.setdefault(delete, array("I")).append(number)
+        self.deletes = deletes
+
+    def __len__(self):
+        return len(self.words)
+
+    def __contains__(self, word: str) -> bool:
+        return word.lower() in self.word_numbers
+
+    def lookup(
+        self, word: str, max_distance: int | None = None, limit: int = MAX_SUGGESTIONS
+    ) -> list[Suggestion]:
+        """Return the closest words, ranked by distance then by how common they are."""
+        word = word.lower()
+        if max_distance is None:
+            max_distance = self.max_distance
+        max_distance = min(max_distance, self.max_distance)
+
+        candidates = set()
+        for delete in _deletes(word[:PREFIX_LENGTH], max_distance):
+            candidates.update(self.deletes.get(delete, ()))
+
+        suggestions = []
+        for number in candidates:
+            candidate = self.words[number]
+            distance = edit_distance(word, candidate, max_distance)
+            if distance <= max_distance:
+                suggestions.append(Suggestion(candidate, distance, self.counts[number]))
+        suggestions.sort(key=lambda s: (s.distance, -s.count, s.word))
+        return suggestions[:limit]
+
+    def check_text(self, text: str, limit: int = MAX_SUGGESTIONS) -> list[dict]:
+        """Return the unknown words in a passage with suggestions for each.
+
+        Each unknown word is only looked up once however often it appears."""
+        results = {}
+        for match in TOKEN_PATTERN.finditer(text):
+            token = match.group().lower()
+            if token in self.word_numbers:
+                continue
+            if token not in results:
+                results[token] = {
+                    "word": token,
+                    "offsets": [],
+                    "suggestions": self.lookup(token, limit=limit),
+                }
+            results[token]["offsets"].append(match.start())
+        return list(results.values())
+
+
+def project_words(project: models.LexiconProject) -> list[str]:
+    """Return every spelling in a project, headwords, conjugations, variations and
+    ignore words."""
+    words = list(
+        models.LexiconEntry.objects.filter(project=project).values_list(
+            "text", flat=True
+        )
+    )
+    words.extend(
+        text
+        for _, _, _, _, text in models.read_conjugation_cells(word__project=project)
+    )
+    words.extend(
+        models.Variation.objects.filter(word__project=project).values_list(
+            "text", flat=True
+        )
+    )
+    words.extend(
+        models.IgnoreWord.objects.filter(project=project).values_list("text", flat=True)
+    )
+    return words
+
+
+# Indexes for this process, keyed by project pk and stored with the project
+# version they were built for. _lock guards the dicts, each project has its own
+# lock for building so a large project doesn't hold up lookups in the others.
+_indexes: OrderedDict[int, tuple[int, SuggestionIndex]] = OrderedDict()
+_build_locks: dict[int, threading.Lock] = {}
+_lock = threading.Lock()
+
+
+def _cached_index(project: models.LexiconProject) -> SuggestionIndex | None:
+    with _lock:
+        cached = _indexes.get(project.pk)
+        if cached is None or cached[0] != project.version:
+            return None
+        _indexes.move_to_end(project.pk)
+        return cached[1]
+
+
+def get_index(project: models.LexiconProject) -> SuggestionIndex:
+    """Return the project's index, building it on first use or after the version changes."""
+    index = _cached_index(project)
+    if index is not None:
+        return index
+    with _lock:
+        build_lock = _build_locks.setdefault(project.pk, threading.Lock())
+    with build_lock:
+        # Another request may have built it while this one waited
+        index = _cached_index(project)
+        if index is not None:
+            return index
+        index = SuggestionIndex(project_words(project))
+        with _lock:
+            _indexes[project.pk] = (project.version, index)
+            _indexes.move_to_end(project.pk)
+            if len(_indexes) > INDEX_CACHE_SIZE:
+                evicted, _ = _indexes.popitem(last=False)
+                _build_locks.pop(evicted, None)
+    log.debug(
+        f"Built suggestion index for {project} version {project.version}, {len(index)} words"
+    )
+    return index
@@ -1,6 +1,9 @@
+import hashlib
 import logging
+import re
 
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.http import HttpResponseRedirect, JsonResponse
 from django.http.response import HttpResponse
 from django.shortcuts import get_object_or_404
@@ -12,24 +15,49 @@ from django.views.generic.edit import UpdateView
 from django.views.generic.list import ListView
 
 from apps.lexicon import forms, models
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    get_request_project,
+)
 from apps.lexicon.utils import hunspell
+from apps.lexicon.utils.affix_analyzer import analyze_affix_file
+from apps.lexicon.utils.hunspell_pool import HunspellTimeout
 
 user_log = logging.getLogger("user_log")
 log = logging.getLogger("lexicon")
 
+AFFIX_TESTER_MAX_LINES = 500
+AFFIX_TESTER_MAX_AFFIX_LENGTH = 100_000
+AFFIX_TESTER_MAX_FORMS = 5000
+AFFIX_TESTER_TIMEOUT = 3.0
+AFFIX_TESTER_PAGE_SIZE = 120  # a multiple of the 6 words in each column
+AFFIX_TESTER_CACHE_SECONDS = 600
+RESULT_KEY_PATTERN = re.compile(r"^[0-9a-f]{40}$")
+
+
+class AffixTesterLimitError(ValueError):
+    """Raised when an affix test is too large to run."""
+
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
-class AffixResults(TemplateView):
-    """A htmx partial for generating affixes from a list of words."""
+class AffixResults(LoginRequiredMixin, TemplateView):
+    """A htmx partial for generating affixes from a list of words.
+
+    Results are bounded and cached by their input, the first page is returned
+    straight away and each following page is loaded by htmx from the cache."""
 
     template_name = "lexicon/includes/affix_results.html"
+    page_template_name = "lexicon/includes/affix_results_page.html"
 
     def get(self, request, *args, **kwargs):
         try:
             # Try to generate context as normal
             context = self.get_context_data(**kwargs)
-        except Exception as e:
+        except AffixTesterLimitError as e:
+            return self.render_to_response({"affix_error": str(e)}, status=400)
+        except (RuntimeError, ValueError) as e:
+            # The pool failing, or an error raised by the expansion in a worker
+            log.error(f"Affix tester expansion failed: {e}")
             return JsonResponse(
                 {
                     "error": "An error occurred while processing the affixes.",
@@ -39,17 +67,89 @@ class AffixResults(TemplateView):
             )
         return self.render_to_response(context)
 
+    def get_template_names(self):
+        if self.request.GET.get("key"):
+            return [self.page_template_name]
+        return [self.template_name]
+
     def get_context_data(self, **kwargs):
-        user_log.info(f"{self.request.user} requested affix generation")
         context = super().get_context_data(**kwargs)
-        words = self.request.GET.get("words")
-        affix = self.request.GET.get("affix_file")
-        log.debug(f"Received words: {words}, affix: {affix}")
-        # Call the unmunch function (may raise)
-        result = hunspell.unmunch(words, affix)
-        context.update({"generated_words": result})
+        key = self.request.GET.get("key")
+        if key:
+            # A following page of an earlier result
+            result = (
+                cache.get(self._cache_key(key))
+                if RESULT_KEY_PATTERN.match(key)
+                else None
+            )
+            if result is None:
+                raise AffixTesterLimitError(
+                    "These results have expired, generate them again."
+                )
+        else:
+            user_log.info(f"{self.request.user} requested affix generation")
+            words = self.request.GET.get("words", "")
+            affix = self.request.GET.get("affix_file", "")
+            self._check_limits(words, affix)
+            key = hashlib.sha1(f"{affix}\0{words}".encode("utf-8")).hexdigest()
+            result = cache.get(self._cache_key(key))
+            if result is None:
+                result = self._generate(words, affix)
+                cache.set(self._cache_key(key), result, AFFIX_TESTER_CACHE_SECONDS)
+
+        try:
+            page = max(int(self.request.GET.get("page", 1)), 1)
+        except ValueError:
+            page = 1
+        start = (page - 1) * AFFIX_TESTER_PAGE_SIZE
+        end = start + AFFIX_TESTER_PAGE_SIZE
+        context.update(
+            {
+                "generated_words": result["words"][start:end],
+                "generated_words_count": len(result["words"]),
+                "truncated": result["truncated"],
+                "max_forms": AFFIX_TESTER_MAX_FORMS,
+                "result_key": key,
+                "next_page": page + 1 if end < len(result["words"]) else None,
+            }
+        )
         return context
 
+    def _cache_key(self, key: str) -> str:
+        return f"affix-tester:{key}"
+
+    def _check_limits(self, words: str, affix: str) -> None:
+        """Refuse input that would be too slow or large to expand."""
+        if len(words.splitlines()) > AFFIX_TESTER_MAX_LINES:
+            raise AffixTesterLimitError(
+                f"Too many test words, the limit is {AFFIX_TESTER_MAX_LINES} lines."
+            )
+        if len(affix) > AFFIX_TESTER_MAX_AFFIX_LENGTH:
+            raise AffixTesterLimitError(
+                f"The affix file is too long to test, the limit is {AFFIX_TESTER_MAX_AFFIX_LENGTH} characters."
+            )
+
+    def _generate(self, words: str, affix: str) -> dict:
+        """Expand the words, stopping once there are more than the maximum forms."""
+        log.debug(f"Received {len(words)} characters of words, affix: {len(affix)}")
+        try:
+            # Expand using the tester's own worker pool (may raise)
+            result = hunspell.expand(
+                words,
+                affix,
+                timeout=AFFIX_TESTER_TIMEOUT,
+                max_forms=AFFIX_TESTER_MAX_FORMS + 1,
+                pool="tester",
+            )
+        except HunspellTimeout as e:
+            raise AffixTesterLimitError(
+                f"Generating these words took longer than {AFFIX_TESTER_TIMEOUT:g} seconds, try fewer words."
+            ) from e
+        return {
+            "words": result[:AFFIX_TESTER_MAX_FORMS],
+            "truncated": len(result) > AFFIX_TESTER_MAX_FORMS,
+        }
+
 
 class AffixFileUpdateView(
     LoginRequiredMixin, ProjectEditPermissionRequiredMixin, UpdateView
@@ -62,8 +162,7 @@ class AffixFileUpdateView(
     form_class = forms.AffixFileForm
 
     def get_project(self) -> models.LexiconProject:
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
     def get_success_url(self):
         """
@@ -95,6 +194,57 @@ class AffixFileUpdateView(
         return HttpResponseRedirect(self.get_success_url())
 
 
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class AffixFileAnalysis(
+    LoginRequiredMixin, ProjectEditPermissionRequiredMixin, TemplateView
+):
+    """A htmx partial that reports problems in an affix file as it is edited.
+
+    The affix file is taken from the GET parameters, falling back to the saved one."""
+
+    template_name = "lexicon/includes/affix_analysis.html"
+
+    def get_project(self) -> models.LexiconProject:
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
+
+    def get_context_data(self, **kwargs):
+        context = super().get_context_data(**kwargs)
+        project = self.get_project()
+        affix_file = self.request.GET.get("affix_file", project.affix_file)
+        affixes = models.Affix.objects.filter(project=project)
+        context["report"] = analyze_affix_file(
+            affix_file,
+            affix_letters=set(affixes.values_list("affix_letter", flat=True)),
+            used_letters=set(
+                affixes.filter(entries__isnull=False).values_list(
+                    "affix_letter", flat=True
+                )
+            ),
+            words=self._get_words(project),
+            words_key=f"{project.pk}:{project.version}",
+        )
+        return context
+
+    def _get_words(self, project: models.LexiconProject) -> list[str]:
+        """Return the project's words, cached until the project version changes."""
+        key = f"affix-analysis-words:{project.pk}:{project.version}"
+        words = cache.get(key)
+        if words is None:
+            words = list(
+                models.LexiconEntry.objects.filter(project=project).values_list(
+                    "text", flat=True
+                )
+            )
+            words.extend(
+                text
+                for _, _, _, _, text in models.read_conjugation_cells(
+                    word__project=project
+                )
+            )
+            cache.set(key, words, AFFIX_TESTER_CACHE_SECONDS)
+        return words
+
+
 class AffixMixin:
     """Mixin to provide common functionality for affix-related views."""
 
@@ -102,12 +252,14 @@ class AffixMixin:
     model = models.Affix
 
     def get_project(self) -> models.LexiconProject:
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
     def get_word(self) -> models.LexiconEntry:
-        word_pk = self.kwargs.get("pk")
-        return get_object_or_404(models.LexiconEntry, pk=word_pk)
+        if not hasattr(self, "_word"):
+            self._word = get_object_or_404(
+                models.LexiconEntry, pk=self.kwargs.get("pk")
+            )
+        return self._word
 
     def get_context_data(self, **kwargs) -> dict:
         context = super().get_context_data(**kwargs)
@@ -1,25 +1,43 @@
+import hashlib
+import json
 import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
+from django.core.cache import cache
 from django.db import transaction
-from django.http import HttpResponse
+from django.core.exceptions import ValidationError
+from django.http import HttpResponse, JsonResponse
 from django.http.request import HttpRequest as HttpRequest
-from django.shortcuts import render
+from django.shortcuts import get_object_or_404, render
 from django.utils.decorators import method_decorator
 from django.views import View
 from django.views.decorators.http import require_http_methods
-from django.views.generic import FormView
+from django.views.generic import FormView, TemplateView
 from django.template.loader import render_to_string
 
 
 from apps.lexicon import forms, models
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
-from apps.lexicon.tasks import update_lexicon_entry_search_field
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    has_project_permission,
+)
+from apps.lexicon.tasks import (
+    update_entries_search_fields,
+    update_lexicon_entry_search_field,
+)
+from apps.lexicon.utils.conjugations import save_conjugation_cells
 from apps.lexicon.views.word_views import ProjectContextMixin
 
 user_log = logging.getLogger("user_log")
 log = logging.getLogger("lexicon")
 
+# Cached grids are keyed by the project version, so this only bounds memory use
+GRID_CACHE_SECONDS = 60 * 60 * 24
+# Entries loaded per window as the spreadsheet is scrolled
+SPREADSHEET_WINDOW = 50
+# The most cells a single spreadsheet save can change
+SPREADSHEET_MAX_CELLS = 500
+
 
 @method_decorator(require_http_methods(["GET", "POST"]), name="dispatch")
 class paradigm_modal(
@@ -73,6 +91,7 @@ class ConjugationGridView(ProjectContextMixin, LoginRequiredMixin, View):
 
     GET responds with a html snippet to be inserted into the page, in view or edit mode.
     POST updates the conjugations and returns a html snippet to be inserted into the page.
+    The view mode snippet is cached until the project version or paradigm labels change.
     """
 
     view_template = "lexicon/includes/conjugation_grid/conjugation_grid_view.html"
@@ -80,19 +99,20 @@ class ConjugationGridView(ProjectContextMixin, LoginRequiredMixin, View):
 
     def get(self, request, lang_code, word_pk, paradigm_pk, edit):
         log.debug(f"lexicon:conjugation_grid view GET request. {lang_code}")
-        context = self._context_lookup(word_pk, paradigm_pk)
-        template = self.edit_template if edit == "edit" else self.view_template
-        return render(request, template, context)
+        word, paradigm = self._lookup(word_pk, paradigm_pk)
+        if edit == "edit":
+            context = self._edit_context(word, paradigm)
+            return render(request, self.edit_template, context)
+        return HttpResponse(self._render_view(request, word, paradigm))
 
     @transaction.atomic
     def post(self, request, lang_code, word_pk, paradigm_pk, *args, **kwargs):
         """Upon a post request save the conjugation values to the database."""
 
-        word = models.LexiconEntry.objects.get(pk=word_pk)
-        paradigm = models.Paradigm.objects.get(pk=paradigm_pk)
+        word, paradigm = self._lookup(word_pk, paradigm_pk)
         project = word.project
 
-        if not self.request.user.has_perm("edit_lexiconproject", project):
+        if not has_project_permission(request, project):
             log.debug(
                 f"User {request.user} does not have permission to edit {project}."
             )
@@ -101,7 +121,7 @@ class ConjugationGridView(ProjectContextMixin, LoginRequiredMixin, View):
             )
             return HttpResponse(html, status=403)
 
-        formset = self._get_or_create_formset_context(word, paradigm, request.POST)
+        formset = forms.get_conjugation_formset(paradigm, data=request.POST, word=word)
         log.debug(
             f"lexicon:conjugation_grid view POST submitted. {lang_code} \nFormset post data = '{formset.data}'"
         )
@@ -111,41 +131,71 @@ class ConjugationGridView(ProjectContextMixin, LoginRequiredMixin, View):
             # Trigger a celery task to update the search field
             update_lexicon_entry_search_field(word_pk)
             # Success: re-render the view template
-            context = self._context_lookup(word_pk, paradigm_pk, data=request.POST)
-            return render(request, self.view_template, context)
+            return HttpResponse(self._render_view(request, word, paradigm))
         else:
             # Errors: re-render the edit template with errors
             log.debug(
                 f"Paradigm conjugation formset is NOT valid. \nFormset errors = '{formset.errors}'"
             )
-            context = self._context_lookup(word_pk, paradigm_pk, data=request.POST)
-            context["formset"] = formset
+            context = self._edit_context(word, paradigm, formset=formset)
             return render(request, self.edit_template, context)
 
-    def _context_lookup(self, word_pk, paradigm_pk, data=None):
-        """Return required context for both view and edit."""
+    def _lookup(self, word_pk, paradigm_pk):
+        """Return the word, with its project, and the paradigm."""
+        word = get_object_or_404(
+            models.LexiconEntry.objects.select_related("project"), pk=word_pk
+        )
+        paradigm = get_object_or_404(models.Paradigm, pk=paradigm_pk)
+        return word, paradigm
 
-        word = models.LexiconEntry.objects.get(pk=word_pk)
-        paradigm = models.Paradigm.objects.get(pk=paradigm_pk)
+    def _conjugation_matrix(self, word, paradigm) -> list[list[str]]:
+        """Return the grid as a dense list of rows, one query per storage layout."""
+        matrix = [["" for _ in paradigm.column_labels] for _ in paradigm.row_labels]
+        cells = models.read_conjugation_cells(
+            word.project.conjugation_storage, word=word, paradigm=paradigm
+        )
+        for _, _, row, column, conjugation in cells:
+            if row < len(matrix) and column < len(matrix[row]):
+                matrix[row][column] = conjugation
+        return matrix
 
-        # The dict_get template tag can read it
-        conjugations = models.Conjugation.objects.filter(word=word, paradigm=paradigm)
-        conjugation_grid = {}
-        for c in conjugations:
-            conjugation_grid.setdefault(c.row, {})[c.column] = c.conjugation
+    def _fragment_key(self, word, paradigm) -> str:
+        labels = json.dumps([paradigm.row_labels, paradigm.column_labels])
+        labels_hash = hashlib.sha1(labels.encode("utf-8")).hexdigest()
+        return f"conjugation-grid:{word.pk}:{paradigm.pk}:{word.project.version}:{labels_hash}"
 
-        formset = self._get_or_create_formset_context(word, paradigm, data=data)
-        # Create a grid of forms for the template
-        forms_grid = []
-        forms_iter = iter(formset.forms)
-        for _ in range(len(paradigm.row_labels)):
-            row = []
-            for _ in range(len(paradigm.column_labels)):
-                row.append(next(forms_iter))
-            forms_grid.append(row)
+    def _render_view(self, request, word, paradigm) -> str:
+        """Return the read only grid, from the cache if it hasn't changed."""
+        key = self._fragment_key(word, paradigm)
+        html = cache.get(key)
+        if html is None:
+            matrix = self._conjugation_matrix(word, paradigm)
+            context = {
+                "conjugation_grid": list(zip(paradigm.row_labels, matrix)),
+                "word": word,
+                "paradigm": paradigm,
+                "lang_code": word.project.language_code,
+            }
+            html = render_to_string(self.view_template, context, request=request)
+            cache.set(key, html, GRID_CACHE_SECONDS)
+        return html
 
+    def _edit_context(self, word, paradigm, formset=None) -> dict:
+        """Return the context for the edit template, arranging the forms in a grid."""
+        if formset is None:
+            conjugations = [
+                models.Conjugation(row=row, column=column, conjugation=text)
+                for _, _, row, column, text in models.read_conjugation_cells(
+                    word.project.conjugation_storage, word=word, paradigm=paradigm
+                )
+            ]
+            formset = forms.get_conjugation_formset(paradigm, queryset=conjugations)
+        num_cols = len(paradigm.column_labels)
+        forms_grid = [
+            formset.forms[i : i + num_cols]
+            for i in range(0, len(formset.forms), num_cols)
+        ]
         return {
-            "conjugation_grid": conjugation_grid,
             "word": word,
             "paradigm": paradigm,
             "formset": formset,
@@ -153,14 +203,166 @@ class ConjugationGridView(ProjectContextMixin, LoginRequiredMixin, View):
             "lang_code": word.project.language_code,
         }
 
-    def _get_or_create_formset_context(self, word, paradigm, data=None):
-        """Single method to handle formset creation for both GET and POST."""
-        qs = models.Conjugation.objects.filter(word=word, paradigm=paradigm).order_by(
-            "row", "column"
+
+class SpreadsheetMixin(LoginRequiredMixin, ProjectContextMixin):
+    """Provides the paradigm for the multi entry conjugation spreadsheet."""
+
+    def get_paradigm(self) -> models.Paradigm:
+        return get_object_or_404(
+            models.Paradigm.objects.select_related("project"),
+            pk=self.kwargs.get("paradigm_pk"),
+            project__language_code=self.kwargs.get("lang_code"),
         )
 
-        formset = forms.get_conjugation_formset(
-            paradigm, queryset=qs, data=data, word=word if data else None
+    def get_entries(self, paradigm):
+        return models.LexiconEntry.objects.filter(paradigms=paradigm).order_by(
+            "text", "pk"
         )
 
-        return formset
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class ParadigmSpreadsheet(SpreadsheetMixin, TemplateView):
+    """A spreadsheet of every entry using a paradigm, one row per entry and one
+    column per grid cell.
+
+    The rows are loaded in windows as the table is scrolled and edited cells are
+    saved in debounced batches."""
+
+    template_name = "lexicon/paradigm_spreadsheet.html"
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        paradigm = self.get_paradigm()
+        context.update(
+            {
+                "paradigm": paradigm,
+                "cell_labels": [
+                    f"{row} {column}"
+                    for row in paradigm.row_labels
+                    for column in paradigm.column_labels
+                ],
+                "entry_count": self.get_entries(paradigm).count(),
+                "can_edit": has_project_permission(self.request, paradigm.project),
+            }
+        )
+        return context
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class ParadigmSpreadsheetRows(SpreadsheetMixin, View):
+    """Returns a window of spreadsheet rows, starting at the offset parameter."""
+
+    template_name = "lexicon/includes/paradigm_spreadsheet_rows.html"
+
+    def get(self, request, lang_code, paradigm_pk) -> HttpResponse:
+        paradigm = self.get_paradigm()
+        try:
+            offset = max(int(request.GET.get("offset", 0)), 0)
+        except ValueError:
+            offset = 0
+        # One extra entry is fetched to know if there's another window
+        entries = list(
+            self.get_entries(paradigm).values_list("pk", "text")[
+                offset : offset + SPREADSHEET_WINDOW + 1
+            ]
+        )
+        has_more = len(entries) > SPREADSHEET_WINDOW
+        entries = entries[:SPREADSHEET_WINDOW]
+
+        columns = len(paradigm.column_labels)
+        cells = len(paradigm.row_labels) * columns
+        values = {pk: [""] * cells for pk, _ in entries}
+        for word_id, _, row, column, conjugation in models.read_conjugation_cells(
+            paradigm.project.conjugation_storage, paradigm=paradigm, word_id__in=values
+        ):
+            if row * columns + column < cells:
+                values[word_id][row * columns + column] = conjugation
+
+        context = {
+            "lang_code": lang_code,
+            "paradigm": paradigm,
+            "rows": [
+                (
+                    pk,
+                    text,
+                    [divmod(i, columns) + (v,) for i, v in enumerate(values[pk])],
+                )
+                for pk, text in entries
+            ],
+            "next_offset": offset + SPREADSHEET_WINDOW if has_more else None,
+            "can_edit": has_project_permission(request, paradigm.project),
+        }
+        return render(request, self.template_name, context)
+
+
+@method_decorator(require_http_methods(["POST"]), name="dispatch")
+class ParadigmSpreadsheetSave(
+    SpreadsheetMixin, ProjectEditPermissionRequiredMixin, View
+):
+    """Saves a batch of edited spreadsheet cells posted as json.
+
+    The body is {"cells": [{"entry": pk, "row": 0, "column": 1, "value": "..."}]}.
+    Valid cells are saved in one transaction with one version bump and invalid
+    ones are returned as errors."""
+
+    def post(self, request, lang_code, paradigm_pk) -> JsonResponse:
+        paradigm = self.get_paradigm()
+        project = paradigm.project
+        try:
+            submitted = json.loads(request.body)["cells"]
+            submitted = [
+                (int(c["entry"]), int(c["row"]), int(c["column"]), str(c["value"]))
+                for c in submitted
+            ]
+        except (ValueError, KeyError, TypeError):
+            return JsonResponse({"error": "Invalid cell data."}, status=400)
+        if len(submitted) > SPREADSHEET_MAX_CELLS:
+            return JsonResponse(
+                {"error": f"Save at most {SPREADSHEET_MAX_CELLS} cells at once."},
+                status=400,
+            )
+
+        entry_pks = set(
+            self.get_entries(paradigm)
+            .filter(pk__in={entry for entry, _, _, _ in submitted})
+            .values_list("pk", flat=True)
+        )
+        max_length = models.Conjugation._meta.get_field("conjugation").max_length
+        cells = {}
+        errors = []
+        for entry, row, column, value in submitted:
+            try:
+                if entry not in entry_pks:
+                    raise ValidationError("Entry doesn't use this paradigm.")
+                if not (
+                    0 <= row < len(paradigm.row_labels)
+                    and 0 <= column < len(paradigm.column_labels)
+                ):
+                    raise ValidationError("Cell is outside the paradigm.")
+                value = value.strip()
+                if len(value) > max_length:
+                    raise ValidationError(
+                        f"Conjugations can be at most {max_length} characters."
+                    )
+                if value:
+                    value = models.normalize_and_validate(value, project, "conjugation")
+            except ValidationError as e:
+                errors.append(
+                    {
+                        "entry": entry,
+                        "row": row,
+                        "column": column,
+                        "message": e.messages[0],
+                    }
+                )
+                continue
+            cells[(entry, row, column)] = value
+
+        with transaction.atomic():
+            _, changed_words = save_conjugation_cells(project, paradigm, cells)
+            update_entries_search_fields(sorted(changed_words))
+        if changed_words:
+            user_log.info(
+                f"{request.user} edited {len(cells)} conjugations of {len(changed_words)} entries in the {paradigm.name} spreadsheet."
+            )
+        return JsonResponse({"saved": len(cells), "errors": errors})
@@ -9,6 +9,7 @@ from django.views.decorators.http import require_http_methods
 from django.views.generic import CreateView, DeleteView, TemplateView, UpdateView
 
 from apps.lexicon import models
+from apps.lexicon.conditional import conditional_project_page
 from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
 from apps.lexicon.views.word_views import ProjectContextMixin
 
@@ -17,6 +18,7 @@ log = logging.getLogger("lexicon")
 
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
+@method_decorator(conditional_project_page, name="dispatch")
 class IgnoreList(ProjectContextMixin, TemplateView):
     """The list of ignore words.
 
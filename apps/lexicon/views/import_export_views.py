@@ -1,15 +1,29 @@
+import functools
 import logging
 import os
+from xml.etree.ElementTree import ParseError
 
 from django.contrib.auth.mixins import LoginRequiredMixin
-from django.http import FileResponse, HttpResponse
-from django.shortcuts import get_object_or_404
+from django.http import Http404, HttpResponse
+from django.shortcuts import get_object_or_404, redirect, render
 from django.urls import reverse
+from django.utils.decorators import method_decorator
+from django.views import View
+from django.views.decorators.http import require_http_methods
 from django.views.generic import FormView, TemplateView
 
 from apps.lexicon import forms, models, tasks
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
-from apps.lexicon.utils import export
+from apps.lexicon.conditional import (
+    conditional_project_version,
+    get_project_version,
+    project_version_etag,
+)
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    get_request_project,
+)
+from apps.lexicon.utils import export, export_store, paratext
+from apps.lexicon.utils.downloads import file_download
 from apps.lexicon.views.word_views import ProjectContextMixin
 
 log = logging.getLogger("lexicon")
@@ -54,72 +68,197 @@ class ImportSuccess(ProjectContextMixin, TemplateView):
 # export views below are in use
 
 
+EXPORT_CONTENT_TYPES = {
+    "oxt": "application/vnd.openoffice.extension",
+    "dic": "text/plain",
+    "xml": "text/xml",
+    "zip": "application/zip",
+    "jsn": "application/json",
+}
+
+
 class ExportPage(ProjectContextMixin, FormView):
     """Lists the export options at lexicon/<lang code>/export.
 
-    The response is a http file attachment, so no success url is required."""
+    Exports are built by a background ExportJob, the page then polls the job with
+    htmx and offers the file for download once it's ready."""
 
     template_name = "lexicon/export.html"
     form_class = forms.ExportForm
 
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        job_pk = self.request.GET.get("job")
+        if "job" not in context and job_pk and job_pk.isdigit():
+            context["job"] = models.ExportJob.objects.filter(
+                pk=job_pk, project=self.get_project()
+            ).first()
+        return context
+
+    def get_or_create_job(self, form) -> tuple[models.ExportJob, bool]:
+        """Return a job for the export, reusing one for the same request if it's
+        still running or can be downloaded."""
+        project = self.get_project()
+        options = {
+            "project": project,
+            "export_type": form.cleaned_data["export_type"] or "oxt",
+            "checked": form.cleaned_data["checked"],
+            "hunspell": form.cleaned_data["include_hunspell"],
+            "ignore_words": form.cleaned_data["include_ignore"],
+            "project_version": project.version,
+        }
+        if options["export_type"] == "jsn":
+            # Everything is exported, not only the spelling data the version tracks
+            options["project_modified"] = project.modified
+        for job in models.ExportJob.objects.filter(
+            status__in=["pending", "running", "done"], **options
+        ):
+            if job.status != "done" or job.downloadable:
+                return job, False
+        options.setdefault("project_modified", project.modified)
+        return models.ExportJob.objects.create(**options), True
+
     def form_valid(self, form, **kwargs):
-        file = export.export_entries(
-            form.cleaned_data["export_type"],
-            get_object_or_404(
-                models.LexiconProject, language_code=self.kwargs.get("lang_code")
-            ),
+        job, created = self.get_or_create_job(form)
+        if created:
+            log.info(f"'{self.request.user}' started export job {job.pk}")
+            tasks.run_export_job.delay(job.pk, self.request.build_absolute_uri("/"))
+            job.refresh_from_db()
+        if self.request.headers.get("HX-Request"):
+            return render(
+                self.request,
+                "lexicon/includes/export_job.html",
+                {"job": job, "lang_code": job.project.language_code},
+            )
+        return redirect(
+            reverse("lexicon:export_page", args=[job.project.language_code])
+            + f"?job={job.pk}"
+        )
+
+
+class ParatextMergePage(ProjectContextMixin, FormView):
+    """Merges the lexicon into an uploaded Paratext SpellingStatus.xml file at
+    lexicon/<lang code>/export/paratext.
+
+    The response is the merged file as an attachment."""
+
+    template_name = "lexicon/paratext_merge.html"
+    form_class = forms.ParatextMergeForm
+
+    def get_initial(self) -> dict:
+        initial = super().get_initial()
+        last_merge = self.get_project().paratext_merges.first()
+        if last_merge:
+            initial["since_version"] = last_merge.version
+        return initial
+
+    def form_valid(self, form, **kwargs):
+        project = self.get_project()
+        try:
+            path, stats = paratext.merge_project(
+                project,
+                form.cleaned_data["file"],
+                since_version=form.cleaned_data["since_version"],
+                checked=form.cleaned_data["checked"],
+                hunspell=form.cleaned_data["include_hunspell"],
+                ignore_word_flag=form.cleaned_data["include_ignore"],
+            )
+        except ParseError as e:
+            form.add_error("file", f"This isn't a SpellingStatus.xml file: {e}")
+            return self.form_invalid(form)
+        return file_download(
             self.request,
-            checked=form.cleaned_data["checked"],
-            hunspell=form.cleaned_data["include_hunspell"],
-            ignore_word_flag=form.cleaned_data["include_ignore"],
+            path,
+            filename="SpellingStatus.xml",
+            content_type=EXPORT_CONTENT_TYPES["xml"],
+        )
+
+
+class ExportJobMixin(ProjectContextMixin):
+    def get_job(self) -> models.ExportJob:
+        return get_object_or_404(
+            models.ExportJob.objects.select_related("project"),
+            pk=self.kwargs.get("pk"),
+            project=self.get_project(),
+        )
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class ExportJobProgress(ExportJobMixin, View):
+    """Polled by htmx while an export is built, offers the download once it's done."""
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        job = self.get_job()
+        return render(
+            request,
+            "lexicon/includes/export_job.html",
+            {"job": job, "lang_code": job.project.language_code},
         )
-        content_type = None
-        if form.cleaned_data["export_type"] == "jsn":
-            content_type = "application/json"
-
-        response = FileResponse(
-            open(file, "rb"),
-            as_attachment=True,
-            filename=os.path.basename(file),
-            content_type=content_type,
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class ExportJobDownload(ExportJobMixin, View):
+    """Download the file of a finished export until it expires."""
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        job = self.get_job()
+        if not job.downloadable:
+            raise Http404("This export isn't available.")
+        return file_download(
+            request,
+            job.artifact,
+            filename=os.path.basename(job.artifact),
+            content_type=EXPORT_CONTENT_TYPES[job.export_type],
         )
-        return response
 
 
-def oxt_update_deliver(request, lang_code) -> FileResponse:
-    """Respond to requests for the latest oxt file."""
+@functools.cache
+def _update_xml_template() -> str:
+    """Read the update info template once, it's used on every LibreOffice poll."""
+    with open(
+        os.path.join("apps", "lexicon", "templates", "oxt", "update.xml")
+    ) as xml_file:
+        return xml_file.read()
+
+
+@conditional_project_version
+def oxt_update_deliver(request, lang_code) -> HttpResponse:
+    """Respond to requests for the latest oxt file.
+
+    The package is built once per project version and kept, later downloads
+    send the stored file."""
     log.debug(f"oxt download request for language code {lang_code}")
-    file = export.export_entries(
-        "oxt",
-        get_object_or_404(models.LexiconProject, language_code=lang_code),
-        request,
+    state = get_project_version(lang_code)
+    file = export.get_update_package_path(
+        lang_code,
+        state["version"],
+        request.build_absolute_uri(
+            reverse("lexicon:oxt_update_notify", args=[lang_code])
+        ),
     )
+    if not os.path.exists(file):
+        project = get_request_project(request, lang_code)
+        file = export.build_update_package(project, request)
+        export_store.record_artifact(file, project, project.version)
     log.debug(f"oxt file located at {file}")
 
-    # Open the file and serve with proper headers
-    response = FileResponse(
-        open(file, "rb"),
+    # Suggest filename for LibreOffice to save/install
+    return file_download(
+        request,
+        file,
+        filename=f"{lang_code}.oxt",
         content_type="application/vnd.openoffice.extension",
+        etag=project_version_etag(request, lang_code),
     )
-    # Suggest filename for LibreOffice to save/install
-    filename = f"{lang_code}.oxt"
-    response["Content-Disposition"] = f'attachment; filename="{filename}"'
-
-    return response
 
 
+@conditional_project_version
 def oxt_update_notify(request, lang_code) -> HttpResponse:
     """Respond to requests for an oxt update with xml update info."""
-    # load the xml template
     log.debug(f"oxt update request for language code {lang_code}")
-    with open(
-        os.path.join("apps", "lexicon", "templates", "oxt", "update.xml")
-    ) as xml_file:
-        xml = xml_file.read()
-
-    project = get_object_or_404(models.LexiconProject, language_code=lang_code)
+    state = get_project_version(lang_code)
 
-    xml = xml.replace("$VERSION", str(project.version))
+    xml = _update_xml_template().replace("$VERSION", str(state["version"]))
     xml = xml.replace("$IDENTIFIER", f"NTMPNG {lang_code} extension")
     download_url = request.build_absolute_uri(
         reverse("lexicon:oxt_update_deliver", args=[lang_code])
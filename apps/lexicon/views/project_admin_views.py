@@ -2,17 +2,22 @@ import logging
 
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import IntegrityError
-from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
+from django.http import HttpResponse, HttpResponseRedirect
+from django.shortcuts import get_object_or_404, render
 from django.urls import reverse
 from django.utils.decorators import method_decorator
 from django.views.decorators.http import require_http_methods
-from django.views.generic import TemplateView
+from django.views.generic import FormView, TemplateView, View
 from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
-from apps.lexicon import forms, models
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
+from apps.lexicon import forms, models, tasks
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    get_request_project,
+)
+from apps.lexicon.utils.duplicates import merge_entries
+from apps.lexicon.utils.paradigm_reshape import ReshapeError, reshape_paradigm
 from apps.lexicon.views.word_views import ProjectContextMixin
 
 log = logging.getLogger("lexicon")
@@ -35,9 +40,8 @@ class ParadigmMixin(LoginRequiredMixin, ProjectEditPermissionRequiredMixin):
     context_object_name = "paradigm"
 
     def get_project(self) -> models.LexiconProject:
-        """Retrieve the project based on the language code."""
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        """Retrieve the project based on the language code, once per request."""
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
     def get_context_data(self, **kwargs) -> dict:
         """Add project and lang_code to the context."""
@@ -99,7 +103,7 @@ class UpdateParadigm(ParadigmMixin, LoginRequiredMixin, UpdateView):
         return super().post(request, *args, **kwargs)
 
     def form_valid(self, form):
-        # tasks.update_lexicon_entry_search_field(self.object.word.pk)
+        # Renaming labels keeps the cells in place, ReshapeParadigm moves them
         user_log.info(
             f"{self.request.user} created a Paradigm for project {self.get_project()}."
         )
@@ -123,6 +127,124 @@ class DeleteParadigm(ParadigmMixin, LoginRequiredMixin, DeleteView):
         return super().post(request, *args, **kwargs)
 
 
+@method_decorator(require_http_methods(["GET", "POST"]), name="dispatch")
+class ReshapeParadigm(ParadigmMixin, FormView):
+    """Insert, delete or move a paradigm's rows and columns.
+
+    The conjugations of every entry using the paradigm are moved with the cells,
+    see reshape_paradigm()."""
+
+    form_class = forms.ParadigmReshapeForm
+    template_name = "lexicon/project_admin/paradigms/paradigm_reshape.html"
+
+    def get_paradigm(self) -> models.Paradigm:
+        return get_object_or_404(
+            models.Paradigm, pk=self.kwargs.get("pk"), project=self.get_project()
+        )
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        context["paradigm"] = self.get_paradigm()
+        context["changed"] = self.request.GET.get("changed")
+        return context
+
+    def form_valid(self, form):
+        paradigm = self.get_paradigm()
+        data = form.cleaned_data
+        to = data["to"] - 1 if data["to"] is not None else None
+        try:
+            changed = reshape_paradigm(
+                paradigm,
+                data["axis"],
+                data["operation"],
+                data["position"] - 1,
+                to=to,
+                label=data["label"].strip(),
+            )
+        except ReshapeError as e:
+            form.add_error(None, str(e))
+            return self.form_invalid(form)
+        user_log.info(
+            f"{self.request.user} reshaped {paradigm}: {data['operation']} {data['axis']} {data['position']}."
+        )
+        url = reverse(
+            "lexicon:project_admin_paradigm_reshape",
+            args=(self.get_project().language_code, paradigm.pk),
+        )
+        return HttpResponseRedirect(f"{url}?changed={changed}")
+
+
+@method_decorator(require_http_methods(["GET", "POST"]), name="dispatch")
+class GenerateConjugations(ParadigmMixin, UpdateView):
+    """Edit a paradigm's generation template and apply it to all its entries.
+
+    Saving with the "apply" button starts a background job that fills the empty
+    cells of every entry using the paradigm."""
+
+    model = models.GenerationTemplate
+    form_class = forms.GenerationTemplateForm
+    template_name = "lexicon/project_admin/paradigms/paradigm_generate.html"
+    context_object_name = "generation_template"
+
+    def get_paradigm(self) -> models.Paradigm:
+        return get_object_or_404(
+            models.Paradigm, pk=self.kwargs.get("pk"), project=self.get_project()
+        )
+
+    def get_object(self, queryset=None) -> models.GenerationTemplate:
+        paradigm = self.get_paradigm()
+        try:
+            return paradigm.generation_template
+        except models.GenerationTemplate.DoesNotExist:
+            return models.GenerationTemplate(paradigm=paradigm)
+
+    def get_form_kwargs(self) -> dict:
+        kwargs = super().get_form_kwargs()
+        kwargs["paradigm"] = self.object.paradigm
+        return kwargs
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        context["paradigm"] = self.object.paradigm
+        return context
+
+    def form_valid(self, form):
+        template = form.save()
+        user_log.info(
+            f"{self.request.user} updated the generation template for {template.paradigm}."
+        )
+        if "apply" in self.request.POST:
+            models.GenerationTemplate.objects.filter(pk=template.pk).update(
+                status="pending"
+            )
+            tasks.generate_paradigm_conjugations.delay(template.pk)
+            user_log.info(
+                f"{self.request.user} generated conjugations for {template.paradigm}."
+            )
+        return HttpResponseRedirect(
+            reverse(
+                "lexicon:project_admin_paradigm_generate",
+                args=(self.get_project().language_code, template.paradigm.pk),
+            )
+        )
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class GenerationReport(ParadigmMixin, TemplateView):
+    """Polled by htmx while conjugations are being generated, shows the report."""
+
+    template_name = "lexicon/project_admin/paradigms/paradigm_generate_report.html"
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        context["generation_template"] = get_object_or_404(
+            models.GenerationTemplate,
+            paradigm__pk=self.kwargs.get("pk"),
+            paradigm__project=context["project"],
+        )
+        return context
+
+
 class AffixMixin(LoginRequiredMixin, ProjectEditPermissionRequiredMixin):
     """A reusable mixin to provide project context for affix views."""
 
@@ -130,9 +252,8 @@ class AffixMixin(LoginRequiredMixin, ProjectEditPermissionRequiredMixin):
     context_object_name = "affix"
 
     def get_project(self) -> models.LexiconProject:
-        """Retrieve the project based on the language code."""
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        """Retrieve the project based on the language code, once per request."""
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
     def get_context_data(self, **kwargs) -> dict:
         """Add project and lang_code to the context."""
@@ -240,3 +361,81 @@ class DeleteAffix(AffixMixin, LoginRequiredMixin, DeleteView):
         log.debug("lexicon:project_admin_affix_delete view POST request.")
         user_log.info(f"{request.user} deleted an affix from {self.get_project()}.")
         return super().post(request, *args, **kwargs)
+
+
+class DuplicateMixin(
+    LoginRequiredMixin, ProjectEditPermissionRequiredMixin, ProjectContextMixin
+):
+    """Renders the near duplicate scan status and candidates for a project."""
+
+    results_template = "lexicon/project_admin/duplicates/duplicate_results.html"
+
+    def get_results_context(self) -> dict:
+        project = self.get_project()
+        return {
+            "lang_code": project.language_code,
+            "project": project,
+            "scan": models.DuplicateScan.objects.filter(project=project).first(),
+            "candidates": models.DuplicateCandidate.objects.filter(
+                project=project
+            ).select_related("entry", "duplicate"),
+        }
+
+    def render_results(self) -> HttpResponse:
+        return render(self.request, self.results_template, self.get_results_context())
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class DuplicateReport(DuplicateMixin, TemplateView):
+    """The page listing entries that are possibly duplicates of each other."""
+
+    template_name = "lexicon/project_admin/duplicates/duplicate_report.html"
+
+    def get_context_data(self, **kwargs) -> dict:
+        context = super().get_context_data(**kwargs)
+        context.update(self.get_results_context())
+        return context
+
+
+@method_decorator(require_http_methods(["GET"]), name="dispatch")
+class DuplicateScanProgress(DuplicateMixin, View):
+    """Polled by htmx while a scan runs, shows the candidates once it's done."""
+
+    def get(self, request, *args, **kwargs) -> HttpResponse:
+        return self.render_results()
+
+
+@method_decorator(require_http_methods(["POST"]), name="dispatch")
+class StartDuplicateScan(DuplicateMixin, View):
+    """Start a background search for near duplicate entries."""
+
+    def post(self, request, *args, **kwargs) -> HttpResponse:
+        project = self.get_project()
+        models.DuplicateScan.objects.update_or_create(
+            project=project, defaults={"status": "pending", "progress": 0}
+        )
+        tasks.find_duplicate_entries.delay(project.language_code)
+        user_log.info(f"{request.user} started a duplicate search for {project}.")
+        return self.render_results()
+
+
+@method_decorator(require_http_methods(["POST"]), name="dispatch")
+class MergeDuplicate(DuplicateMixin, View):
+    """Merge a candidate pair, keeping the entry chosen by the POSTed "keep"."""
+
+    def post(self, request, *args, **kwargs) -> HttpResponse:
+        project = self.get_project()
+        candidate = get_object_or_404(
+            models.DuplicateCandidate.objects.select_related("entry", "duplicate"),
+            pk=self.kwargs.get("pk"),
+            project=project,
+        )
+        if request.POST.get("keep") == "duplicate":
+            keep, duplicate = candidate.duplicate, candidate.entry
+        else:
+            keep, duplicate = candidate.entry, candidate.duplicate
+        merge_entries(keep, duplicate)
+        user_log.info(
+            f"{request.user} merged '{duplicate.text}' into '{keep.text}' in {project}."
+        )
+        return self.render_results()
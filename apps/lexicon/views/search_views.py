@@ -2,12 +2,15 @@ import logging
 import re
 
 from django.db import connection
-from django.db.models import QuerySet
+from django.db.models import Exists, OuterRef, Q, QuerySet
 from django.db.utils import OperationalError
-from django.shortcuts import get_object_or_404
+from django.utils.decorators import method_decorator
 from django.views.generic import ListView
 
 from apps.lexicon import models
+from apps.lexicon.conditional import conditional_project_page
+from apps.lexicon.permissions import get_request_project
+from apps.lexicon.utils.reverse_analyzer import find_lemmas
 
 user_log = logging.getLogger("user_log")
 log = logging.getLogger("lexicon")
@@ -16,6 +19,7 @@ MAX_SEARCH_LENGTH = 30
 REGEX_STATEMENT_TIMEOUT_MS = 2000
 
 
+@method_decorator(conditional_project_page, name="dispatch")
 class ProjectSearchView(ListView):
     """Generic search view for project-scoped models.
     Subclasses should define 'model' and a 'search_field'. Search will alternate
@@ -28,9 +32,7 @@ class ProjectSearchView(ListView):
     def get_queryset(self) -> QuerySet:
         search = self.request.GET.get("search")
         self.search_error = None
-        self.project = get_object_or_404(
-            models.LexiconProject, language_code=self.kwargs.get("lang_code")
-        )
+        self.project = get_request_project(self.request, self.kwargs.get("lang_code"))
         query = self.model.objects.select_related("project").filter(
             project=self.project
         )
@@ -63,12 +65,12 @@ class ProjectSearchView(ListView):
                     cursor.execute(
                         f"SET LOCAL statement_timeout = {REGEX_STATEMENT_TIMEOUT_MS}"
                     )
-                result = query.filter(**self.get_filter_kwargs()).distinct()
+                result = query.filter(self.get_filter()).distinct()
                 # Force evaluation now so a timeout raises here, not at template
                 # render time.
                 result.exists()
             else:
-                result = query.filter(**self.get_filter_kwargs()).distinct()
+                result = query.filter(self.get_filter()).distinct()
 
             return result
 
@@ -90,6 +92,10 @@ class ProjectSearchView(ListView):
             )
         return {f"{field_name}__{lookup}": search}
 
+    def get_filter(self) -> Q:
+        """Return the filter for the search, built from get_filter_kwargs()."""
+        return Q(**self.get_filter_kwargs())
+
     def get_context_data(self, **kwargs):
         context = super().get_context_data(**kwargs)
         context["search_error"] = getattr(self, "search_error", None)
@@ -103,6 +109,25 @@ class LexiconSearchResults(ProjectSearchView):
     search_field = "search__icontains"
     english_search_field = "senses__eng__icontains"
 
+    def get_filter(self) -> Q:
+        """Also match entries that generate the search term through an affix."""
+        search_filter = super().get_filter()
+        if (
+            self.request.GET.get("eng") == "true"
+            or self.request.GET.get("regex") == "true"
+        ):
+            return search_filter
+        search = self.request.GET.get("search")
+        if self.request.GET.get("morph") == "true":
+            # Strip affixes from each word and match the headwords they came from
+            lemmas = find_lemmas(self.project, search.split())
+            return search_filter | Q(pk__in=lemmas)
+        self.project.ensure_hunspell_forms()
+        generated = models.HunspellForm.objects.filter(
+            entry=OuterRef("pk"), normalized=search.lower()
+        )
+        return search_filter | Q(Exists(generated))
+
     def get_queryset(self):
         qs = super().get_queryset()
         return qs.prefetch_related("senses")
@@ -0,0 +1,59 @@
+import logging
+
+from django.http import JsonResponse
+from django.shortcuts import get_object_or_404
+from django.views.decorators.http import require_http_methods
+
+from apps.lexicon import models
+from apps.lexicon.utils.suggestions import MAX_SUGGESTIONS, get_index
+
+log = logging.getLogger("lexicon")
+
+MAX_WORD_LENGTH = 60
+MAX_TEXT_LENGTH = 10_000
+
+
+def _serialize(suggestions) -> list[dict]:
+    return [{"word": s.word, "distance": s.distance} for s in suggestions]
+
+
+@require_http_methods(["GET", "POST"])
+def suggestions(request, lang_code) -> JsonResponse:
+    """Return ranked spelling suggestions as json.
+
+    Pass 'word' to check a single word, or 'text' to check a whole passage. Long
+    passages can be POSTed with a CSRF token, other sites have to use GET."""
+    project = get_object_or_404(models.LexiconProject, language_code=lang_code)
+    params = request.POST if request.method == "POST" else request.GET
+    try:
+        limit = int(params.get("limit", MAX_SUGGESTIONS))
+    except ValueError:
+        limit = MAX_SUGGESTIONS
+    limit = max(1, min(limit, MAX_SUGGESTIONS))
+
+    if "text" in params:
+        text = params["text"]
+        if len(text) > MAX_TEXT_LENGTH:
+            return JsonResponse(
+                {"error": f"Text too long (max {MAX_TEXT_LENGTH} characters)."},
+                status=400,
+            )
+        results = get_index(project).check_text(text, limit=limit)
+        for result in results:
+            result["suggestions"] = _serialize(result["suggestions"])
+        return JsonResponse({"unknown_words": results})
+
+    word = params.get("word", "").strip()
+    if not word or len(word) > MAX_WORD_LENGTH:
+        return JsonResponse(
+            {"error": f"Give a word of up to {MAX_WORD_LENGTH} characters."},
+            status=400,
+        )
+    index = get_index(project)
+    return JsonResponse(
+        {
+            "word": word.lower(),
+            "known": word in index,
+            "suggestions": _serialize(index.lookup(word, limit=limit)),
+        }
+    )
@@ -10,7 +10,10 @@ from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
 from apps.lexicon import forms, models, tasks
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    get_request_project,
+)
 
 log = logging.getLogger("lexicon")
 user_log = logging.getLogger("user_log")
@@ -27,7 +30,11 @@ class WordContextMixin:
         # For views with 'word_pk' in kwargs
         word_pk = self.kwargs.get("word_pk")
         if word_pk:
-            return get_object_or_404(models.LexiconEntry, pk=word_pk)
+            if not hasattr(self, "_word"):
+                self._word = get_object_or_404(
+                    models.LexiconEntry.objects.select_related("project"), pk=word_pk
+                )
+            return self._word
         # For views with self.object.word (Update/Delete)
         if hasattr(self, "object") and hasattr(self.object, "word"):
             return self.object.word
@@ -60,9 +67,8 @@ class WordContextMixin:
         )
 
     def get_project(self) -> models.LexiconProject:
-        """Retrieve the project based on the language code."""
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        """Retrieve the project based on the language code, once per request."""
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
@@ -74,9 +80,7 @@ class VariationList(WordContextMixin, ListView):
     template_name = "lexicon/includes/variations/variation_list.html"
 
     def get_queryset(self) -> dict:
-        self.word = get_object_or_404(
-            models.LexiconEntry, pk=self.kwargs.get("word_pk")
-        )
+        self.word = self.get_word()
         return models.Variation.objects.filter(word=self.word)
 
 
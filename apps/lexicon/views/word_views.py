@@ -4,7 +4,6 @@ import logging
 from django.contrib.auth.mixins import LoginRequiredMixin
 from django.db import IntegrityError
 from django.http import HttpResponse
-from django.shortcuts import get_object_or_404
 from django.template.loader import render_to_string
 from django.urls import reverse
 from django.utils.decorators import method_decorator
@@ -14,8 +13,15 @@ from django.views.generic.edit import CreateView, DeleteView, UpdateView
 from django.views.generic.list import ListView
 
 from apps.lexicon import forms, models
-from apps.lexicon.permissions import ProjectEditPermissionRequiredMixin
-from apps.lexicon.utils.hunspell import unmunch
+from apps.lexicon.conditional import conditional_project_page
+from apps.lexicon.permissions import (
+    ProjectEditPermissionRequiredMixin,
+    get_request_project,
+    prefetch_project_permissions,
+)
+from apps.lexicon.tasks import _build_hunspell_forms
+from apps.lexicon.utils.hunspell_pool import get_affix_file
+from apps.lexicon.utils.suggestions import get_index
 
 user_log = logging.getLogger("user_log")
 log = logging.getLogger("lexicon")
@@ -28,14 +34,21 @@ class ProjectList(ListView):
     model = models.LexiconProject
     template_name = "lexicon/project_list.html"
 
+    def get_context_data(self, **kwargs) -> dict:
+        """Add the pks of the projects the user can edit, checked in one query."""
+        context = super().get_context_data(**kwargs)
+        context["editable_projects"] = prefetch_project_permissions(
+            self.request, context["object_list"]
+        )
+        return context
+
 
 class ProjectContextMixin:
     """A reusable mixin to provide project context for views."""
 
     def get_project(self) -> models.LexiconProject:
-        """Retrieve the project based on the language code."""
-        lang_code = self.kwargs.get("lang_code")
-        return get_object_or_404(models.LexiconProject, language_code=lang_code)
+        """Retrieve the project based on the language code, once per request."""
+        return get_request_project(self.request, self.kwargs.get("lang_code"))
 
     def get_context_data(self, **kwargs) -> dict:
         """Add project, affixes and lang_code to the context."""
@@ -52,6 +65,7 @@ class ProjectContextMixin:
 
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
+@method_decorator(conditional_project_page, name="dispatch")
 class LexiconView(ProjectContextMixin, TemplateView):
     """The main display for the lexicon, listing all entries.
 
@@ -62,6 +76,7 @@ class LexiconView(ProjectContextMixin, TemplateView):
 
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
+@method_decorator(conditional_project_page, name="dispatch")
 class EntryDetail(ProjectContextMixin, DetailView):
     """The view at url lexicon<lang code>/<pk>/detail. Displays all info in .db for a word."""
 
@@ -69,34 +84,29 @@ class EntryDetail(ProjectContextMixin, DetailView):
     template_name = "lexicon/entry_detail.html"
 
     def get_object(self, queryset=None):
-        queryset = self.get_queryset().prefetch_related("senses", "paradigms")
+        queryset = self.get_queryset().prefetch_related(
+            "senses", "paradigms", "conjugations", "conjugation_grids"
+        )
         return super().get_object(queryset=queryset)
 
     def get_context_data(self, **kwargs) -> dict:
-        """Add the conjugations linked to the entry."""
+        """Add the conjugation cells linked to the entry."""
         context = super().get_context_data(**kwargs)
-        conjugations = models.Conjugation.objects.filter(
-            word=self.object
-        ).select_related("paradigm")
-        context["conjugations"] = conjugations
+        # (paradigm pk, row, column, text) in whichever layout the project uses
+        context["conjugations"] = self.object.conjugation_cells()
         context["paradigms"] = self.object.paradigms.all()
 
-        # generate hunspell words. util expects a string
-        affix_letters = [c.affix_letter for c in self.object.affixes.all()]
-        # create a list of conjugation words for hunspell
-        hunspell_dic_words = [
-            f"{c.conjugation}/{''.join(affix_letters)}" for c in conjugations
-        ]
-        # append the main word to the list
-        hunspell_dic_words.append(f"{self.object.text}/{''.join(affix_letters)}")
-        # convert into a string
-        hunspell_dic_words = "\n".join(hunspell_dic_words)
-        aff = self.object.project.affix_file
-        log.debug(f"Affix file: {aff}")
-        log.debug(f"Hunspell dic words: {hunspell_dic_words}")
-
-        if hunspell_dic_words and aff:
-            hunspell_words = unmunch(hunspell_dic_words, aff)
+        # hunspell words are generated ahead of time from the affix file, while
+        # they're being rebuilt the entry's words are expanded on the fly
+        project = self.object.project
+        if project.ensure_hunspell_forms():
+            forms = self.object.hunspell_forms.all()
+        else:
+            forms = _build_hunspell_forms(
+                self.object, get_affix_file(project.affix_file)
+            )
+        hunspell_words = [f.form for f in forms]
+        if hunspell_words:
             context["hunspell_words"] = hunspell_words
             context["hunspell_conjugations_number"] = len(hunspell_words)
         return context
@@ -245,6 +255,7 @@ class DeleteEntry(
 
 
 @method_decorator(require_http_methods(["GET"]), name="dispatch")
+@method_decorator(conditional_project_page, name="dispatch")
 class ReviewList(ProjectContextMixin, ListView):
     """Shows entries marked for review at url lexicon/<lang code>/review."""
 
@@ -255,6 +266,18 @@ class ReviewList(ProjectContextMixin, ListView):
         self.project = self.get_project()
         return models.LexiconEntry.objects.filter(project=self.project, review__gt=0)
 
+    def get_context_data(self, **kwargs) -> dict:
+        """Add similar spellings for each word, to help spot misspellings."""
+        context = super().get_context_data(**kwargs)
+        index = get_index(self.project)
+        context["similar_words"] = {
+            entry.pk: [
+                s.word for s in index.lookup(entry.text) if s.word != entry.text.lower()
+            ][:5]
+            for entry in context["object_list"]
+        }
+        return context
+
 
 @require_http_methods(["GET"])
 def add_sense_form(request):
@@ -266,8 +266,41 @@ CELERY_BEAT_SCHEDULE = {
         "task": "apps.lexicon.tasks.backup_projects",
         "schedule": 86400.0,  # 24 hours in seconds
     },
+    "remove-expired-exports-hourly": {
+        "task": "apps.lexicon.tasks.remove_expired_exports",
+        "schedule": 3600.0,
+    },
+    "enforce-export-store-budget-hourly": {
+        "task": "apps.lexicon.tasks.enforce_export_store_budget",
+        "schedule": 3600.0,
+    },
 }
 
+# Shared cache, kept in a separate redis database to the celery broker
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.redis.RedisCache",
+        "LOCATION": os.getenv("CACHE_URL", "redis://redis:6379/1"),
+    }
+}
+
+# Hunspell worker pool used for affix expansion, 0 workers expands in-process
+HUNSPELL_POOL_WORKERS = int(os.getenv("HUNSPELL_POOL_WORKERS", "2"))
+HUNSPELL_TESTER_WORKERS = int(os.getenv("HUNSPELL_TESTER_WORKERS", "1"))
+HUNSPELL_TIMEOUT = float(os.getenv("HUNSPELL_TIMEOUT", "10"))
+
+# How built spell check packages are downloaded. "x-accel" hands the file to nginx,
+# which needs an internal location at EXPORT_ACCEL_PREFIX aliased to data/exports,
+# "x-sendfile" to apache. Empty streams the file from Django.
+EXPORT_SENDFILE = os.getenv("EXPORT_SENDFILE", "")
+EXPORT_ACCEL_PREFIX = os.getenv("EXPORT_ACCEL_PREFIX", "/protected-exports/")
+# How long a finished export can be downloaded before it's removed
+EXPORT_RETENTION_HOURS = int(os.getenv("EXPORT_RETENTION_HOURS", "24"))
+# How large data/exports may grow before the least recently used files are removed.
+# The files of each project's latest EXPORT_KEEP_VERSIONS versions are always kept.
+EXPORT_STORE_BYTES = int(os.getenv("EXPORT_STORE_MB", "1024")) * 1024 * 1024
+EXPORT_KEEP_VERSIONS = int(os.getenv("EXPORT_KEEP_VERSIONS", "2"))
+
 # load the version from pyproject.toml
 try:
     with open("pyproject.toml", "r") as f:
@@ -277,6 +310,8 @@ except FileNotFoundError:
     version = "0.0.0"  # Default if the file isn't found
 except KeyError:
     version = "0.0.0"  # Default if the 'project' or 'version' keys are missing
+# Settings are only exposed through django.conf.settings when upper case
+VERSION = version
 
 # Production only settings, triggered by DEBUG=False
 if not DEBUG:
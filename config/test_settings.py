@@ -20,3 +20,16 @@ DATABASES = {
         "PORT": 5432,
     }
 }
+
+# Expand affixes in-process, the pool itself is tested directly
+HUNSPELL_POOL_WORKERS = 0
+HUNSPELL_TESTER_WORKERS = 0
+
+CACHES = {
+    "default": {
+        "BACKEND": "django.core.cache.backends.locmem.LocMemCache",
+    }
+}
+
+# Run background tasks inline so views that start them can be tested
+CELERY_TASK_ALWAYS_EAGER = True